@@ -0,0 +1,201 @@
+"""Build every PCBA sheet at synthetic scale and record time, size and memory.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m benchmarks.scale --rows 1000 10000 100000 1000000 --output benchmarks/results/current.json
+    python -m benchmarks.scale --compare benchmarks/results/baseline.json benchmarks/results/current.json
+
+Each source file of the ``pcba`` spec is cycled to ``rows`` rows (first
+column suffixed so rows stay distinct) and a copy of the spec pointing at
+those files is run through the legacy create -> format -> finalize chain and
+the streaming build. Every script runs in its own process with
+``REPORT_BUILDER_METRICS`` set, so per-stage seconds come from the scripts'
+own instrumentation and peak RSS from the process. A run that exceeds
+``--timeout`` or fails is recorded with its status instead of stopping the
+suite, which is how the point where an approach falls over shows up.
+
+Results are one JSON document with the environment and a flat list of runs;
+``--compare`` matches runs by pipeline and row count and exits non-zero
+when time or memory regressed by more than ``--threshold``.
+"""
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+from collections import defaultdict
+from dataclasses import asdict
+from datetime import datetime, timezone
+
+from .single_pass import EXCEL_FILE, HERE, LEGACY_SCRIPTS, measure
+
+PIPELINES = {
+    'legacy': ['create_pcba_spreadsheet.py'] + LEGACY_SCRIPTS,
+    'streaming': ['build_pcba_workbook.py'],
+}
+METRICS = ['seconds', 'peak_rss_mb']
+
+
+def synthetic_source(path, rows, out_dir):
+    import pandas as pd
+    base = pd.read_csv(path, dtype=str, keep_default_na=False)
+    df = base.iloc[[idx % len(base) for idx in range(rows)]].reset_index(drop=True)
+    first = df.columns[0]
+    df[first] = df[first] + ' #' + df.index.astype(str)
+    target = os.path.join(out_dir, f'{len(os.listdir(out_dir))}_{os.path.basename(path)}')
+    df.to_csv(target, index=False)
+    return target
+
+
+def synthetic_spec(rows, out_dir):
+    """Write the ``pcba`` spec with every source scaled to ``rows``; return its path."""
+    from report_builder.sheet_specs import load_spec
+    spec = load_spec('pcba')
+    scaled = {}
+    sheets = []
+    for sheet in spec.sheets:
+        paths = [source['path'] for source in sheet.sources] or [sheet.source]
+        for source in paths:
+            if source not in scaled:
+                scaled[source] = synthetic_source(source, rows, out_dir)
+        entry = {key: value for key, value in asdict(sheet).items() if value not in (None, [], {})}
+        if sheet.sources:
+            entry['sources'] = [dict(source, path=scaled[source['path']]) for source in sheet.sources]
+        else:
+            entry['source'] = scaled[sheet.source]
+        sheets.append(entry)
+    path = os.path.join(out_dir, 'pcba_synthetic.json')
+    with open(path, 'w', encoding='utf-8') as f:
+        summary = asdict(spec.summary) if spec.summary else False
+        json.dump({'workbook': spec.workbook, 'summary': summary, 'sheets': sheets, 'charts': spec.charts}, f)
+    return path
+
+
+def stage_seconds(metrics_file):
+    # "create/to_excel": seconds summed over sheets
+    stages = defaultdict(float)
+    if not os.path.exists(metrics_file):
+        return {}
+    with open(metrics_file, encoding='utf-8') as f:
+        for line in f:
+            report = json.loads(line)
+            for record in report['stages']:
+                stages[f"{report['pipeline']}/{record['stage']}"] += record['seconds']
+    return {stage: round(seconds, 4) for stage, seconds in stages.items()}
+
+
+def run_pipeline(pipeline, rows, spec_file, timeout):
+    result = {'pipeline': pipeline, 'rows': rows, 'status': 'ok', 'seconds': 0.0, 'peak_rss_mb': 0.0}
+    with tempfile.TemporaryDirectory() as tmp:
+        metrics_file = os.path.join(tmp, 'metrics.jsonl')
+        env = {'REPORT_BUILDER_METRICS': metrics_file, 'REPORT_BUILDER_CACHE': os.path.join(tmp, 'columnar'),
+               'REPORT_BUILDER_OUTPUT': os.path.join(tmp, 'output')}
+        for script in PIPELINES[pipeline]:
+            try:
+                seconds, rss = measure([sys.executable, os.path.join(HERE, script), spec_file], tmp,
+                                       env=env, timeout=timeout)
+            except subprocess.TimeoutExpired:
+                result['status'] = f'timeout in {script}'
+                break
+            except subprocess.CalledProcessError as error:
+                result['status'] = f'exit {error.returncode} in {script}'
+                break
+            result['seconds'] += seconds
+            result['peak_rss_mb'] = max(result['peak_rss_mb'], rss)
+        workbook = os.path.join(tmp, EXCEL_FILE)
+        result['bytes'] = os.path.getsize(workbook) if result['status'] == 'ok' else None
+        result['stages'] = stage_seconds(metrics_file)
+    result['seconds'] = round(result['seconds'], 3)
+    result['peak_rss_mb'] = round(result['peak_rss_mb'], 1)
+    return result
+
+
+def git_revision():
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=HERE, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    import openpyxl
+    import pandas as pd
+    return {
+        'revision': git_revision(),
+        'date': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'pandas': pd.__version__,
+        'openpyxl': openpyxl.__version__,
+        'platform': platform.platform(),
+        'cpus': os.cpu_count(),
+    }
+
+
+def run_suite(row_counts, pipelines, timeout):
+    runs = []
+    for rows in row_counts:
+        with tempfile.TemporaryDirectory() as data_dir:
+            spec_file = synthetic_spec(rows, data_dir)
+            for pipeline in pipelines:
+                result = run_pipeline(pipeline, rows, spec_file, timeout)
+                print(json.dumps(result), file=sys.stderr, flush=True)
+                runs.append(result)
+    return {'environment': environment(), 'runs': runs}
+
+
+def compare(baseline, current, threshold):
+    """Print per-run ratios; return the runs that regressed beyond ``threshold``."""
+    before = {(run['pipeline'], run['rows']): run for run in baseline['runs']}
+    regressions = []
+    print(f"{'pipeline':<10} {'rows':>9} {'metric':<12} {'baseline':>10} {'current':>10} {'ratio':>7}")
+    for run in current['runs']:
+        old = before.get((run['pipeline'], run['rows']))
+        if old is None:
+            continue
+        if old['status'] != run['status']:
+            print(f"{run['pipeline']:<10} {run['rows']:>9} status       {old['status']} -> {run['status']}")
+            if run['status'] != 'ok':
+                regressions.append((run['pipeline'], run['rows'], 'status'))
+            continue
+        for metric in METRICS:
+            ratio = run[metric] / old[metric] if old[metric] else float('inf')
+            flag = ' !' if ratio > 1 + threshold else ''
+            print(f"{run['pipeline']:<10} {run['rows']:>9} {metric:<12} {old[metric]:>10} {run[metric]:>10} "
+                  f"{ratio:>7.2f}{flag}")
+            if flag:
+                regressions.append((run['pipeline'], run['rows'], metric))
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[1000, 10000, 100000, 1000000])
+    parser.add_argument('--pipeline', choices=list(PIPELINES), action='append',
+                        help='pipelines to run (default: all)')
+    parser.add_argument('--timeout', type=float, default=1800, help='seconds allowed per script')
+    parser.add_argument('--output', help='write results JSON here (default: stdout)')
+    parser.add_argument('--compare', nargs=2, metavar=('BASELINE', 'CURRENT'))
+    parser.add_argument('--threshold', type=float, default=0.10, help='allowed slowdown before failing')
+    args = parser.parse_args()
+
+    if args.compare:
+        with open(args.compare[0], encoding='utf-8') as f:
+            baseline = json.load(f)
+        with open(args.compare[1], encoding='utf-8') as f:
+            current = json.load(f)
+        sys.exit(1 if compare(baseline, current, args.threshold) else 0)
+
+    results = run_suite(args.rows, args.pipeline or list(PIPELINES), args.timeout)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(results, f, indent=2)
+    else:
+        print(json.dumps(results, indent=2))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,119 @@
+"""Compare the streaming build with the legacy create -> format -> finalize chain.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m benchmarks.single_pass --rows 0 10000 100000
+
+``--rows`` pads the Top Importers sheet to that many rows (0 keeps the real
+data). Each step runs in its own process so wall time and peak RSS are
+measured per process, exactly as the scripts are run by hand.
+"""
+import argparse
+import json
+import os
+import signal
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from itertools import cycle, islice
+
+HERE = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+EXCEL_FILE = os.path.join('output', 'PCBA_Import_Data.xlsx')
+LEGACY_SCRIPTS = ['format_pcba_spreadsheet.py', 'finalize_pcba_spreadsheet.py']
+
+
+def importer_rows(sheet, rows):
+    # Cycle the real importers, suffixing names so every row is distinct
+    from report_builder.sheet_specs import iter_rows
+    base = list(iter_rows(sheet))
+    for idx, row in enumerate(islice(cycle(base), rows)):
+        yield (f'{row[0]} #{idx}',) + row[1:]
+
+
+def scaled_sheets(rows):
+    from report_builder.sheet_specs import load_spec, sheet_from_spec
+    for sheet in load_spec('pcba').sheets:
+        name, columns, body, widths, title = sheet_from_spec(sheet)
+        if rows and name == 'Top Importers':
+            body = importer_rows(sheet, rows)
+        yield name, columns, body, widths, title
+
+
+def legacy_create(rows):
+    # Mirrors create_pcba_spreadsheet.py with the padded importer sheet
+    import pandas as pd
+    os.makedirs('output', exist_ok=True)
+    with pd.ExcelWriter(EXCEL_FILE, engine='openpyxl') as writer:
+        for name, columns, body, _, _ in scaled_sheets(rows):
+            pd.DataFrame(list(body), columns=columns).to_excel(writer, sheet_name=name, index=False)
+
+
+def streaming_build(rows):
+    from report_builder.sheet_specs import load_spec, navigation_rows
+    from report_builder.workbook import build_workbook
+    os.makedirs('output', exist_ok=True)
+    spec = load_spec('pcba')
+    build_workbook(EXCEL_FILE, scaled_sheets(rows), navigation_rows(spec), summary_spec=spec.summary)
+
+
+def measure(cmd, cwd, env=None, timeout=None):
+    env = dict(os.environ, PYTHONPATH=HERE, **(env or {}))
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=cwd, env=env, stdout=subprocess.DEVNULL)
+    # wait4 has no timeout of its own, so a timer kills the child instead
+    timer = threading.Timer(timeout, proc.kill) if timeout else None
+    if timer:
+        timer.start()
+    _, status, usage = os.wait4(proc.pid, 0)
+    if timer:
+        timer.cancel()
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if timer and timer.finished.is_set() and proc.returncode == -signal.SIGKILL:
+        raise subprocess.TimeoutExpired(cmd, timeout)
+    if proc.returncode:
+        raise subprocess.CalledProcessError(proc.returncode, cmd)
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss_mb = usage.ru_maxrss / (1024 * 1024 if sys.platform == 'darwin' else 1024)
+    return time.perf_counter() - start, rss_mb
+
+
+def child(mode, rows):
+    return [sys.executable, '-m', 'benchmarks.single_pass', '--child', mode, '--rows', str(rows)]
+
+
+def run(rows):
+    result = {'rows': rows}
+    with tempfile.TemporaryDirectory() as tmp:
+        steps = [measure(child('legacy', rows), tmp)]
+        env = {'REPORT_BUILDER_OUTPUT': os.path.join(tmp, 'output')}
+        steps += [measure([sys.executable, os.path.join(HERE, script)], tmp, env) for script in LEGACY_SCRIPTS]
+        result['legacy_seconds'] = sum(seconds for seconds, _ in steps)
+        result['legacy_peak_rss_mb'] = max(rss for _, rss in steps)
+        result['legacy_bytes'] = os.path.getsize(os.path.join(tmp, EXCEL_FILE))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        seconds, rss = measure(child('streaming', rows), tmp)
+        result['streaming_seconds'] = seconds
+        result['streaming_peak_rss_mb'] = rss
+        result['streaming_bytes'] = os.path.getsize(os.path.join(tmp, EXCEL_FILE))
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--rows', type=int, nargs='+', default=[0, 10000, 100000])
+    parser.add_argument('--child', choices=['legacy', 'streaming'], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        (legacy_create if args.child == 'legacy' else streaming_build)(args.rows[0])
+        return
+
+    for rows in args.rows:
+        print(json.dumps(run(rows)), flush=True)
+
+
+if __name__ == '__main__':
+    main()
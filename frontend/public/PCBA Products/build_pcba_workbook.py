@@ -0,0 +1,9 @@
+import sys
+
+from report_builder.cli import main
+
+# Single streaming pass that replaces create -> format -> finalize; same as
+# ``python -m report_builder all [spec]``. Pass a spec name
+# (report_builder/specs/<name>.json) to build another workbook.
+if __name__ == '__main__':
+    main(['all'] + sys.argv[1:])
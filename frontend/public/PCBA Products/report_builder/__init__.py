@@ -0,0 +1 @@
+"""Builders for the PCBA import data workbook."""
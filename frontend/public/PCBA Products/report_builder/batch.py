@@ -0,0 +1,157 @@
+"""Build workbooks for every dataset folder in parallel.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m report_builder.batch --mode folder --workers 4
+
+Every directory under ``--root`` (``frontend/public`` by default) that holds
+CSVs becomes one workbook (``--mode folder``, a sheet per CSV) or one
+workbook per CSV (``--mode file``). The named JSON specs in
+``report_builder/specs`` are built alongside. Workbooks go to the same
+output directory as ``python -m report_builder`` (``cli.OUTPUT_DIR``)
+wherever the batch is run from. Jobs run on a process pool and each reports
+its own wall time and ``status``; a failed job reports its error without
+stopping the others, and the batch exits non-zero at the end.
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from .cli import OUTPUT_DIR
+from .sheet_specs import SPEC_DIR, SheetSpec, WorkbookSpec, load_spec
+
+PUBLIC_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+MAX_SHEET_NAME = 31
+INVALID_SHEET_CHARS = re.compile(r'[\[\]:*?/\\]')
+
+
+def dataset_dirs(root):
+    dirs = []
+    for entry in sorted(os.scandir(root), key=lambda entry: entry.name):
+        if entry.is_dir() and csv_files(entry.path):
+            dirs.append(entry.path)
+    return dirs
+
+
+def csv_files(folder):
+    return sorted(os.path.join(folder, name) for name in os.listdir(folder) if name.lower().endswith('.csv'))
+
+
+def sheet_name(path, taken):
+    # Lead exports share long prefixes; the last " - " segment is the distinctive part
+    stem = os.path.splitext(os.path.basename(path))[0].strip()
+    name = INVALID_SHEET_CHARS.sub('', stem.rsplit(' - ', 1)[-1]).strip()[:MAX_SHEET_NAME]
+    candidate, n = name, 2
+    while candidate.lower() in taken:
+        suffix = f' ({n})'
+        candidate, n = name[:MAX_SHEET_NAME - len(suffix)] + suffix, n + 1
+    taken.add(candidate.lower())
+    return candidate
+
+
+def folder_spec(folder):
+    taken = set()
+    sheets = [SheetSpec(name=sheet_name(path, taken), source=path, description=os.path.basename(path))
+              for path in csv_files(folder)]
+    return WorkbookSpec(workbook=f'{os.path.basename(folder)}.xlsx', sheets=sheets)
+
+
+def file_specs(folder):
+    specs = []
+    for path in csv_files(folder):
+        stem = os.path.splitext(os.path.basename(path))[0].strip()
+        sheet = SheetSpec(name=sheet_name(path, set()), source=path, description=os.path.basename(path))
+        specs.append(WorkbookSpec(workbook=f'{stem}.xlsx', sheets=[sheet]))
+    return specs
+
+
+def named_specs():
+    return sorted(os.path.splitext(name)[0] for name in os.listdir(SPEC_DIR) if name.endswith('.json'))
+
+
+def discover_jobs(root, output_dir, mode='folder', specs=None):
+    """Return ``(label, spec, output_dir)`` jobs for every dataset and named spec."""
+    jobs = []
+    for name in named_specs() if specs is None else specs:
+        jobs.append((name, load_spec(name), output_dir))
+    for folder in dataset_dirs(root):
+        folder_output = os.path.join(output_dir, os.path.basename(folder))
+        if mode == 'folder':
+            jobs.append((os.path.basename(folder), folder_spec(folder), folder_output))
+        else:
+            for spec in file_specs(folder):
+                jobs.append((spec.workbook, spec, folder_output))
+    return jobs
+
+
+def run_job(job, use_cache=True):
+    from .workbook import build_spec
+    label, spec, output_dir = job
+    start = time.perf_counter()
+    try:
+        excel_file = build_spec(spec, output_dir, use_cache=use_cache)
+    except Exception as error:
+        # One bad dataset must not cost the results of the others
+        return failed(label, error, time.perf_counter() - start)
+    return {
+        'job': label,
+        'status': 'ok',
+        'workbook': excel_file,
+        'sheets': len(spec.sheets),
+        'seconds': round(time.perf_counter() - start, 3),
+        'bytes': os.path.getsize(excel_file),
+    }
+
+
+def failed(label, error, seconds=0.0):
+    return {'job': label, 'status': 'error', 'error': f'{type(error).__name__}: {error}',
+            'seconds': round(seconds, 3)}
+
+
+def run_batch(jobs, workers=None, use_cache=True):
+    results = []
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {pool.submit(run_job, job, use_cache): job[0] for job in jobs}
+        for future in as_completed(futures):
+            try:
+                result = future.result()
+            except Exception as error:
+                # The worker itself died, e.g. killed for memory
+                result = failed(futures[future], error)
+            print(json.dumps(result), flush=True)
+            results.append(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--root', default=PUBLIC_DIR, help='directory holding the dataset folders')
+    parser.add_argument('--output', default=OUTPUT_DIR, help=f'default: {OUTPUT_DIR}')
+    parser.add_argument('--mode', choices=['folder', 'file'], default='folder')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--spec', action='append', dest='specs',
+                        help='named spec to build (default: every spec in report_builder/specs)')
+    parser.add_argument('--no-cache', action='store_true', help='render every sheet')
+    args = parser.parse_args()
+
+    jobs = discover_jobs(args.root, args.output, args.mode, args.specs)
+    start = time.perf_counter()
+    results = run_batch(jobs, args.workers, use_cache=not args.no_cache)
+    errors = sum(result['status'] != 'ok' for result in results)
+    print(json.dumps({
+        'jobs': len(results),
+        'failed': errors,
+        'workers': args.workers,
+        'job_seconds': round(sum(result['seconds'] for result in results), 3),
+        'wall_seconds': round(time.perf_counter() - start, 3),
+    }))
+    if errors:
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,213 @@
+"""Incremental rebuilds: fingerprint each sheet and reuse its rendered XML.
+
+A sheet's fingerprint covers its spec entry, the bytes of its source files,
+the modules that decide how it is rendered and the openpyxl version, whose
+style numbering the cached XML relies on (see ``styles.register``). Sheets whose fingerprint is
+cached are written as empty placeholders and their cached worksheet and table
+parts are spliced into the ``.xlsx`` afterwards, so unchanged sources are
+never read or re-rendered. Worksheet XML is streamed between zips in both
+directions and never held in memory whole.
+"""
+import hashlib
+import json
+import os
+import re
+import shutil
+import tempfile
+import zipfile
+import xml.etree.ElementTree as ET
+from dataclasses import asdict
+
+import openpyxl
+
+CACHE_DIR = '.build_cache'
+# Modules whose source decides the rendered XML of a data sheet
+RENDER_MODULES = ['styles.py', 'formatting.py', 'workbook.py', 'transforms.py', 'hts.py', 'entities.py', 'volumes.py',
+                  'validation.py', 'sheet_specs.py', 'store.py', 'columnar_cache.py']
+
+PKG_REL_NS = 'http://schemas.openxmlformats.org/package/2006/relationships'
+DOC_REL_NS = 'http://schemas.openxmlformats.org/officeDocument/2006/relationships'
+ET.register_namespace('', PKG_REL_NS)
+MAIN_NS = 'http://schemas.openxmlformats.org/spreadsheetml/2006/main'
+TABLE_CONTENT_TYPE = 'application/vnd.openxmlformats-officedocument.spreadsheetml.table+xml'
+TABLE_PART = re.compile(r'xl/tables/table(\d+)\.xml')
+TABLE_ID = re.compile(r'(<table\b[^>]*?\sid=")\d+(")')
+
+
+def file_digest(path, block_size=1 << 20):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(block_size), b''):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def render_digest():
+    here = os.path.dirname(os.path.abspath(__file__))
+    digest = hashlib.sha256()
+    for module in RENDER_MODULES:
+        digest.update(file_digest(os.path.join(here, module)).encode())
+    # Cached sheets refer to style ids that openpyxl assigns internally
+    digest.update(openpyxl.__version__.encode())
+    return digest.hexdigest()
+
+
+def publish(tmp, path):
+    """Move the finished ``tmp`` over ``path`` with the mode a plain ``open`` would give it."""
+    # mkstemp creates files as 0600; readers of the output expect the umask default
+    umask = os.umask(0)
+    os.umask(umask)
+    os.chmod(tmp, 0o666 & ~umask)
+    os.replace(tmp, path)
+
+
+def sheet_fingerprint(sheet, renderer=None, table=None):
+    entry = asdict(sheet)
+    # Summary navigation text does not change the sheet itself
+    entry.pop('description')
+    entry.pop('key_information')
+    digest = hashlib.sha256(json.dumps(entry, sort_keys=True).encode())
+    for path in [source['path'] for source in sheet.sources] or [sheet.source]:
+        digest.update(file_digest(path).encode())
+    # Transforms may read further files, such as an HTS reference table
+    for value in sorted(str(value) for value in sheet.options.values()):
+        if os.path.isfile(value):
+            digest.update(file_digest(value).encode())
+    digest.update((renderer or render_digest()).encode())
+    # The table name depends on the sheets before this one
+    digest.update((table or '').encode())
+    return digest.hexdigest()
+
+
+class SheetCache:
+    """Rendered sheet parts stored as one small zip per fingerprint.
+
+    ``get`` returns the zip's path with the small rels and table parts; the
+    worksheet XML itself stays in the zip until ``splice`` copies it.
+    """
+
+    def __init__(self, root):
+        self.root = root
+
+    def path(self, fingerprint):
+        return os.path.join(self.root, f'{fingerprint}.zip')
+
+    def get(self, fingerprint):
+        try:
+            with zipfile.ZipFile(self.path(fingerprint)) as zf:
+                names = zf.namelist()
+                if 'sheet.xml' not in names:
+                    return None
+                tables = sorted(name for name in names if name.startswith('tables/'))
+                return {
+                    'path': self.path(fingerprint),
+                    'rels': zf.read('rels.xml') if 'rels.xml' in names else None,
+                    'tables': {name[len('tables/'):-len('.xml')]: zf.read(name) for name in tables},
+                }
+        except (FileNotFoundError, zipfile.BadZipFile, KeyError):
+            return None
+
+    def put(self, fingerprint, src, part):
+        """Cache worksheet ``part`` of the open workbook zip ``src`` and its tables."""
+        parts = read_parts(src, part)
+        os.makedirs(self.root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=self.root, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f, zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as zf:
+            with src.open(part) as data, zf.open('sheet.xml', 'w', force_zip64=True) as out:
+                shutil.copyfileobj(data, out)
+            if parts['rels'] is not None:
+                zf.writestr('rels.xml', parts['rels'])
+            for rel_id, table in parts['tables'].items():
+                zf.writestr(f'tables/{rel_id}.xml', table)
+        publish(tmp, self.path(fingerprint))
+
+    def prune(self, keep):
+        keep = {f'{fingerprint}.zip' for fingerprint in keep}
+        for name in os.listdir(self.root):
+            if name.endswith('.zip') and name not in keep:
+                os.remove(os.path.join(self.root, name))
+
+
+def sheet_parts(zf):
+    # Map sheet name -> worksheet part path using workbook.xml and its rels
+    rels = ET.fromstring(zf.read('xl/_rels/workbook.xml.rels'))
+    targets = {rel.get('Id'): rel.get('Target').lstrip('/') for rel in rels}
+    workbook = ET.fromstring(zf.read('xl/workbook.xml'))
+    parts = {}
+    for sheet in workbook.iter(f'{{{MAIN_NS}}}sheet'):
+        target = targets[sheet.get(f'{{{DOC_REL_NS}}}id')]
+        parts[sheet.get('name')] = target if target.startswith('xl/') else f'xl/{target}'
+    return parts
+
+
+def rels_path(part):
+    folder, name = os.path.split(part)
+    return f'{folder}/_rels/{name}.rels'
+
+
+def read_parts(zf, part):
+    # The rels and table parts of a worksheet; both are a few hundred bytes
+    rels_name = rels_path(part)
+    if rels_name not in zf.namelist():
+        return {'rels': None, 'tables': {}}
+    rels = zf.read(rels_name)
+    tables = {}
+    for rel in ET.fromstring(rels):
+        if rel.get('Type').endswith('/table'):
+            tables[rel.get('Id')] = zf.read(rel.get('Target').lstrip('/'))
+    return {'rels': rels, 'tables': tables}
+
+
+def splice(fresh_file, excel_file, cached):
+    """Copy ``fresh_file`` to ``excel_file`` with cached sheets spliced in.
+
+    ``cached`` maps sheet name -> parts from ``SheetCache.get``. Returns
+    sheet name -> worksheet part for every sheet rendered in ``fresh_file``,
+    for ``SheetCache.put``.
+    """
+    with zipfile.ZipFile(fresh_file) as src:
+        parts = sheet_parts(src)
+        rendered = {name: part for name, part in parts.items() if name not in cached}
+        numbers = [TABLE_PART.fullmatch(name) for name in src.namelist()]
+        next_table = 1 + max([int(m.group(1)) for m in numbers if m] or [0])
+
+        content_types = src.read('[Content_Types].xml').decode()
+        extra = {}
+        # Worksheet part -> cache zip holding its XML
+        spliced = {parts[name]: sheet['path'] for name, sheet in cached.items()}
+        for name, sheet in cached.items():
+            part = parts[name]
+            if sheet['rels'] is None:
+                continue
+            # Renumber table parts and ids so they stay unique in this workbook
+            rels = ET.fromstring(sheet['rels'])
+            for rel in rels:
+                if rel.get('Id') not in sheet['tables']:
+                    continue
+                table_part = f'xl/tables/table{next_table}.xml'
+                rel.set('Target', f'/{table_part}')
+                table = sheet['tables'][rel.get('Id')].decode()
+                extra[table_part] = TABLE_ID.sub(rf'\g<1>{next_table}\g<2>', table, count=1).encode()
+                content_types = content_types.replace('</Types>', (
+                    f'<Override PartName="/{table_part}" ContentType="{TABLE_CONTENT_TYPE}"/></Types>'))
+                next_table += 1
+            extra[rels_path(part)] = ET.tostring(rels, xml_declaration=True, encoding='UTF-8')
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(excel_file)), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f, zipfile.ZipFile(f, 'w', zipfile.ZIP_DEFLATED) as dst:
+            for info in src.infolist():
+                if info.filename == '[Content_Types].xml':
+                    dst.writestr(info, content_types)
+                elif info.filename in spliced:
+                    with zipfile.ZipFile(spliced[info.filename]) as zf, zf.open('sheet.xml') as data, \
+                            dst.open(info, 'w', force_zip64=True) as out:
+                        shutil.copyfileobj(data, out)
+                elif info.filename in extra:
+                    dst.writestr(info, extra.pop(info.filename))
+                else:
+                    with src.open(info) as data, dst.open(info, 'w') as out:
+                        shutil.copyfileobj(data, out)
+            for name, data in extra.items():
+                dst.writestr(name, data)
+    publish(tmp, excel_file)
+    return rendered
@@ -0,0 +1,169 @@
+"""Native Excel charts drawn from small aggregate tables on a hidden sheet.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m report_builder.charts
+    python -m report_builder.charts pcba --output output/chart_data.csv
+
+A workbook spec lists its charts under ``charts``. Each chart aggregates one
+input once in pandas into a ``category, value`` table:
+
+* ``sheet``: the rows of another sheet in the spec, after its transform;
+* ``source``: a CSV read directly, loading only the ``category`` column;
+* ``summary``: a JSON file whose ``key`` maps labels to counts, such as the
+  docket duration buckets in ``analytics_summary.json``.
+
+Rows are counted per ``category`` value, or ``value`` is summed when given.
+With ``mentions`` a row counts once towards every listed label its free
+text names, so "China, Vietnam (various CMs)" adds to China and Vietnam;
+with ``other`` set, rows naming none of them ("Asia (various)", "Global")
+count towards that label instead of being left out.
+``top`` keeps the largest categories. The tables are written one under
+another to the hidden "Chart Data" sheet and each bar chart references only
+its own few cells, so the workbook stays small however many rows the data
+sheets hold.
+"""
+import argparse
+import json
+import os
+import re
+
+import pandas as pd
+from openpyxl.chart import BarChart, Reference
+
+from .sheet_specs import load_spec, sheet_chunks
+
+DATA_SHEET = 'Chart Data'
+CHUNKSIZE = 50_000
+# Charts sit to the right of the Summary text, one under another
+ANCHOR_COLUMN = 'F'
+ANCHOR_ROWS = 16
+WIDTH = 16
+HEIGHT = 7.5
+
+
+def source_chunks(path, column):
+    from .pages import source_chunks
+
+    for chunk in source_chunks(path, CHUNKSIZE):
+        yield chunk[[column]]
+
+
+def bucket_label(key):
+    # under_90_days -> Under 90 days, 90_180_days -> 90-180 days
+    return re.sub(r'(\d+)_(\d+)', r'\1-\2', key).replace('_', ' ').capitalize()
+
+
+def summary_table(chart):
+    with open(chart['summary'], encoding='utf-8') as f:
+        counts = json.load(f).get(chart['key']) or {}
+    return pd.DataFrame({'category': [bucket_label(key) for key in counts], 'value': list(counts.values())})
+
+
+def chunk_totals(chunk, chart):
+    values = chunk[chart['category']].fillna('').astype(str).str.strip()
+    if chart.get('mentions'):
+        found = {label: values.str.contains(rf'\b{re.escape(label)}\b', case=False) for label in chart['mentions']}
+        totals = {label: int(mask.sum()) for label, mask in found.items()}
+        if chart.get('other'):
+            named = pd.concat(found, axis=1).any(axis=1) if found else pd.Series(False, index=values.index)
+            totals[chart['other']] = int(((values != '') & ~named).sum())
+        return pd.Series(totals)
+    if chart.get('value'):
+        amounts = pd.to_numeric(chunk[chart['value']], errors='coerce').fillna(0)
+        return amounts.groupby(values).sum()
+    return values[values != ''].value_counts()
+
+
+def chart_table(chart, sheets, results=None):
+    """The ``category, value`` table for one chart, largest first.
+
+    A ``sheet`` chart reuses that sheet's transform output from ``results``.
+    """
+    if chart.get('summary'):
+        return summary_table(chart)
+    if chart.get('sheet'):
+        chunks = sheet_chunks(sheets[chart['sheet']], results)
+    else:
+        chunks = source_chunks(chart['source'], chart['category'])
+    totals = [chunk_totals(chunk, chart) for chunk in chunks]
+    totals = pd.concat(totals).groupby(level=0, sort=False).sum() if totals else pd.Series(dtype=float)
+    totals = totals[totals > 0].sort_values(ascending=False, kind='stable')
+    if chart.get('top'):
+        totals = totals.head(chart['top'])
+    return pd.DataFrame({'category': totals.index.astype(str), 'value': totals.to_numpy()})
+
+
+def chart_tables(workbook_spec, results=None):
+    """Return ``(chart, table)`` for every chart in the spec."""
+    sheets = {sheet.name: sheet for sheet in workbook_spec.sheets}
+    results = {} if results is None else results
+    return [(chart, chart_table(chart, sheets, results)) for chart in workbook_spec.charts]
+
+
+def write_chart_data(wb, tables):
+    """Append every table to a hidden sheet; returns ``(chart, header row, rows)``."""
+    ws = wb.create_sheet(DATA_SHEET)
+    ws.sheet_state = 'hidden'
+    blocks = []
+    row = 1
+    for chart, table in tables:
+        ws.append([chart['title'], chart.get('label', 'Count')])
+        for category, value in zip(table['category'], table['value']):
+            ws.append([category, value])
+        ws.append([])
+        blocks.append((chart, row, len(table)))
+        row += len(table) + 2
+    return ws, blocks
+
+
+def bar_chart(data_sheet, chart, header_row, rows):
+    bar = BarChart()
+    bar.type = chart.get('type', 'bar')
+    bar.title = chart['title']
+    bar.y_axis.title = chart.get('label', 'Count')
+    bar.legend = None
+    bar.width = WIDTH
+    bar.height = HEIGHT
+    # openpyxl omits axes unless told otherwise, leaving bars without labels
+    bar.x_axis.delete = False
+    bar.y_axis.delete = False
+    bar.add_data(Reference(data_sheet, min_col=2, min_row=header_row, max_row=header_row + rows),
+                 titles_from_data=True)
+    bar.set_categories(Reference(data_sheet, min_col=1, min_row=header_row + 1, max_row=header_row + rows))
+    if bar.type == 'bar':
+        # Horizontal bars list the largest category at the top
+        bar.x_axis.scaling.orientation = 'maxMin'
+    return bar
+
+
+def add_charts(wb, ws, tables):
+    """Write ``tables`` to the hidden data sheet and chart them on ``ws``; returns the chart count."""
+    data_sheet, blocks = write_chart_data(wb, tables)
+    count = 0
+    for chart, header_row, rows in blocks:
+        if not rows:
+            continue
+        ws.add_chart(bar_chart(data_sheet, chart, header_row, rows), f'{ANCHOR_COLUMN}{1 + count * ANCHOR_ROWS}')
+        count += 1
+    return count
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('spec', nargs='?', default='pcba', help='spec name or path')
+    parser.add_argument('--output', help='write every chart table to this CSV')
+    args = parser.parse_args()
+
+    frames = [table.assign(chart=chart['title'])[['chart', 'category', 'value']]
+              for chart, table in chart_tables(load_spec(args.spec))]
+    results = pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=['chart', 'category', 'value'])
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        results.to_csv(args.output, index=False)
+    else:
+        print(results.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Command line for the create -> format -> finalize workbook build.
+
+Run from any directory::
+
+    python -m report_builder all
+    python -m report_builder build cable_wire_contacts --output-dir /tmp/out
+    python -m report_builder format
+    python -m report_builder finalize
+    python -m report_builder all --profile output/build.pstats
+
+``build`` writes the data sheets of a spec (``pcba`` by default), ``format``
+styles them and ``finalize`` adds the Summary sheet and its charts; each
+loads and saves ``<output dir>/<workbook>``. ``all`` produces the finished
+workbook in one streaming pass with ``workbook.build_spec``, the same build
+as ``build_pcba_workbook.py``, reusing unchanged sheets from
+``<output dir>/.build_cache``. Workbooks go to ``output``
+in the ``PCBA Products`` directory unless ``--output-dir`` or
+``REPORT_BUILDER_OUTPUT`` names another. Only ``argparse`` and ``os`` load
+at startup; pandas and openpyxl load once a step needs them, so ``--help``
+and usage errors return immediately. ``--profile`` runs the step under
+cProfile and writes pstats to the given path (see ``metrics.py``).
+"""
+import argparse
+import os
+
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTPUT_DIR = os.environ.get('REPORT_BUILDER_OUTPUT') or os.path.join(PROJECT_DIR, 'output')
+COMMANDS = {
+    'build': ('write the data sheets of a spec', 'created'),
+    'format': ('add widths, styles, tables and filters', 'formatting completed'),
+    'finalize': ('add the Summary sheet and charts', 'finalized'),
+    'all': ('build the finished workbook in one streaming pass', 'built'),
+}
+# Metrics pipeline names, matching the scripts' reports before this CLI
+PIPELINES = {'build': 'create', 'all': 'build'}
+
+
+def run(command, spec_name, output_dir, profile=None):
+    """Run one subcommand; returns the workbook path."""
+    from .metrics import BuildMetrics
+    from .sheet_specs import load_spec
+
+    spec = load_spec(spec_name)
+    # Stage timings are reported when REPORT_BUILDER_METRICS is set
+    metrics = BuildMetrics.from_env(PIPELINES.get(command, command), profile)
+    if command == 'all':
+        from .workbook import build_spec
+
+        excel_file = build_spec(spec, output_dir, metrics=metrics)
+        metrics.finish()
+        return excel_file
+
+    from . import pipeline
+
+    os.makedirs(output_dir, exist_ok=True)
+    excel_file = os.path.join(output_dir, spec.workbook)
+    if command == 'build':
+        writer = pipeline.create(spec, excel_file, metrics)
+        wb = writer.book
+    else:
+        writer = None
+        wb = pipeline.load(excel_file, metrics)
+    if command == 'format':
+        pipeline.format_workbook(wb, spec, metrics)
+    if command == 'finalize':
+        pipeline.finalize_workbook(wb, spec, metrics)
+    pipeline.save(wb, excel_file, metrics, writer)
+    metrics.finish()
+    return excel_file
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog='python -m report_builder', description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+    for name, (help_text, _) in COMMANDS.items():
+        command = commands.add_parser(name, help=help_text)
+        command.add_argument('spec', nargs='?', default='pcba', help='spec name or path (default: pcba)')
+        command.add_argument('--output-dir', default=OUTPUT_DIR, help=f'default: {OUTPUT_DIR}')
+        command.add_argument('--profile', metavar='PATH', help='write cProfile stats for this run to PATH')
+    args = parser.parse_args(argv)
+
+    excel_file = run(args.command, args.spec, args.output_dir, args.profile)
+    print(f"{args.spec} spreadsheet {COMMANDS[args.command][1]} successfully at {os.path.abspath(excel_file)}")
+
+
+if __name__ == '__main__':
+    main()
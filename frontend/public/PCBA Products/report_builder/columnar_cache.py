@@ -0,0 +1,236 @@
+"""Parse each source CSV once into a Parquet cache and read it back by column.
+
+``ingest`` converts a CSV to Parquet in chunks and writes a JSON sidecar
+with the source's mtime, size, SHA-256 and schema. The cache is reused while
+mtime and size match; when they change the file is re-hashed and only
+re-ingested if its content changed. ``read_batches`` then loads just the
+columns a sheet uses.
+
+Ingest types each column that holds only integers, decimals, ``MM/DD/YYYY``
+dates or dollar amounts such as ``$397,316.15`` as int64, float64,
+timestamp or float64, as ``dockets.typed`` does for the docket exports, and
+records the type in the sidecar schema. A column is typed only when
+writing its values back out reproduces the source text exactly, so codes
+such as HTS ``8534.00`` or zip ``02134`` stay text. ``read_batches(...,
+typed=True)`` returns the parsed values; by default typed columns are
+turned back into that text, so callers see the same strings as from the
+CSV. Needs ``pyarrow``; without it ``available()`` is false and callers
+parse the CSV. Readers use the SQLite store (``store.py``) first, which
+types its columns with the same ``column_types``, and fall back to this
+cache only when ``REPORT_BUILDER_STORE=off``.
+"""
+import hashlib
+import json
+import os
+import tempfile
+
+import pandas as pd
+
+from .build_cache import file_digest
+
+CACHE_ROOT = os.environ.get(
+    'REPORT_BUILDER_CACHE',
+    os.path.join(os.path.expanduser('~'), '.cache', 'report_builder', 'columnar'),
+)
+INGEST_CHUNKSIZE = 50_000
+# Bumped when the Parquet layout changes, so older caches are re-ingested
+CACHE_VERSION = 2
+DATE_FORMAT = '%m/%d/%Y'
+
+
+def parse_integers(values):
+    return pd.to_numeric(values, errors='raise').astype('Int64')
+
+
+def parse_decimals(values):
+    return pd.to_numeric(values, errors='raise').astype('float64')
+
+
+def parse_dates(values):
+    return pd.to_datetime(values, format=DATE_FORMAT, errors='raise')
+
+
+def parse_dollars(values):
+    return parse_decimals(values.str.replace(r'^\$', '', regex=True).str.replace(',', '', regex=False))
+
+
+def format_numbers(values):
+    return values.astype('string')
+
+
+def format_dates(values):
+    return values.dt.strftime(DATE_FORMAT)
+
+
+def format_dollars(values):
+    return values.map('${:,.2f}'.format, na_action='ignore')
+
+
+# Column type -> (parse text, write back as text, Parquet type), tried in this order
+COLUMN_TYPES = {
+    'int64': (parse_integers, format_numbers, 'int64'),
+    'float64': (parse_decimals, format_numbers, 'float64'),
+    'date': (parse_dates, format_dates, 'timestamp'),
+    'dollars': (parse_dollars, format_dollars, 'float64'),
+}
+
+
+def available():
+    try:
+        import pyarrow.parquet  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
+def cache_paths(source, cache_root=None):
+    key = hashlib.sha256(os.path.abspath(source).encode()).hexdigest()[:32]
+    base = os.path.join(cache_root or CACHE_ROOT, key)
+    return f'{base}.parquet', f'{base}.json'
+
+
+def read_meta(meta_path):
+    try:
+        with open(meta_path, encoding='utf-8') as f:
+            return json.load(f)
+    except (FileNotFoundError, json.JSONDecodeError):
+        return None
+
+
+def write_json(path, data):
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    with os.fdopen(fd, 'w', encoding='utf-8') as f:
+        json.dump(data, f, indent=2)
+    os.replace(tmp, path)
+
+
+def is_fresh(source, parquet_path, meta, stat):
+    if meta is None or meta.get('version') != CACHE_VERSION or not os.path.exists(parquet_path):
+        return False
+    if meta['mtime_ns'] == stat.st_mtime_ns and meta['size'] == stat.st_size:
+        return True
+    # Touched but maybe unchanged (e.g. re-copied): fall back to the content hash
+    return meta['sha256'] == file_digest(source)
+
+
+def round_trips(values, column_type):
+    """Whether every non-empty value parses as ``column_type`` and writes back unchanged."""
+    parse, write, _ = COLUMN_TYPES[column_type]
+    present = values.notna()
+    try:
+        parsed = parse(values)
+    except (ValueError, TypeError, OverflowError):
+        return False
+    return bool(parsed[present].notna().all() and (write(parsed[present]) == values[present]).all())
+
+
+def column_types(source):
+    """First pass of ingest: the narrowest type every value of each column fits."""
+    candidates = None
+    for chunk in pd.read_csv(source, dtype=str, chunksize=INGEST_CHUNKSIZE):
+        if candidates is None:
+            candidates = {str(column): list(COLUMN_TYPES) for column in chunk.columns}
+        for column, values in zip(candidates, chunk.columns):
+            if candidates[column] and chunk[values].notna().any():
+                candidates[column] = [kind for kind in candidates[column] if round_trips(chunk[values], kind)]
+    if candidates is None:
+        return {str(column): 'string' for column in pd.read_csv(source, nrows=0).columns}
+    # Columns with no values at all stay text
+    return {column: kinds[0] if kinds and kinds != list(COLUMN_TYPES) else 'string'
+            for column, kinds in candidates.items()}
+
+
+def arrow_schema(types):
+    import pyarrow as pa
+
+    arrow_types = {'int64': pa.int64(), 'float64': pa.float64(), 'timestamp': pa.timestamp('s')}
+    return pa.schema([(column, arrow_types[COLUMN_TYPES[kind][2]] if kind in COLUMN_TYPES else pa.string())
+                      for column, kind in types.items()])
+
+
+def ingest(source, cache_root=None):
+    """Return the Parquet path for ``source``, converting it if stale."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet_path, meta_path = cache_paths(source, cache_root)
+    os.makedirs(os.path.dirname(parquet_path), exist_ok=True)
+    stat = os.stat(source)
+    meta = read_meta(meta_path)
+    if is_fresh(source, parquet_path, meta, stat):
+        if meta['mtime_ns'] != stat.st_mtime_ns:
+            write_json(meta_path, dict(meta, mtime_ns=stat.st_mtime_ns, size=stat.st_size))
+        return parquet_path
+
+    types = column_types(source)
+    schema = arrow_schema(types)
+    writer = None
+    fd, tmp = tempfile.mkstemp(dir=os.path.dirname(parquet_path), suffix='.tmp')
+    os.close(fd)
+    try:
+        for chunk in pd.read_csv(source, dtype=str, chunksize=INGEST_CHUNKSIZE):
+            chunk.columns = list(types)
+            for column, kind in types.items():
+                if kind in COLUMN_TYPES:
+                    chunk[column] = COLUMN_TYPES[kind][0](chunk[column])
+            if writer is None:
+                writer = pq.ParquetWriter(tmp, schema, compression='zstd')
+            writer.write_table(pa.Table.from_pandas(chunk, schema=schema, preserve_index=False))
+        if writer is None:
+            # Header-only CSV: still record its columns
+            pq.write_table(schema.empty_table(), tmp)
+        else:
+            writer.close()
+        os.replace(tmp, parquet_path)
+    except BaseException:
+        if writer is not None:
+            writer.close()
+        os.remove(tmp)
+        raise
+
+    write_json(meta_path, {
+        'version': CACHE_VERSION,
+        'source': os.path.abspath(source),
+        'mtime_ns': stat.st_mtime_ns,
+        'size': stat.st_size,
+        'sha256': file_digest(source),
+        'schema': types,
+    })
+    return parquet_path
+
+
+def columns(source, cache_root=None):
+    import pyarrow.parquet as pq
+    return list(pq.read_schema(ingest(source, cache_root)).names)
+
+
+def as_text(frame, types):
+    # Typed columns back to the exact source text, as str like the other columns
+    for column in frame.columns:
+        kind = types.get(column)
+        if kind in COLUMN_TYPES:
+            frame[column] = COLUMN_TYPES[kind][1](frame[column]).astype('str')
+    return frame
+
+
+def read_batches(source, columns=None, chunksize=INGEST_CHUNKSIZE, cache_root=None, typed=False):
+    """Yield DataFrames of ``chunksize`` rows holding only ``columns``.
+
+    Typed columns come back as source text unless ``typed`` is set; then
+    integers are ``Int64``, decimals and dollar amounts ``float64`` and
+    dates ``datetime64``.
+    """
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    parquet = pq.ParquetFile(ingest(source, cache_root))
+    types = {} if typed else read_meta(cache_paths(source, cache_root)[1])['schema']
+    convert = {'types_mapper': {pa.int64(): pd.Int64Dtype()}.get}
+    batches = parquet.iter_batches(batch_size=chunksize, columns=columns)
+    empty = True
+    for batch in batches:
+        empty = False
+        yield as_text(batch.to_pandas(**convert), types)
+    if empty:
+        table = parquet.schema_arrow.empty_table().select(columns or parquet.schema_arrow.names)
+        yield as_text(table.to_pandas(**convert), types)
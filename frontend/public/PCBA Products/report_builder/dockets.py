@@ -0,0 +1,462 @@
+"""Docket analytics kept as running aggregates and folded in per export.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m report_builder.dockets
+
+Every ``Search-Dockets-*.csv`` export in ``Law Database`` is read in chunks
+into ``DocketAggregates``: case counts, duration and loan sums with min/max,
+exact counters for the few case types and statuses, and Space-Saving top-k
+sketches for courts, law firms and judges. The aggregates are saved between
+runs, so a new export costs only its own rows; exports already folded in
+(matched by SHA-256) are skipped, as are dockets seen before. The state file
+holds only the aggregates and the export digests; the docket keys each
+export contributed go to a key file of their own beside it, written once
+and read back only when a new export has to be deduplicated, so saving the
+state does not grow with the history. Aggregates of disjoint exports merge
+with ``merge``. ``analytics_summary.json`` is then rewritten from the
+aggregates.
+
+Each chunk is first converted by ``typed``: the start and finish dates
+become ``datetime64`` columns and the duration, loan, debt and ratio text
+becomes ``float64``, so debt ratios and per-court statistics are whole
+column operations. The store (or, with ``REPORT_BUILDER_STORE=off``, the
+columnar cache) returns the dates, durations and loan amounts already
+parsed, so ``typed`` only converts what is still text. Durations are
+finish minus start date, which nearly every docket has; the exported
+``Case Duration (Days)``, filled in for only a few, is used where a date is
+missing. They are also kept as a per-day histogram, so ``histogram`` can
+rebin them over any edges without rereading the exports. Law firms are counted under their normalised name,
+so "GROSS POLOWY, LLC" and "Gross Polowy LLC" are one firm, shown with its
+most common spelling.
+"""
+import argparse
+import glob
+import json
+import os
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from . import columnar_cache, store
+from .batch import PUBLIC_DIR
+from .build_cache import file_digest
+from .columnar_cache import write_json
+from .entities import normalize_names
+
+LAW_DIR = os.path.join(PUBLIC_DIR, 'Law Database')
+EXPORT_PATTERN = 'Search-Dockets-*.csv'
+SUMMARY_FILE = 'analytics_summary.json'
+STATE_FILE = os.path.join(os.path.dirname(columnar_cache.CACHE_ROOT), 'dockets', 'analytics_state.json')
+# Bumped when the state layout changes; older states are refolded from the exports
+STATE_VERSION = 2
+CHUNKSIZE = 50_000
+SKETCH_CAPACITY = 256
+TOP = {'courts': 5, 'law_firms': 10, 'judges': 5}
+# Lower bounds in days, as in the original summary
+DURATION_BUCKETS = [(0, 'under_90_days'), (90, '90_180_days'), (180, '180_365_days'), (365, 'over_365_days')]
+
+COLUMNS = {
+    'docket': 'Docket',
+    'court': 'Court',
+    'case_type': 'Nature of Suit / Type',
+    'status': 'Status',
+    'law_firm': 'Law Firm',
+    'judge': 'Judge',
+    'started': 'Date - Case first started',
+    'finished': 'Last Updated - When Court Case Finished',
+    'duration': 'Case Duration (Days)',
+    'original_loan': 'Original loan amount',
+    'outstanding_debt': 'Outstanding debt at filing (principal)',
+    'debt_ratio': 'Debt ratio (Outstanding ÷ Original)',
+}
+# "Sat., Nov. 4, 2023 at 8:33PM ET"
+FINISHED_PATTERN = r'(?P<month>[A-Za-z]{3})[a-z]*\.?\s+(?P<day>\d{1,2}),\s+(?P<year>\d{4})'
+
+
+class TopK:
+    """Space-Saving heavy hitters: exact while at most ``capacity`` keys are seen.
+
+    Once full, a new key replaces the smallest counter and inherits its count
+    as ``errors[key]``, the most the key can be overcounted by.
+    """
+
+    def __init__(self, capacity=SKETCH_CAPACITY, counts=None, errors=None, labels=None):
+        self.capacity = capacity
+        self.counts = Counter(counts or {})
+        self.errors = Counter(errors or {})
+        # Spellings seen per key; the most common one is shown
+        self.labels = {key: Counter(spellings) for key, spellings in (labels or {}).items()}
+
+    def update(self, counts, spellings=None):
+        for key, count in counts.items():
+            if key not in self.counts and len(self.counts) >= self.capacity:
+                evicted, floor = min(self.counts.items(), key=lambda item: item[1])
+                del self.counts[evicted]
+                self.errors.pop(evicted, None)
+                self.labels.pop(evicted, None)
+                self.counts[key] = floor
+                self.errors[key] = floor
+            self.counts[key] += count
+        for (key, spelling), count in (spellings or {}).items():
+            if key in self.counts:
+                self.labels.setdefault(key, Counter())[spelling] += count
+
+    def merge(self, other):
+        self.update(other.counts, {(key, spelling): count for key, spellings in other.labels.items()
+                                   for spelling, count in spellings.items()})
+        for key, error in other.errors.items():
+            if key in self.counts:
+                self.errors[key] += error
+
+    def top(self, k):
+        ranked = sorted(self.counts.items(), key=lambda item: (-item[1], item[0]))[:k]
+        return [{'name': self.label(key), 'count': count} for key, count in ranked]
+
+    def label(self, key):
+        spellings = self.labels.get(key)
+        return spellings.most_common(1)[0][0] if spellings else key
+
+    def to_dict(self):
+        return {'capacity': self.capacity, 'counts': dict(self.counts), 'errors': dict(self.errors),
+                'labels': {key: dict(spellings) for key, spellings in self.labels.items()}}
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(data['capacity'], data['counts'], data['errors'], data['labels'])
+
+
+class Extent:
+    """Count, sum, min and max of one numeric column."""
+
+    def __init__(self, count=0, total=0.0, low=None, high=None):
+        self.count, self.total, self.low, self.high = count, total, low, high
+
+    def update(self, values):
+        values = values.dropna()
+        if values.empty:
+            return
+        self.merge(Extent(len(values), float(values.sum()), float(values.min()), float(values.max())))
+
+    def merge(self, other):
+        if not other.count:
+            return
+        self.count += other.count
+        self.total += other.total
+        self.low = other.low if self.low is None else min(self.low, other.low)
+        self.high = other.high if self.high is None else max(self.high, other.high)
+
+    def mean(self):
+        return self.total / self.count if self.count else 0
+
+    def to_dict(self):
+        return vars(self).copy()
+
+    @classmethod
+    def from_dict(cls, data):
+        return cls(**data)
+
+
+def parse_money(values):
+    if pd.api.types.is_numeric_dtype(values):
+        # Already parsed by the columnar cache
+        return values.astype('float64')
+    return pd.to_numeric(values.str.replace(r'[$,\s]', '', regex=True), errors='coerce')
+
+
+def parse_ratio(values):
+    if pd.api.types.is_numeric_dtype(values):
+        return values.astype('float64')
+    # "1.2082 → 120.82%" or "1.00 (100%)": the leading number is the ratio
+    return pd.to_numeric(values.str.extract(r'^\s*(\d+(?:\.\d+)?)', expand=False), errors='coerce')
+
+
+def parse_finished(values):
+    parts = values.str.extract(FINISHED_PATTERN)
+    return pd.to_datetime(parts['month'] + ' ' + parts['day'] + ' ' + parts['year'], format='%b %d %Y',
+                          errors='coerce')
+
+
+def typed(chunk):
+    """Convert one chunk of export text into typed columns named as in ``COLUMNS``."""
+    text = {name: chunk[column] for name, column in COLUMNS.items()}
+    return pd.DataFrame({
+        'docket': text['docket'],
+        'court': text['court'],
+        'case_type': text['case_type'],
+        'status': text['status'],
+        'law_firm': text['law_firm'],
+        'judge': text['judge'],
+        'started': pd.to_datetime(text['started'], format='%m/%d/%Y', errors='coerce'),
+        'finished': parse_finished(text['finished']),
+        'duration': pd.to_numeric(text['duration'], errors='coerce').astype('float64'),
+        'original_loan': parse_money(text['original_loan']),
+        'outstanding_debt': parse_money(text['outstanding_debt']),
+        'debt_ratio': parse_ratio(text['debt_ratio']),
+    }, index=chunk.index)
+
+
+def read_dockets(path, chunksize=CHUNKSIZE):
+    """Yield typed chunks of one docket export."""
+    # From the store or the columnar cache, dates, durations and loan amounts come back already parsed
+    if store.enabled():
+        chunks = store.read_batches(path, list(COLUMNS.values()), chunksize, typed=True)
+    elif columnar_cache.available():
+        chunks = columnar_cache.read_batches(path, list(COLUMNS.values()), chunksize, typed=True)
+    else:
+        chunks = pd.read_csv(path, usecols=list(COLUMNS.values()), dtype=str, chunksize=chunksize)
+    for chunk in chunks:
+        yield typed(chunk)
+
+
+def duration_days(frame):
+    days = (frame['finished'] - frame['started']).dt.days.astype('float64')
+    # The exported duration is filled in for only a few dockets; it covers those missing a date
+    return days.fillna(frame['duration'])
+
+
+def debt_ratios(frame):
+    ratios = frame['outstanding_debt'] / frame['original_loan']
+    return ratios.fillna(frame['debt_ratio'])
+
+
+def histogram(values, edges, counts=None):
+    """Count ``values`` (weighted by ``counts``) into bins ``[edges[i], edges[i + 1])``.
+
+    Edges may be any increasing sequence, including ``-inf`` and ``inf`` for
+    open-ended bins; values outside every bin are dropped.
+    """
+    values = np.asarray(values, dtype=float)
+    edges = np.asarray(edges, dtype=float)
+    weights = np.ones(len(values)) if counts is None else np.asarray(counts, dtype=float)
+    slots = np.searchsorted(edges, values, side='right') - 1
+    inside = (slots >= 0) & (slots < len(edges) - 1)
+    binned = np.bincount(slots[inside], weights=weights[inside], minlength=len(edges) - 1)
+    return [{'low': low, 'high': high, 'count': int(count)}
+            for low, high, count in zip(edges[:-1].tolist(), edges[1:].tolist(), binned)]
+
+
+class DocketAggregates:
+    def __init__(self):
+        self.cases = 0
+        self.duration = Extent()
+        self.original_loan = Extent()
+        self.outstanding_debt = Extent()
+        self.debt_ratio = Extent()
+        self.case_types = Counter()
+        self.statuses = Counter()
+        self.duration_days = Counter()
+        self.court_durations = {}
+        self.sketches = {name: TopK() for name in TOP}
+        # Keys of every docket counted, loaded from the key files when needed
+        self.dockets = set()
+        # Keys added since the aggregates were loaded, for the key file
+        self.added = []
+        # Length of the key file that belongs to these aggregates
+        self.keys_bytes = 0
+        self.sources = []
+
+    def add_chunk(self, frame):
+        """Fold in one ``typed`` chunk; dockets already counted are skipped."""
+        keys = frame['court'].fillna('') + '|' + frame['docket'].fillna('')
+        fresh = ~keys.isin(self.dockets) & ~keys.duplicated()
+        frame, keys = frame[fresh], keys[fresh]
+        self.dockets.update(keys)
+        self.added.extend(keys)
+        self.cases += len(frame)
+
+        days = duration_days(frame)
+        self.duration.update(days)
+        self.duration_days.update(days.dropna().astype(int).value_counts().to_dict())
+        per_court = days.groupby(frame['court']).agg(['count', 'sum', 'min', 'max'])
+        for court, row in per_court[per_court['count'] > 0].iterrows():
+            self.court_durations.setdefault(court, Extent()).merge(
+                Extent(int(row['count']), float(row['sum']), float(row['min']), float(row['max'])))
+        self.original_loan.update(frame['original_loan'])
+        self.outstanding_debt.update(frame['outstanding_debt'])
+        self.debt_ratio.update(debt_ratios(frame))
+        self.case_types.update(frame['case_type'].dropna().value_counts().to_dict())
+        self.statuses.update(frame['status'].dropna().value_counts().to_dict())
+
+        self.count('courts', frame['court'])
+        self.count('judges', frame['judge'])
+        firms = frame['law_firm'].dropna()
+        self.count('law_firms', normalize_names(firms), firms)
+
+    def count(self, sketch, keys, spellings=None):
+        keys = keys.dropna()
+        keys = keys[keys != '']
+        grouped = None
+        if spellings is not None:
+            grouped = pd.DataFrame({'key': keys, 'spelling': spellings}).value_counts().to_dict()
+        self.sketches[sketch].update(keys.value_counts().to_dict(), grouped)
+
+    def merge(self, other):
+        """Combine with aggregates of a disjoint set of dockets."""
+        self.cases += other.cases
+        for name in ('duration', 'original_loan', 'outstanding_debt', 'debt_ratio'):
+            getattr(self, name).merge(getattr(other, name))
+        self.case_types.update(other.case_types)
+        self.statuses.update(other.statuses)
+        self.duration_days.update(other.duration_days)
+        for court, extent in other.court_durations.items():
+            self.court_durations.setdefault(court, Extent()).merge(extent)
+        for name, sketch in other.sketches.items():
+            self.sketches[name].merge(sketch)
+        self.dockets |= other.dockets
+        self.added += other.added
+        self.sources += [source for source in other.sources if source not in self.sources]
+
+    def duration_histogram(self, edges):
+        days = sorted(self.duration_days)
+        return histogram(days, edges, [self.duration_days[day] for day in days])
+
+    def summary(self, edges=None):
+        distribution = self.duration_histogram([low for low, _ in DURATION_BUCKETS] + [np.inf])
+        summary = {
+            'total_cases': self.cases,
+            'avg_duration_days': round(self.duration.mean(), 1),
+            'min_duration_days': int(self.duration.low) if self.duration.count else None,
+            'max_duration_days': int(self.duration.high) if self.duration.count else None,
+            'avg_debt_ratio': round(self.debt_ratio.mean(), 4),
+            'total_original_loan': round(self.original_loan.total, 2),
+            'total_outstanding_debt': round(self.outstanding_debt.total, 2),
+            'avg_original_loan': round(self.original_loan.mean(), 2),
+            'avg_outstanding_debt': round(self.outstanding_debt.mean(), 2),
+            'top_courts': self.sketches['courts'].top(TOP['courts']),
+            'top_law_firms': self.sketches['law_firms'].top(TOP['law_firms']),
+            'top_judges': self.sketches['judges'].top(TOP['judges']),
+            'case_types': dict(self.case_types.most_common()),
+            'statuses': dict(self.statuses.most_common()),
+            'duration_distribution': {label: row['count'] for (_, label), row in zip(DURATION_BUCKETS, distribution)},
+            'court_duration_avg': {
+                court: {'average_days': round(extent.mean(), 1), 'case_count': extent.count,
+                        'min_days': int(extent.low), 'max_days': int(extent.high)}
+                for court, extent in sorted(self.court_durations.items(), key=lambda item: -item[1].count)
+            },
+        }
+        if edges is not None:
+            summary['duration_histogram'] = self.duration_histogram(edges)
+        return summary
+
+    def to_dict(self):
+        return {
+            'version': STATE_VERSION,
+            'cases': self.cases,
+            'extents': {name: getattr(self, name).to_dict()
+                        for name in ('duration', 'original_loan', 'outstanding_debt', 'debt_ratio')},
+            'case_types': dict(self.case_types),
+            'statuses': dict(self.statuses),
+            'duration_days': {str(day): count for day, count in self.duration_days.items()},
+            'court_durations': {court: extent.to_dict() for court, extent in self.court_durations.items()},
+            'sketches': {name: sketch.to_dict() for name, sketch in self.sketches.items()},
+            'sources': self.sources,
+            'keys_bytes': self.keys_bytes,
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        aggregates = cls()
+        aggregates.cases = data['cases']
+        for name, extent in data['extents'].items():
+            setattr(aggregates, name, Extent.from_dict(extent))
+        aggregates.case_types = Counter(data['case_types'])
+        aggregates.statuses = Counter(data['statuses'])
+        aggregates.duration_days = Counter({int(day): count for day, count in data['duration_days'].items()})
+        aggregates.court_durations = {court: Extent.from_dict(extent)
+                                      for court, extent in data['court_durations'].items()}
+        aggregates.sketches = {name: TopK.from_dict(sketch) for name, sketch in data['sketches'].items()}
+        aggregates.sources = data['sources']
+        aggregates.keys_bytes = data['keys_bytes']
+        return aggregates
+
+
+def key_path(state_file):
+    return os.path.splitext(state_file)[0] + '.keys'
+
+
+def load_state(path):
+    if not os.path.exists(path):
+        return DocketAggregates()
+    with open(path, encoding='utf-8') as f:
+        data = json.load(f)
+    if data.get('version') != STATE_VERSION:
+        return DocketAggregates()
+    return DocketAggregates.from_dict(data)
+
+
+def load_keys(path):
+    with open(path, encoding='utf-8') as f:
+        return set(f.read().splitlines())
+
+
+def sync_keys(path, size):
+    """Cut the key file back to ``size`` bytes, dropping keys of a run whose state was never saved."""
+    with open(path, 'ab') as f:
+        if f.tell() > size:
+            f.truncate(size)
+
+
+def append_keys(path, keys):
+    """Append ``keys`` and return the key file's new length."""
+    with open(path, 'a', encoding='utf-8') as f:
+        f.writelines(f'{key}\n' for key in keys)
+    return os.path.getsize(path)
+
+
+def fold_export(aggregates, path, chunksize=CHUNKSIZE):
+    """Add one export unless its content was folded in before; returns whether it was."""
+    digest = file_digest(path)
+    if digest in aggregates.sources:
+        return False
+    for frame in read_dockets(path, chunksize):
+        aggregates.add_chunk(frame)
+    aggregates.sources.append(digest)
+    return True
+
+
+def update(law_dir=LAW_DIR, exports=None, state_file=None, rebuild=False, edges=None):
+    """Fold new exports into the saved aggregates and rewrite the summary.
+
+    Only exports not folded before are read, and only then are the keys of
+    earlier dockets loaded to skip repeats; the key file is appended to with
+    the new keys and the state file rewritten with the aggregates alone.
+    """
+    state_file = state_file or STATE_FILE
+    keys_file = key_path(state_file)
+    aggregates = DocketAggregates() if rebuild else load_state(state_file)
+    os.makedirs(os.path.dirname(state_file), exist_ok=True)
+    # Fresh aggregates own no keys, so a rebuild starts the key file over
+    sync_keys(keys_file, aggregates.keys_bytes)
+    exports = exports or sorted(glob.glob(os.path.join(law_dir, EXPORT_PATTERN)))
+    fresh = [path for path in exports if file_digest(path) not in aggregates.sources]
+    if fresh:
+        aggregates.dockets = load_keys(keys_file)
+    folded = [path for path in fresh if fold_export(aggregates, path)]
+    # The state records how much of the key file it covers, so keys from a
+    # run that dies before the state is written are cut off next time
+    aggregates.keys_bytes = append_keys(keys_file, aggregates.added)
+    write_json(state_file, aggregates.to_dict())
+    summary = aggregates.summary(edges)
+    with open(os.path.join(law_dir, SUMMARY_FILE), 'w', encoding='utf-8') as f:
+        json.dump(summary, f, indent=2, ensure_ascii=False)
+    return folded, summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('exports', nargs='*', help=f'export CSVs (default: {EXPORT_PATTERN} in --law-dir)')
+    parser.add_argument('--law-dir', default=LAW_DIR)
+    parser.add_argument('--state', default=STATE_FILE, help='where the running aggregates are kept')
+    parser.add_argument('--rebuild', action='store_true', help='discard saved aggregates and refold every export')
+    parser.add_argument('--bins', type=float, nargs='+', metavar='DAYS',
+                        help='also write duration_histogram over these bin edges (inf allowed)')
+    args = parser.parse_args()
+    folded, summary = update(args.law_dir, args.exports, args.state, args.rebuild, args.bins)
+    print(json.dumps({'folded': [os.path.basename(path) for path in folded],
+                      'total_cases': summary['total_cases']}))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,545 @@
+"""Enrich dataset rows from HTTP sources concurrently, with a persistent response cache.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m report_builder.enrichment "../Intracom/IC_Intracom_Installers_Targeted_1.5k.csv" \\
+        --provider website --output output/installers_enriched.csv
+    python -m report_builder.enrichment leads.csv --provider-config zoominfo.json --rate 2 --output out.csv
+    python -m report_builder.enrichment --evict
+
+A provider turns a row into the requests it needs and the responses back
+into new columns. ``website`` reads each company's home page for its title
+and meta description, which is what industry classification starts from.
+``--provider-config`` loads a JSON API provider (ZoomInfo, D&B and the
+like) from a file::
+
+    {
+      "name": "company_api",
+      "url": "https://api.example.com/v1/companies?domain={Company Domain}",
+      "headers": {"Authorization": "Bearer ${COMPANY_API_TOKEN}"},
+      "fields": {"Industry": "data.industry", "Employees": "data.employee_count"}
+    }
+
+``{Column}`` placeholders are filled from the row (URL-quoted), ``${VAR}``
+from the environment, and ``fields`` maps new columns to dotted paths into
+the JSON response. Pointing ``url`` at ``http://127.0.0.1:<port>`` runs a
+provider against a local stub server.
+
+Requests run on an asyncio loop. Blocking ``http.client`` calls go to a
+thread pool and reuse keep-alive connections, pooled per host. Each host
+gets its own concurrency limit and minimum spacing between requests
+(``--concurrency``, ``--rate``). Connection errors, 429 and 5xx responses
+are retried with exponential backoff and jitter; ``Retry-After`` is honoured
+and also pauses the rest of that host's queue. Redirects are followed up to
+``MAX_REDIRECTS`` hops to http(s) URLs, never from https down to http, and
+secret headers are dropped when the host changes. Successful responses are kept
+under the cache root: request files named by the SHA-256 of method, URL,
+headers and body point to body files named by the SHA-256 of the content,
+so identical bodies are stored once. Entries older than ``--ttl-days`` are
+refetched, and ``--evict`` deletes them along with bodies nothing points
+to. Identical requests in flight at the same time share one fetch. A
+redirected request is cached under its own key too, so the next run skips
+the redirect hops.
+"""
+import argparse
+import asyncio
+import hashlib
+import html
+import http.client
+import json
+import os
+import random
+import re
+import threading
+import time
+from collections import Counter, defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from urllib.parse import quote, urljoin, urlsplit
+
+import pandas as pd
+
+from . import columnar_cache
+from .columnar_cache import read_meta, write_json
+from .entities import normalize_domains
+from .store import COMPANY_FIELDS
+
+CACHE_DIR = os.path.join(os.path.dirname(columnar_cache.CACHE_ROOT), 'enrichment')
+TTL_DAYS = 30
+CONCURRENCY = 4
+RETRIES = 4
+BACKOFF = 0.5
+TIMEOUT = 30
+MAX_THREADS = 32
+BATCH_ROWS = 1000
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+REDIRECT_STATUSES = {301, 302, 303, 307, 308}
+MAX_REDIRECTS = 5
+# Not-found answers are worth remembering too; other errors are retried next run
+CACHEABLE_STATUSES = {404, 410}
+# Left out of cache keys so rotating a token does not invalidate the cache
+SECRET_HEADERS = {'authorization', 'cookie', 'x-api-key'}
+USER_AGENT = 'report-builder-enrichment/1.0'
+
+
+@dataclass(frozen=True)
+class Request:
+    url: str
+    method: str = 'GET'
+    headers: tuple = ()
+    body: bytes = None
+
+    @property
+    def host(self):
+        return urlsplit(self.url).netloc
+
+
+@dataclass
+class Response:
+    status: int
+    headers: dict
+    body: bytes
+    cached: bool = False
+
+    def text(self):
+        return self.body.decode('utf-8', 'replace')
+
+    def json(self):
+        return json.loads(self.body)
+
+
+class ResponseCache:
+    """Content-addressed response store with TTL expiry."""
+
+    def __init__(self, root=None, ttl_days=TTL_DAYS):
+        self.root = root or CACHE_DIR
+        self.ttl = ttl_days * 86400
+
+    @staticmethod
+    def key(request):
+        headers = sorted((name.lower(), value) for name, value in request.headers
+                         if name.lower() not in SECRET_HEADERS)
+        digest = hashlib.sha256(json.dumps([request.method, request.url, headers]).encode())
+        digest.update(request.body or b'')
+        return digest.hexdigest()
+
+    def path(self, kind, digest):
+        return os.path.join(self.root, kind, digest[:2], digest)
+
+    def get(self, request):
+        entry = read_meta(self.path('requests', self.key(request)))
+        if entry is None or time.time() - entry['stored'] > self.ttl:
+            return None
+        try:
+            with open(self.path('bodies', entry['body']), 'rb') as f:
+                body = f.read()
+        except FileNotFoundError:
+            return None
+        return Response(entry['status'], entry['headers'], body, cached=True)
+
+    def put(self, request, response):
+        digest = hashlib.sha256(response.body).hexdigest()
+        body_path = self.path('bodies', digest)
+        if not os.path.exists(body_path):
+            os.makedirs(os.path.dirname(body_path), exist_ok=True)
+            tmp = f'{body_path}.{os.getpid()}.{threading.get_ident()}.tmp'
+            with open(tmp, 'wb') as f:
+                f.write(response.body)
+            os.replace(tmp, body_path)
+        entry_path = self.path('requests', self.key(request))
+        os.makedirs(os.path.dirname(entry_path), exist_ok=True)
+        write_json(entry_path, {'url': request.url, 'status': response.status, 'headers': response.headers,
+                                'body': digest, 'stored': time.time()})
+
+    def evict(self):
+        """Delete expired entries and unreferenced bodies; returns the counts removed."""
+        removed = Counter()
+        live = set()
+        now = time.time()
+        for directory, _, names in os.walk(os.path.join(self.root, 'requests')):
+            for name in names:
+                path = os.path.join(directory, name)
+                entry = read_meta(path)
+                if entry is None or now - entry['stored'] > self.ttl:
+                    os.remove(path)
+                    removed['requests'] += 1
+                else:
+                    live.add(entry['body'])
+        for directory, _, names in os.walk(os.path.join(self.root, 'bodies')):
+            for name in names:
+                if name not in live:
+                    os.remove(os.path.join(directory, name))
+                    removed['bodies'] += 1
+        return dict(removed)
+
+
+class ConnectionPool:
+    """Keep-alive ``http.client`` connections, reused per scheme and host."""
+
+    def __init__(self, per_host=CONCURRENCY, timeout=TIMEOUT):
+        self.per_host = per_host
+        self.timeout = timeout
+        self.idle = defaultdict(list)
+        self.lock = threading.Lock()
+
+    def acquire(self, scheme, host):
+        with self.lock:
+            if self.idle[scheme, host]:
+                return self.idle[scheme, host].pop()
+        connection = http.client.HTTPSConnection if scheme == 'https' else http.client.HTTPConnection
+        return connection(host, timeout=self.timeout)
+
+    def release(self, scheme, host, connection, reusable):
+        with self.lock:
+            if reusable and len(self.idle[scheme, host]) < self.per_host:
+                self.idle[scheme, host].append(connection)
+                return
+        connection.close()
+
+    def request(self, request):
+        parts = urlsplit(request.url)
+        path = (parts.path or '/') + (f'?{parts.query}' if parts.query else '')
+        headers = dict({'User-Agent': USER_AGENT}, **dict(request.headers))
+        connection = self.acquire(parts.scheme, parts.netloc)
+        try:
+            connection.request(request.method, path, request.body, headers)
+            response = connection.getresponse()
+            body = response.read()
+        except (OSError, http.client.HTTPException):
+            connection.close()
+            raise
+        self.release(parts.scheme, parts.netloc, connection, not response.will_close)
+        return Response(response.status, dict(response.getheaders()), body)
+
+    def close(self):
+        with self.lock:
+            for connections in self.idle.values():
+                for connection in connections:
+                    connection.close()
+            self.idle.clear()
+
+
+class HostLimit:
+    """At most ``concurrency`` requests in flight and ``rate`` starts per second for one host."""
+
+    def __init__(self, concurrency, rate=None):
+        self.semaphore = asyncio.Semaphore(concurrency)
+        self.interval = 1 / rate if rate else 0.0
+        self.next_start = 0.0
+        self.lock = asyncio.Lock()
+
+    async def wait_turn(self):
+        loop = asyncio.get_running_loop()
+        async with self.lock:
+            now = loop.time()
+            start = max(now, self.next_start)
+            self.next_start = start + self.interval
+        await asyncio.sleep(start - now)
+
+    def pause(self, seconds):
+        self.next_start = max(self.next_start, asyncio.get_running_loop().time() + seconds)
+
+
+def redirect_request(request, response):
+    """The request a 3xx ``response`` points to, or None when it may not be followed."""
+    location = next((value for name, value in response.headers.items() if name.lower() == 'location'), None)
+    if not location:
+        return None
+    url = urljoin(request.url, location.strip())
+    source, target = urlsplit(request.url), urlsplit(url)
+    if target.scheme not in ('http', 'https') or (source.scheme == 'https' and target.scheme == 'http'):
+        return None
+    headers = request.headers
+    if target.netloc != source.netloc:
+        # Credentials belong to the host they were configured for
+        headers = tuple((name, value) for name, value in headers if name.lower() not in SECRET_HEADERS)
+    if response.status == 303 or (response.status in (301, 302) and request.method == 'POST'):
+        return Request(url, 'GET', headers)
+    return Request(url, request.method, headers, request.body)
+
+
+def retry_after(response):
+    value = response.headers.get('Retry-After') if response is not None else None
+    try:
+        return min(float(value), 300.0) if value is not None else None
+    except ValueError:
+        return None
+
+
+class Fetcher:
+    def __init__(self, cache=None, concurrency=CONCURRENCY, rate=None, retries=RETRIES, backoff=BACKOFF,
+                 timeout=TIMEOUT, limits=None):
+        self.cache = cache
+        self.concurrency = concurrency
+        self.rate = rate
+        self.retries = retries
+        self.backoff = backoff
+        # Per-host overrides: {"api.example.com": {"concurrency": 2, "rate": 1}}
+        self.overrides = limits or {}
+        self.limits = {}
+        self.pool = ConnectionPool(concurrency, timeout)
+        self.executor = ThreadPoolExecutor(max_workers=MAX_THREADS, thread_name_prefix='enrichment')
+        self.in_flight = {}
+        self.stats = Counter()
+
+    def limit(self, host):
+        if host not in self.limits:
+            override = self.overrides.get(host, {})
+            self.limits[host] = HostLimit(override.get('concurrency', self.concurrency),
+                                          override.get('rate', self.rate))
+        return self.limits[host]
+
+    async def fetch(self, request):
+        # Rows sharing a company share one request rather than racing for the same URL
+        key = ResponseCache.key(request)
+        task = self.in_flight.get(key)
+        if task is None:
+            task = self.in_flight[key] = asyncio.ensure_future(self.fetch_once(request))
+            task.add_done_callback(lambda _: self.in_flight.pop(key, None))
+        else:
+            self.stats['coalesced'] += 1
+        return await asyncio.shield(task)
+
+    async def fetch_once(self, request, redirects=MAX_REDIRECTS):
+        if self.cache:
+            cached = self.cache.get(request)
+            if cached is not None:
+                self.stats['cache_hits'] += 1
+                return cached
+        loop = asyncio.get_running_loop()
+        limit = self.limit(request.host)
+        for attempt in range(self.retries + 1):
+            response, error = None, None
+            async with limit.semaphore:
+                await limit.wait_turn()
+                self.stats['requests'] += 1
+                try:
+                    response = await loop.run_in_executor(self.executor, self.pool.request, request)
+                except (OSError, http.client.HTTPException) as exc:
+                    error = exc
+            if response is not None and response.status not in RETRY_STATUSES:
+                break
+            if attempt == self.retries:
+                self.stats['failures'] += 1
+                if error is not None:
+                    raise error
+                return response
+            self.stats['retries'] += 1
+            delay = retry_after(response)
+            if delay is not None:
+                limit.pause(delay)
+            else:
+                delay = self.backoff * 2 ** attempt * (0.5 + random.random())
+            await asyncio.sleep(delay)
+        if response.status in REDIRECT_STATUSES and redirects:
+            target = redirect_request(request, response)
+            if target is not None:
+                self.stats['redirects'] += 1
+                # Not through fetch: a redirect loop would wait on its own in-flight task
+                response = await self.fetch_once(target, redirects - 1)
+        if self.cache and (200 <= response.status < 300 or response.status in CACHEABLE_STATUSES):
+            self.cache.put(request, response)
+        return response
+
+    def close(self):
+        self.executor.shutdown(wait=False)
+        self.pool.close()
+
+
+class Provider:
+    """Maps a row to the requests it needs and their responses to new columns."""
+
+    name = None
+    columns = []
+
+    def requests(self, row):
+        return []
+
+    def parse(self, row, responses):
+        """``responses`` line up with ``requests(row)``; failed fetches are exceptions."""
+        return {}
+
+
+TITLE_PATTERN = re.compile(r'<title[^>]*>(.*?)</title>', re.IGNORECASE | re.DOTALL)
+META_PATTERN = re.compile(r'<meta\s[^>]*>', re.IGNORECASE)
+ATTRIBUTE_PATTERN = re.compile(r'([\w:-]+)\s*=\s*("[^"]*"|\'[^\']*\')')
+DESCRIPTION_LENGTH = 300
+
+
+def clean_text(value):
+    return re.sub(r'\s+', ' ', html.unescape(value)).strip()
+
+
+def meta_description(page):
+    for tag in META_PATTERN.findall(page):
+        attributes = {name.lower(): value[1:-1] for name, value in ATTRIBUTE_PATTERN.findall(tag)}
+        if attributes.get('name', attributes.get('property', '')).lower() in ('description', 'og:description'):
+            return clean_text(attributes.get('content', ''))[:DESCRIPTION_LENGTH]
+    return ''
+
+
+class WebsiteProvider(Provider):
+    name = 'website'
+    columns = ['Website Title', 'Website Description', 'Website Status']
+
+    def domain(self, row):
+        for column in COMPANY_FIELDS['domain']:
+            value = row.get(column)
+            if isinstance(value, str) and value.strip():
+                return normalize_domains(pd.Series([value])).iat[0]
+        return ''
+
+    def requests(self, row):
+        domain = self.domain(row)
+        return [Request(f'https://{domain}/')] if domain else []
+
+    def parse(self, row, responses):
+        response = responses[0]
+        if not isinstance(response, Response):
+            return {'Website Status': type(response).__name__}
+        page = response.text()
+        title = TITLE_PATTERN.search(page)
+        return {
+            'Website Title': clean_text(title.group(1)) if title else '',
+            'Website Description': meta_description(page),
+            'Website Status': response.status,
+        }
+
+
+def json_path(data, path):
+    for part in path.split('.'):
+        if isinstance(data, list) and part.isdigit() and int(part) < len(data):
+            data = data[int(part)]
+        elif isinstance(data, dict) and part in data:
+            data = data[part]
+        else:
+            return None
+    return data
+
+
+class JsonApiProvider(Provider):
+    """Configured from JSON: ``url`` with ``{Column}`` placeholders, ``headers`` and ``fields``."""
+
+    PLACEHOLDER = re.compile(r'\{([^{}]+)\}')
+
+    def __init__(self, config):
+        self.name = config['name']
+        self.url = config['url']
+        self.method = config.get('method', 'GET')
+        self.headers = tuple((name, os.path.expandvars(value)) for name, value in config.get('headers', {}).items())
+        self.fields = config['fields']
+        self.columns = list(self.fields)
+
+    def requests(self, row):
+        values = {}
+        for column in self.PLACEHOLDER.findall(self.url):
+            value = row.get(column)
+            if not isinstance(value, str) or not value.strip():
+                return []
+            values[column] = quote(value.strip(), safe='')
+        url = self.PLACEHOLDER.sub(lambda match: values[match.group(1)], self.url)
+        return [Request(url, self.method, self.headers)]
+
+    def parse(self, row, responses):
+        response = responses[0]
+        if not isinstance(response, Response) or response.status != 200:
+            return {}
+        try:
+            data = response.json()
+        except ValueError:
+            return {}
+        return {column: json_path(data, path) for column, path in self.fields.items()}
+
+
+PROVIDERS = {
+    'website': WebsiteProvider,
+}
+
+
+async def enrich_row(fetcher, provider, row):
+    requests = provider.requests(row)
+    if not requests:
+        return {}
+    responses = await asyncio.gather(*(fetcher.fetch(request) for request in requests), return_exceptions=True)
+    return provider.parse(row, responses)
+
+
+async def enrich_frame(frame, providers, fetcher):
+    """Return ``frame`` with every provider's columns added."""
+    records = frame.astype(object).where(frame.notna(), None).to_dict('records')
+    results = [{} for _ in records]
+    # Batches keep the number of pending coroutines bounded on large lists
+    for start in range(0, len(records), BATCH_ROWS):
+        batch = range(start, min(start + BATCH_ROWS, len(records)))
+        jobs = [(index, provider) for index in batch for provider in providers]
+        values = await asyncio.gather(*(enrich_row(fetcher, provider, records[index]) for index, provider in jobs))
+        for (index, _), columns in zip(jobs, values):
+            results[index].update(columns)
+    added = pd.DataFrame(results, index=frame.index,
+                         columns=[column for provider in providers for column in provider.columns])
+    return pd.concat([frame, added], axis=1)
+
+
+def enrich(frame, providers, cache=None, **fetcher_options):
+    fetcher = Fetcher(cache, **fetcher_options)
+    try:
+        return asyncio.run(enrich_frame(frame, providers, fetcher)), dict(fetcher.stats)
+    finally:
+        fetcher.close()
+
+
+def load_provider(name=None, config_path=None):
+    if config_path:
+        with open(config_path, encoding='utf-8') as f:
+            return JsonApiProvider(json.load(f))
+    try:
+        return PROVIDERS[name]()
+    except KeyError:
+        raise ValueError(f'Unknown provider {name!r}; choose from {sorted(PROVIDERS)}') from None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('source', nargs='?', help='CSV to enrich')
+    parser.add_argument('--output', help='enriched CSV to write')
+    parser.add_argument('--provider', action='append', default=[], choices=sorted(PROVIDERS))
+    parser.add_argument('--provider-config', action='append', default=[], help='JSON API provider definition')
+    parser.add_argument('--limit', type=int, help='only the first N rows')
+    parser.add_argument('--concurrency', type=int, default=CONCURRENCY, help='requests in flight per host')
+    parser.add_argument('--rate', type=float, help='request starts per second per host')
+    parser.add_argument('--host-limits', help='JSON file of per-host {"concurrency": n, "rate": r} overrides')
+    parser.add_argument('--retries', type=int, default=RETRIES)
+    parser.add_argument('--timeout', type=float, default=TIMEOUT)
+    parser.add_argument('--cache', default=CACHE_DIR)
+    parser.add_argument('--ttl-days', type=float, default=TTL_DAYS)
+    parser.add_argument('--no-cache', action='store_true')
+    parser.add_argument('--evict', action='store_true', help='remove expired cache entries and exit')
+    args = parser.parse_args()
+
+    cache = None if args.no_cache else ResponseCache(args.cache, args.ttl_days)
+    if args.evict:
+        print(json.dumps({'evicted': cache.evict() if cache else {}}))
+        return
+    if not args.source or not args.output:
+        parser.error('source and --output are required unless --evict is given')
+    providers = [load_provider(name) for name in args.provider]
+    providers += [load_provider(config_path=path) for path in args.provider_config]
+    if not providers:
+        parser.error('give at least one --provider or --provider-config')
+    limits = None
+    if args.host_limits:
+        with open(args.host_limits, encoding='utf-8') as f:
+            limits = json.load(f)
+
+    frame = pd.read_csv(args.source, dtype=str, keep_default_na=False, nrows=args.limit)
+    start = time.perf_counter()
+    enriched, stats = enrich(frame, providers, cache, concurrency=args.concurrency, rate=args.rate,
+                             retries=args.retries, timeout=args.timeout, limits=limits)
+    os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+    enriched.to_csv(args.output, index=False)
+    print(json.dumps(dict(stats, rows=len(enriched), output=args.output,
+                          seconds=round(time.perf_counter() - start, 3))))
+
+
+if __name__ == '__main__':
+    main()
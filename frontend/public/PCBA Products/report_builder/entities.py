@@ -0,0 +1,223 @@
+"""Entity resolution across lead lists.
+
+Names, domains, states, people and LinkedIn URLs are normalised with
+vectorised string operations. Rows sharing an exact key (a non-generic
+domain, a LinkedIn URL) are merged outright, however many there are.
+Fuzzy candidate pairs come only from blocks of state plus each name's
+rarest character trigrams and are compared inside those blocks, so the work
+stays close to linear in the number of rows instead of comparing every pair.
+A fuzzy block larger than ``MAX_BLOCK`` is skipped and counted in
+``stats``. Matches are merged with union-find.
+"""
+import re
+from collections import Counter, defaultdict
+from difflib import SequenceMatcher
+from itertools import combinations
+
+import numpy as np
+
+NAME_THRESHOLD = 0.92
+BLOCK_TRIGRAMS = 3
+# Fuzzy blocks beyond this many rows would cost ~20,000 comparisons each
+MAX_BLOCK = 200
+
+LEGAL_SUFFIXES = re.compile(
+    r'\b(inc|incorporated|llc|l l c|ltd|limited|corp|corporation|co|company|lp|llp|plc|gmbh|pllc|pc)\b')
+# Domains shared by unrelated companies say nothing about identity
+GENERIC_DOMAINS = {'gmail.com', 'yahoo.com', 'hotmail.com', 'outlook.com', 'aol.com', 'icloud.com',
+                   'linkedin.com', 'facebook.com', 'imdb.com', 'google.com'}
+TITLE_ABBREVIATIONS = {
+    r'\bdir\b': 'director', r'\bmgr\b': 'manager', r'\bvp\b': 'vice president',
+    r'\bsr\b': 'senior', r'\bjr\b': 'junior', r'\bassoc\b': 'associate',
+    r'\bexec\b': 'executive', r'\bops\b': 'operations', r'\bproc\b': 'procurement',
+}
+US_STATES = {
+    'AL': 'Alabama', 'AK': 'Alaska', 'AZ': 'Arizona', 'AR': 'Arkansas', 'CA': 'California',
+    'CO': 'Colorado', 'CT': 'Connecticut', 'DE': 'Delaware', 'FL': 'Florida', 'GA': 'Georgia',
+    'HI': 'Hawaii', 'ID': 'Idaho', 'IL': 'Illinois', 'IN': 'Indiana', 'IA': 'Iowa',
+    'KS': 'Kansas', 'KY': 'Kentucky', 'LA': 'Louisiana', 'ME': 'Maine', 'MD': 'Maryland',
+    'MA': 'Massachusetts', 'MI': 'Michigan', 'MN': 'Minnesota', 'MS': 'Mississippi',
+    'MO': 'Missouri', 'MT': 'Montana', 'NE': 'Nebraska', 'NV': 'Nevada', 'NH': 'New Hampshire',
+    'NJ': 'New Jersey', 'NM': 'New Mexico', 'NY': 'New York', 'NC': 'North Carolina',
+    'ND': 'North Dakota', 'OH': 'Ohio', 'OK': 'Oklahoma', 'OR': 'Oregon', 'PA': 'Pennsylvania',
+    'RI': 'Rhode Island', 'SC': 'South Carolina', 'SD': 'South Dakota', 'TN': 'Tennessee',
+    'TX': 'Texas', 'UT': 'Utah', 'VT': 'Vermont', 'VA': 'Virginia', 'WA': 'Washington',
+    'WV': 'West Virginia', 'WI': 'Wisconsin', 'WY': 'Wyoming', 'DC': 'District of Columbia',
+}
+STATE_CODES = {name.lower(): code for code, name in US_STATES.items()}
+STATE_NAME_PATTERN = '(' + '|'.join(sorted(map(re.escape, STATE_CODES), key=len, reverse=True)) + ')'
+
+
+def text(values):
+    return values.fillna('').astype(str)
+
+
+def normalize_names(values):
+    names = text(values).str.lower().str.replace('&', ' and ', regex=False)
+    names = names.str.replace(r'[^\w\s]', ' ', regex=True)
+    names = names.str.replace(LEGAL_SUFFIXES, ' ', regex=True)
+    return names.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def normalize_people(values):
+    people = text(values).str.lower().str.replace(r'[^\w\s]', ' ', regex=True)
+    return people.str.replace(r'\s+', ' ', regex=True).str.strip()
+
+
+def normalize_domains(values):
+    # First domain of the cell, without scheme, "www." or path
+    domains = text(values).str.lower().str.strip().str.split(r'[\s,;|]+', regex=True).str[0].fillna('')
+    domains = domains.str.replace(r'^[a-z]+://', '', regex=True).str.replace(r'^www\.', '', regex=True)
+    return domains.str.split('/').str[0].fillna('')
+
+
+def normalize_linkedin(values):
+    urls = text(values).str.lower().str.strip()
+    urls = urls.str.replace(r'^https?://([a-z]{2,3}\.)?(www\.)?', '', regex=True)
+    return urls.str.rstrip('/')
+
+
+def normalize_states(values):
+    # Accepts "MO", "Missouri" or "Englewood, Colorado, United States"
+    values = text(values).str.strip()
+    codes = values.str.upper().where(values.str.upper().isin(US_STATES), '')
+    names = values.str.lower().str.extract(r'\b' + STATE_NAME_PATTERN + r'\b', expand=False)
+    return codes.where(codes != '', names.map(STATE_CODES).fillna(''))
+
+
+def normalize_title(title):
+    key = re.sub(r'[^\w\s]', ' ', title.lower())
+    for pattern, replacement in TITLE_ABBREVIATIONS.items():
+        key = re.sub(pattern, replacement, key)
+    return re.sub(r'\s+', ' ', key).strip()
+
+
+def merge_titles(values):
+    # "Global Supply Chain Dir." and "Global Supply Chain Director" are one title
+    merged = {}
+    for cell in values.dropna():
+        for title in re.split(r';|\n', str(cell)):
+            title = title.strip()
+            key = normalize_title(title)
+            if key and len(title) > len(merged.get(key, '')):
+                merged[key] = title
+    return '; '.join(merged.values())
+
+
+class UnionFind:
+    def __init__(self, size):
+        self.parent = list(range(size))
+
+    def find(self, item):
+        parent = self.parent
+        while parent[item] != item:
+            parent[item] = parent[parent[item]]
+            item = parent[item]
+        return item
+
+    def union(self, a, b):
+        a, b = self.find(a), self.find(b)
+        if a != b:
+            self.parent[max(a, b)] = min(a, b)
+
+    def labels(self):
+        return np.array([self.find(item) for item in range(len(self.parent))])
+
+
+def trigrams(name):
+    compact = name.replace(' ', '')
+    return {compact[i:i + 3] for i in range(len(compact) - 2)}
+
+
+def name_blocks(names, states):
+    # Block on state plus each name's rarest trigrams: rare grams make small blocks
+    grams = [trigrams(name) for name in names]
+    frequency = Counter(gram for record in grams for gram in record)
+    blocks = defaultdict(list)
+    for row, (record, state) in enumerate(zip(grams, states)):
+        for gram in sorted(record, key=lambda gram: (frequency[gram], gram))[:BLOCK_TRIGRAMS]:
+            blocks[(state, gram)].append(row)
+    return blocks.values()
+
+
+def exact_blocks(keys):
+    blocks = defaultdict(list)
+    for row, key in enumerate(keys):
+        if key:
+            blocks[key].append(row)
+    return blocks.values()
+
+
+def similar(a, b, threshold):
+    if not a or not b:
+        return False
+    matcher = SequenceMatcher(None, a, b)
+    return matcher.quick_ratio() >= threshold and matcher.ratio() >= threshold
+
+
+def resolve_companies(names, domains=None, states=None, threshold=NAME_THRESHOLD, stats=None):
+    """Return a company cluster label per row.
+
+    ``stats``, a ``Counter`` when given, gets ``skipped_blocks`` and
+    ``skipped_rows`` for fuzzy blocks too large to compare pairwise.
+    """
+    names = list(normalize_names(names))
+    domains = list(normalize_domains(domains)) if domains is not None else [''] * len(names)
+    states = list(normalize_states(states)) if states is not None else [''] * len(names)
+    clusters = UnionFind(len(names))
+    stats = Counter() if stats is None else stats
+
+    # One company per site: exact keys need no pairwise compare, so no cap
+    for block in exact_blocks(d if d not in GENERIC_DOMAINS else '' for d in domains):
+        for row in block[1:]:
+            clusters.union(block[0], row)
+
+    compared = set()
+    for block in name_blocks(names, states):
+        if len(block) > MAX_BLOCK:
+            stats['skipped_blocks'] += 1
+            stats['skipped_rows'] += len(block)
+            continue
+        for a, b in combinations(block, 2):
+            if (a, b) in compared or clusters.find(a) == clusters.find(b):
+                continue
+            compared.add((a, b))
+            first, second = names[a], names[b]
+            if first == second or similar(first, second, threshold):
+                clusters.union(a, b)
+    return clusters.labels()
+
+
+def resolve_contacts(companies, people=None, linkedin=None):
+    """Return a contact cluster label per row, given company cluster labels."""
+    clusters = UnionFind(len(companies))
+    keys = []
+    if linkedin is not None:
+        keys.append(list(normalize_linkedin(linkedin)))
+    if people is not None:
+        people = normalize_people(people)
+        keys.append([f'{company}|{person}' if person else '' for company, person in zip(companies, people)])
+    for column in keys:
+        for block in exact_blocks(column):
+            for row in block[1:]:
+                clusters.union(block[0], row)
+    return clusters.labels()
+
+
+def master_table(df, labels, source='Source', titles=None, name=None):
+    """Collapse rows to one per entity with provenance columns."""
+    df = df.assign(_entity=labels)
+    grouped = df.groupby('_entity', sort=False)
+    master = grouped.first()
+    columns = [column for column in df.columns if column not in ('_entity', source)]
+    master = master[columns]
+    if titles:
+        master[titles] = grouped[titles].agg(merge_titles)
+    if name:
+        master['Name Variants'] = grouped[name].agg(
+            lambda values: '; '.join(dict.fromkeys(values.dropna())) if values.nunique() > 1 else '')
+    if source in df:
+        master['Sources'] = grouped[source].agg(lambda values: '; '.join(sorted(set(values.dropna()))))
+    master['Source Rows'] = grouped.size()
+    master.insert(0, 'Entity ID', range(1, len(master) + 1))
+    return master.reset_index(drop=True)
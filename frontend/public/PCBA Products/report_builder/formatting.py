@@ -0,0 +1,53 @@
+"""Column-level formatting shared by the streaming builder and the legacy
+format step (``pipeline.format_workbook``).
+
+Widths come from one vectorised string-length pass over the source
+DataFrame, headers get a named style and body borders are a single
+conditional-format range per sheet. Body cells carry the shared
+``styles.BODY`` named style (centred vertically and wrapped, as every data
+cell was before). That is one assignment per cell, so this step is linear
+in the number of cells: Excel applies a column style only to cells created
+later, not to the data cells already written.
+"""
+import pandas as pd
+from openpyxl.formatting.rule import FormulaRule
+from openpyxl.utils import get_column_letter
+
+from . import styles
+
+MAX_COLUMN_WIDTH = 50
+
+
+def max_lengths(df):
+    # Longest rendered value per column, headers included
+    lengths = df.fillna('').astype(str).apply(lambda values: values.str.len().max())
+    headers = pd.Series([len(str(column)) for column in df.columns], index=df.columns)
+    return headers.combine(lengths.fillna(0), max)
+
+
+def widths_from_lengths(lengths):
+    return [min((int(length) + 2) * 1.2, MAX_COLUMN_WIDTH) for length in lengths]
+
+
+def column_widths(df):
+    return widths_from_lengths(max_lengths(df))
+
+
+def body_border_rule():
+    return FormulaRule(formula=['TRUE'], border=styles.border)
+
+
+def format_worksheet(ws, widths, header_row=1):
+    """Format a loaded worksheet whose table starts at ``header_row``."""
+    for idx, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+
+    for cell in ws[header_row]:
+        cell.style = styles.HEADER
+
+    if ws.max_row > header_row:
+        body = f"A{header_row + 1}:{get_column_letter(ws.max_column)}{ws.max_row}"
+        ws.conditional_formatting.add(body, body_border_rule())
+        for row in ws.iter_rows(min_row=header_row + 1):
+            for cell in row:
+                cell.style = styles.BODY
@@ -0,0 +1,157 @@
+"""Parsed HTS codes and a digit trie for prefix lookups and rollups.
+
+Codes turn up as exact (``8534.00.00.20``), wildcarded (``8534.XX.XXXX``),
+shorthand (``8548.9`` for ``8548.90``) and as lists in the ICTC exports
+(``8537.10; 8517.62``, ``8544/8548``). ``parse_codes`` reduces each to its
+known leading digits, so chapter, heading and subheading are plain slices
+and every lookup in ``HtsIndex`` walks at most ten trie nodes.
+"""
+import re
+from collections import Counter
+from dataclasses import dataclass
+
+import pandas as pd
+
+# Heading, then up to three dotted groups; X marks a wildcard digit
+CODE_PATTERN = re.compile(r'(?<![\d.])(\d{4})((?:\.[\dXx]{1,4}){0,3})')
+LEVELS = {2: 'Chapter', 4: 'Heading', 6: 'Subheading', 8: 'Tariff Line', 10: 'Statistical Suffix'}
+
+
+@dataclass(frozen=True)
+class HtsCode:
+    digits: str
+    wildcard: bool = False
+
+    @property
+    def chapter(self):
+        return self.digits[:2]
+
+    @property
+    def heading(self):
+        return self.digits[:4]
+
+    @property
+    def subheading(self):
+        return self.digits[:6] if len(self.digits) >= 6 else None
+
+    def prefix(self, level):
+        return self.digits[:level] if len(self.digits) >= level else None
+
+    def __str__(self):
+        groups = [self.digits[:4], self.digits[4:6], self.digits[6:8], self.digits[8:10]]
+        return '.'.join(group for group in groups if group)
+
+
+def parse_code(heading, groups=''):
+    digits, wildcard = heading, False
+    for group in filter(None, groups.split('.')):
+        if 'x' in group.lower():
+            wildcard = True
+            break
+        # "8548.9" is shorthand for subheading 8548.90
+        digits += group.ljust(2, '0') if len(group) == 1 else group
+    return HtsCode(digits[:10], wildcard)
+
+
+def parse_codes(text):
+    """Return every ``HtsCode`` found in a free-text cell, in order, without repeats."""
+    if text is None or (not isinstance(text, str) and pd.isna(text)):
+        return []
+    codes = []
+    for match in CODE_PATTERN.finditer(str(text)):
+        code = parse_code(match.group(1), match.group(2))
+        if code not in codes:
+            codes.append(code)
+    return codes
+
+
+def common_description(first, second):
+    # Keep the shared " - " separated head: "Printed Circuits - Other" and
+    # "Printed Circuits - Flexible type" describe "Printed Circuits"
+    shared = []
+    for a, b in zip(first.split(' - '), second.split(' - ')):
+        if a != b:
+            break
+        shared.append(a)
+    return ' - '.join(shared) or None
+
+
+class Node:
+    __slots__ = ('children', 'description', 'references', 'count', 'value')
+
+    def __init__(self):
+        self.children = {}
+        self.description = None
+        self.references = 0
+        self.count = 0
+        self.value = 0.0
+
+    @property
+    def reference(self):
+        return self.references > 0
+
+
+class HtsIndex:
+    """Digit trie over reference HTS codes that also accumulates rollups."""
+
+    def __init__(self):
+        self.root = Node()
+
+    @classmethod
+    def from_reference(cls, table, code_column='HTS Code', description_column='Description'):
+        index = cls()
+        for code_text, description in zip(table[code_column], table[description_column]):
+            for code in parse_codes(code_text):
+                index.add_reference(code, description)
+        return index
+
+    def add_reference(self, code, description):
+        node = self.root
+        for digit in code.digits:
+            node = node.children.setdefault(digit, Node())
+            # A prefix is described by what all reference codes beneath it share
+            if not node.references:
+                node.description = description
+            elif node.description:
+                node.description = common_description(node.description, description)
+            node.references += 1
+
+    def node(self, prefix):
+        node = self.root
+        for digit in prefix:
+            node = node.children.get(digit)
+            if node is None:
+                return None
+        return node
+
+    def add_record(self, codes, value=None):
+        """Count one importer once under every prefix of its codes.
+
+        ``value`` is split evenly across the importer's codes, and a prefix
+        gets the shares of the codes beneath it, so the values at any level
+        add up to the importer's total rather than repeating it per code.
+        """
+        listed = Counter()
+        for code in codes:
+            for level in range(2, len(code.digits) + 1, 2):
+                listed[code.digits[:level]] += 1
+        share = value / len(codes) if codes and value is not None and not pd.isna(value) else None
+        for prefix, count in listed.items():
+            node = self.root
+            for digit in prefix:
+                node = node.children.setdefault(digit, Node())
+            node.count += 1
+            if share is not None:
+                node.value += share * count
+
+    def rollup(self, level):
+        """Yield ``(prefix, node)`` for every counted prefix of ``level`` digits."""
+        stack = [('', self.root)]
+        while stack:
+            prefix, node = stack.pop()
+            if len(prefix) == level:
+                if node.count:
+                    yield prefix, node
+                continue
+            for digit, child in node.children.items():
+                stack.append((prefix + digit, child))
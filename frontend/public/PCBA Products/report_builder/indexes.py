@@ -0,0 +1,116 @@
+"""Sort permutations and inverted indexes written next to each paged dataset.
+
+For every column ``build_indexes`` writes ``sort-<n>.bin``: the row ids of
+the dataset in ascending order of that column (numbers numerically, text
+case-insensitively, empty values last, ties in row order). Columns with few
+distinct values, such as State, Industry, Court, Law Firm or Judge, also get
+``filter-<n>.bin``: the row ids holding each value, grouped in the order of
+the manifest's ``values`` list and ascending within a group, so the ids for
+``values[i]`` start at the sum of ``counts[:i]``. Location columns such as
+"Englewood, Colorado, United States" get the same kind of index over the
+parsed two-letter state in ``state-<n>.bin``, so lead lists without a State
+column can still be filtered by state.
+
+Both are raw little-endian unsigned integers, ``uint16`` when the dataset
+has fewer than 65,536 rows and ``uint32`` otherwise, so the browser can wrap
+a fetched ``ArrayBuffer`` in a ``Uint16Array``/``Uint32Array`` directly.
+Sorting is then a walk over the permutation and filtering a slice lookup
+plus an intersection of sorted id lists.
+"""
+import os
+import re
+
+import numpy as np
+import pandas as pd
+
+from . import columnar_cache, store
+from .entities import normalize_states
+
+# Columns with at most this many distinct values, whose values repeat (at
+# most three distinct values per four non-empty rows), get an inverted index
+LOW_CARDINALITY = 256
+REPEAT_RATIO = 0.75
+# Location-like columns whose non-empty values mostly name a US state get a state index
+LOCATION_COLUMN = re.compile(r'location|address|city|state', re.IGNORECASE)
+STATE_COVERAGE = 0.8
+
+
+def row_dtype(rows):
+    return np.dtype('<u2') if rows < 2 ** 16 else np.dtype('<u4')
+
+
+def read_column(source, column):
+    if store.enabled():
+        return pd.concat(list(store.read_batches(source, [column])), ignore_index=True)[column]
+    if columnar_cache.available():
+        chunks = list(columnar_cache.read_batches(source, [column]))
+        return pd.concat(chunks, ignore_index=True)[column]
+    return pd.read_csv(source, usecols=[column], dtype=str, keep_default_na=False)[column]
+
+
+def clean(values):
+    values = values.astype(object).where(values.notna(), '').astype(str).str.strip()
+    return values.where(values != '')
+
+
+def sort_order(values, numeric=False):
+    """Row ids in ascending order of ``values``, empty values last."""
+    if numeric:
+        keys = pd.to_numeric(values.str.replace(',', '', regex=False), errors='coerce')
+    else:
+        keys = values.str.casefold()
+    return keys.sort_values(kind='stable', na_position='last').index.to_numpy()
+
+
+def inverted_index(values):
+    """Return ``(values, counts, row_ids)`` with row ids grouped by value."""
+    present = values.dropna()
+    # Casefolded first for display order, then exact, so "Gross Polowy LLC"
+    # and "GROSS POLOWY LLC" each get one contiguous run of row ids
+    keys = pd.DataFrame({'folded': present.str.casefold(), 'exact': present})
+    order = present[keys.sort_values(['folded', 'exact'], kind='stable').index]
+    counts = order.value_counts(sort=False)
+    # value_counts keeps first-seen order, which is the sorted order here
+    return list(counts.index), counts.tolist(), order.index.to_numpy()
+
+
+def write_ids(path, ids, dtype):
+    np.asarray(ids).astype(dtype).tofile(path)
+    return os.path.basename(path)
+
+
+def low_cardinality(distinct, count):
+    return distinct is not None and 0 < distinct <= LOW_CARDINALITY and distinct <= count * REPEAT_RATIO
+
+
+def filter_entry(path, values, dtype):
+    labels, counts, ids = inverted_index(values)
+    return {'file': write_ids(path, ids, dtype), 'values': labels, 'counts': counts}
+
+
+def build_indexes(source, directory, columns, rows):
+    """Write the index files for one dataset; returns the manifest's ``indexes`` list.
+
+    ``columns`` are the manifest column entries, whose stats decide numeric
+    sorting and which columns are low-cardinality.
+    """
+    dtype = row_dtype(rows)
+    indexes = []
+    for number, column in enumerate(columns):
+        if not column['count']:
+            continue
+        values = clean(read_column(source, column['name']))
+        entry = {
+            'column': column['name'],
+            'dtype': f'uint{dtype.itemsize * 8}',
+            'sort': write_ids(os.path.join(directory, f'sort-{number}.bin'),
+                              sort_order(values, column['type'] == 'number'), dtype),
+        }
+        if low_cardinality(column['distinct'], column['count']):
+            entry['filter'] = filter_entry(os.path.join(directory, f'filter-{number}.bin'), values, dtype)
+        elif column['type'] == 'string' and LOCATION_COLUMN.search(column['name']):
+            states = normalize_states(values).replace('', None)
+            if states.count() >= column['count'] * STATE_COVERAGE:
+                entry['state'] = filter_entry(os.path.join(directory, f'state-{number}.bin'), states, dtype)
+        indexes.append(entry)
+    return indexes
@@ -0,0 +1,139 @@
+"""Per-stage timing, memory and cell counts for workbook builds.
+
+Each pipeline wraps its stages in ``BuildMetrics.stage``, which records wall
+time, the process's peak RSS once the stage finishes and the number of
+cells it touched. ``finish`` emits the report as one JSON line. Environment
+variables switch the outputs on, so the three legacy scripts and the
+streaming build are instrumented the same way (the build CLIs also take
+``--profile PATH``):
+
+``REPORT_BUILDER_METRICS``
+    Append the JSON report to this file (``-`` prints it to stdout).
+``REPORT_BUILDER_METRICS_SHEET``
+    Set to ``1`` to add a "Build Metrics" sheet to the workbook.
+``REPORT_BUILDER_PROFILE``
+    Run under cProfile and dump pstats to this path. ``snakeviz`` or
+    ``flameprof`` render it as a flame graph.
+
+Peak RSS is the high-water mark of the whole process, so it only grows;
+the stage where it jumps is the one that allocated. It comes from
+``resource``, which Windows lacks; there it is recorded as null.
+"""
+import cProfile
+import json
+import os
+import sys
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+METRICS_SHEET = 'Build Metrics'
+SHEET_COLUMNS = ['Pipeline', 'Stage', 'Sheet', 'Seconds', 'Peak RSS (MB)', 'Cells']
+
+
+def peak_rss_mb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    # ru_maxrss is KiB on Linux and bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024 if sys.platform == 'darwin' else 1024), 1)
+
+
+def worksheet_cells(ws):
+    return ws.max_row * ws.max_column
+
+
+class BuildMetrics:
+    def __init__(self, pipeline, output=None, sheet=False, profile=None):
+        self.pipeline = pipeline
+        self.output = output
+        self.sheet = sheet
+        self.profile = profile
+        self.stages = []
+        self.started = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.start = time.perf_counter()
+        self.profiler = None
+
+    @classmethod
+    def from_env(cls, pipeline, profile=None):
+        """Metrics configured by the ``REPORT_BUILDER_*`` variables; starts profiling if asked.
+
+        ``profile``, from a ``--profile`` flag, takes precedence over
+        ``REPORT_BUILDER_PROFILE``.
+        """
+        metrics = cls(
+            pipeline,
+            output=os.environ.get('REPORT_BUILDER_METRICS'),
+            sheet=os.environ.get('REPORT_BUILDER_METRICS_SHEET', '') not in ('', '0'),
+            profile=profile or os.environ.get('REPORT_BUILDER_PROFILE'),
+        )
+        if metrics.profile:
+            metrics.profiler = cProfile.Profile()
+            metrics.profiler.enable()
+        return metrics
+
+    def begin(self, name, sheet=None, cells=None):
+        """Start timing a stage that does not fit in a ``with`` block."""
+        return {'stage': name, 'sheet': sheet, 'cells': cells, 'start': time.perf_counter()}
+
+    def end(self, record, cells=None):
+        record['seconds'] = round(time.perf_counter() - record.pop('start'), 4)
+        record['peak_rss_mb'] = peak_rss_mb()
+        if cells is not None:
+            record['cells'] = cells
+        self.stages.append(record)
+
+    @contextmanager
+    def stage(self, name, sheet=None, cells=None):
+        """Time a stage; set ``record['cells']`` inside the block when the count is known late."""
+        record = self.begin(name, sheet, cells)
+        try:
+            yield record
+        finally:
+            self.end(record)
+
+    def report(self):
+        return {
+            'pipeline': self.pipeline,
+            'started': self.started,
+            'seconds': round(time.perf_counter() - self.start, 4),
+            'peak_rss_mb': peak_rss_mb(),
+            'stages': self.stages,
+        }
+
+    def rows(self):
+        for record in self.stages:
+            yield [self.pipeline, record['stage'], record['sheet'], record['seconds'],
+                   record['peak_rss_mb'], record['cells']]
+
+    def write_sheet(self, wb):
+        """Add this run's stages to the metrics sheet, creating it if needed.
+
+        Stages of earlier pipelines (create, then format) are kept, so the
+        finished workbook shows the whole chain. Stages recorded after this
+        call, such as ``save``, are only in the JSON report.
+        """
+        if not self.sheet:
+            return
+        if METRICS_SHEET in wb.sheetnames:
+            ws = wb[METRICS_SHEET]
+        else:
+            ws = wb.create_sheet(METRICS_SHEET)
+            ws.append(SHEET_COLUMNS)
+        for row in self.rows():
+            ws.append(row)
+
+    def finish(self):
+        """Stop profiling and emit the report; returns it."""
+        if self.profiler:
+            self.profiler.disable()
+            self.profiler.dump_stats(self.profile)
+        report = self.report()
+        if self.output == '-':
+            print(json.dumps(report))
+        elif self.output:
+            with open(self.output, 'a', encoding='utf-8') as f:
+                f.write(json.dumps(report) + '\n')
+        return report
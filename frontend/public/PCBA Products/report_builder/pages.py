@@ -0,0 +1,242 @@
+"""Split dataset CSVs into fixed-size, precompressed JSON pages for the frontend.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m report_builder.pages --page-rows 250
+
+Every CSV under ``--root`` becomes a directory under ``--output`` holding
+``manifest.json`` and ``page-00001.json``, ``page-00002.json``, ... of at most
+``--page-rows`` rows each, as ``{"page": 1, "rows": [[...], ...]}`` with
+values in manifest column order. Each page is also written as ``.json.gz``
+and, when the ``brotli`` package is installed, ``.json.br`` so a static
+server can send the precompressed file. The manifest lists the columns,
+total rows, every page with its row range and sizes, and per-column stats
+(non-empty count, distinct count, min/max for numeric columns, longest
+value), so a table can render page 1 and size its scrollbar before the rest
+arrives. Sort permutations and inverted indexes for filtering are written
+alongside (see ``indexes.py``) and listed under ``indexes``.
+
+Datasets whose source hash matches the manifest are skipped; the rest are
+written to a temporary directory beside the output and swapped into place.
+"""
+import argparse
+import gzip
+import json
+import os
+import re
+import shutil
+import tempfile
+import time
+
+import pandas as pd
+
+from . import columnar_cache, store
+from .batch import PUBLIC_DIR, csv_files, dataset_dirs
+from .build_cache import file_digest
+from .columnar_cache import write_json
+from .indexes import build_indexes
+
+DEFAULT_OUTPUT = os.path.join(PUBLIC_DIR, 'pages')
+PAGE_ROWS = 250
+MANIFEST = 'manifest.json'
+# Distinct values are counted exactly up to this many per column
+DISTINCT_LIMIT = 10_000
+
+
+def brotli_module():
+    try:
+        import brotli
+    except ImportError:
+        return None
+    return brotli
+
+
+def slug(path):
+    stem = os.path.splitext(os.path.basename(path))[0]
+    return re.sub(r'[^a-z0-9]+', '-', stem.lower()).strip('-')
+
+
+def source_chunks(path, chunksize):
+    if store.enabled():
+        return store.read_batches(path, chunksize=chunksize)
+    if columnar_cache.available():
+        return columnar_cache.read_batches(path, chunksize=chunksize)
+    return pd.read_csv(path, dtype=str, keep_default_na=False, chunksize=chunksize)
+
+
+def fixed_pages(chunks, size):
+    """Regroup chunks of any length into DataFrames of exactly ``size`` rows (the last may be short)."""
+    pending = []
+    pending_rows = 0
+    for chunk in chunks:
+        pending.append(chunk)
+        pending_rows += len(chunk)
+        while pending_rows >= size:
+            frame = pd.concat(pending, ignore_index=True)
+            yield frame.iloc[:size]
+            pending, pending_rows = [frame.iloc[size:]], pending_rows - size
+    if pending_rows:
+        yield pd.concat(pending, ignore_index=True)
+
+
+class ColumnStats:
+    def __init__(self):
+        self.count = 0
+        self.distinct = set()
+        self.distinct_exact = True
+        self.numeric = True
+        self.min = None
+        self.max = None
+        self.max_length = 0
+
+    def update(self, values):
+        values = values[values.notna() & (values.str.strip() != '')]
+        if values.empty:
+            return
+        self.count += len(values)
+        self.max_length = max(self.max_length, int(values.str.len().max()))
+        if self.distinct_exact:
+            self.distinct.update(values.unique())
+            if len(self.distinct) > DISTINCT_LIMIT:
+                self.distinct_exact = False
+        if self.numeric:
+            numbers = pd.to_numeric(values.str.replace(',', '', regex=False), errors='coerce')
+            if numbers.isna().any():
+                self.numeric = False
+            else:
+                low, high = float(numbers.min()), float(numbers.max())
+                self.min = low if self.min is None else min(self.min, low)
+                self.max = high if self.max is None else max(self.max, high)
+
+    def to_dict(self):
+        stats = {
+            'type': 'number' if self.numeric and self.count else 'string',
+            'count': self.count,
+            'distinct': len(self.distinct) if self.distinct_exact else None,
+            'max_length': self.max_length,
+        }
+        if stats['type'] == 'number':
+            stats.update(min=self.min, max=self.max)
+        return stats
+
+
+def write_page(directory, number, rows, brotli=None):
+    name = f'page-{number:05d}.json'
+    data = json.dumps({'page': number, 'rows': rows}, ensure_ascii=False, separators=(',', ':')).encode()
+    sizes = {'json': len(data)}
+    with open(os.path.join(directory, name), 'wb') as f:
+        f.write(data)
+    # mtime=0 keeps the gzip bytes stable across runs
+    compressed = gzip.compress(data, compresslevel=9, mtime=0)
+    with open(os.path.join(directory, name + '.gz'), 'wb') as f:
+        f.write(compressed)
+    sizes['gzip'] = len(compressed)
+    if brotli:
+        compressed = brotli.compress(data, quality=11)
+        with open(os.path.join(directory, name + '.br'), 'wb') as f:
+            f.write(compressed)
+        sizes['brotli'] = len(compressed)
+    return name, sizes
+
+
+def write_dataset(source, directory, digest, page_rows):
+    brotli = brotli_module()
+    columns, stats, pages, total = None, None, [], 0
+    for number, frame in enumerate(fixed_pages(source_chunks(source, page_rows), page_rows), 1):
+        if columns is None:
+            columns = [str(column) for column in frame.columns]
+            stats = [ColumnStats() for _ in columns]
+        for column, column_stats in zip(frame.columns, stats):
+            column_stats.update(frame[column])
+        rows = frame.astype(object).where(frame.notna(), None).values.tolist()
+        name, sizes = write_page(directory, number, rows, brotli)
+        pages.append({'file': name, 'first_row': total, 'rows': len(rows), 'bytes': sizes})
+        total += len(rows)
+
+    if columns is None:
+        columns = store.columns(source) if store.enabled() else list(pd.read_csv(source, nrows=0).columns)
+        stats = [ColumnStats() for _ in columns]
+    columns = [dict(column_stats.to_dict(), name=name) for name, column_stats in zip(columns, stats)]
+    manifest = {
+        'source': os.path.relpath(source, PUBLIC_DIR),
+        'sha256': digest,
+        'page_rows': page_rows,
+        'total_rows': total,
+        'encodings': ['gzip', 'brotli'] if brotli else ['gzip'],
+        'columns': columns,
+        'pages': pages,
+        'indexes': build_indexes(source, directory, columns, total),
+    }
+    write_json(os.path.join(directory, MANIFEST), manifest)
+    return manifest
+
+
+def export_dataset(source, directory, page_rows=PAGE_ROWS, force=False):
+    """Write the pages and manifest for one CSV; returns the manifest, or None when up to date.
+
+    The export is written to a sibling temporary directory and swapped in
+    whole, so readers never see a half-written dataset, a failed export
+    leaves the previous one in place, and a shrunken dataset leaves no
+    orphaned pages.
+    """
+    digest = file_digest(source)
+    existing = columnar_cache.read_meta(os.path.join(directory, MANIFEST))
+    if not force and existing and existing['sha256'] == digest and existing['page_rows'] == page_rows:
+        return None
+
+    parent, name = os.path.split(os.path.abspath(directory))
+    os.makedirs(parent, exist_ok=True)
+    tmp = tempfile.mkdtemp(dir=parent, prefix=f'.{name}.', suffix='.tmp')
+    old = None
+    try:
+        manifest = write_dataset(source, tmp, digest, page_rows)
+        # mkdtemp creates directories as 0700; the static server expects the umask default
+        umask = os.umask(0)
+        os.umask(umask)
+        os.chmod(tmp, 0o777 & ~umask)
+        # os.replace cannot overwrite a non-empty directory, so the old export steps aside first
+        if os.path.exists(directory):
+            old = tempfile.mkdtemp(dir=parent, prefix=f'.{name}.', suffix='.old')
+            os.replace(directory, os.path.join(old, name))
+        os.replace(tmp, directory)
+    except BaseException:
+        if old and not os.path.exists(directory):
+            os.replace(os.path.join(old, name), directory)
+        raise
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+        if old:
+            shutil.rmtree(old, ignore_errors=True)
+    return manifest
+
+
+def export_all(root=PUBLIC_DIR, output=DEFAULT_OUTPUT, page_rows=PAGE_ROWS, force=False):
+    results = []
+    for folder in dataset_dirs(root):
+        for source in csv_files(folder):
+            directory = os.path.join(output, slug(folder), slug(source))
+            start = time.perf_counter()
+            manifest = export_dataset(source, directory, page_rows, force)
+            results.append({
+                'source': os.path.relpath(source, root),
+                'pages': len(manifest['pages']) if manifest else None,
+                'rows': manifest['total_rows'] if manifest else None,
+                'status': 'written' if manifest else 'unchanged',
+                'seconds': round(time.perf_counter() - start, 3),
+            })
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--root', default=PUBLIC_DIR, help='directory holding the dataset folders')
+    parser.add_argument('--output', default=DEFAULT_OUTPUT)
+    parser.add_argument('--page-rows', type=int, default=PAGE_ROWS)
+    parser.add_argument('--force', action='store_true', help='rewrite datasets whose source is unchanged')
+    args = parser.parse_args()
+    for result in export_all(args.root, args.output, args.page_rows, args.force):
+        print(json.dumps(result))
+
+
+if __name__ == '__main__':
+    main()
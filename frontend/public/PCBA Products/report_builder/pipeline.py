@@ -0,0 +1,159 @@
+"""The create -> format -> finalize steps of the legacy three-script build.
+
+``create`` writes every sheet of a spec as plain data, ``format_workbook``
+adds widths, styles, tables and filters, and ``finalize_workbook`` inserts
+the Summary sheet and its charts, laid out by ``workbook.summary_layout``
+like the streaming build's. Each step loads and saves the workbook, so they
+stay for callers that run them separately; a whole build goes through
+``workbook.build_spec``. pandas and the openpyxl modules each step needs
+are imported inside it; importing this module costs almost nothing.
+"""
+from .metrics import METRICS_SHEET, worksheet_cells
+
+OVERVIEW_SHEET = 'Overview'
+OVERVIEW_TITLE = "PCBA IMPORT DATA RESEARCH"
+# Sheets that get an auto-filter over their whole range
+FILTERED_SHEETS = ['HTS Codes', 'Top Importers', 'Major Importers', 'Top Suppliers', 'Import by Country',
+                   'Industry Applications', 'Data Quality']
+
+
+def create(spec, excel_file, metrics):
+    """Write every sheet of ``spec`` into a new workbook; returns the open ``pd.ExcelWriter``.
+
+    Closing the writer saves ``excel_file``; its ``book`` can be formatted
+    and finalized first.
+    """
+    import pandas as pd
+
+    from .sheet_specs import read_chunks
+
+    writer = pd.ExcelWriter(excel_file, engine='openpyxl')
+    # One sheet per spec entry; sources are read from the SQLite store
+    # (report_builder/store.py), not reparsed
+    for sheet in spec.sheets:
+        with metrics.stage('build dataframe', sheet.name) as stage:
+            df = pd.concat(read_chunks(sheet))
+            stage['cells'] = df.size
+        with metrics.stage('to_excel', sheet.name, cells=df.size + len(df.columns)):
+            df.to_excel(writer, sheet_name=sheet.name, index=False)
+    return writer
+
+
+def load(excel_file, metrics):
+    from openpyxl import load_workbook
+
+    with metrics.stage('load_workbook') as stage:
+        wb = load_workbook(excel_file)
+        stage['cells'] = sum(worksheet_cells(ws) for ws in wb.worksheets)
+    return wb
+
+
+def save(wb, excel_file, metrics, writer=None):
+    metrics.write_sheet(wb)
+    with metrics.stage('save', cells=sum(worksheet_cells(ws) for ws in wb.worksheets)):
+        if writer is not None:
+            # The writer holds the open file and saves its book on close
+            writer.close()
+        else:
+            wb.save(excel_file)
+
+
+def format_workbook(wb, spec, metrics):
+    from openpyxl.styles import Alignment, Font
+    from openpyxl.utils import get_column_letter
+    from openpyxl.worksheet.table import Table, TableStyleInfo
+
+    from . import styles
+    from .formatting import format_worksheet
+    from .sheet_specs import measure_widths, output_columns
+    from .workbook import table_name
+
+    # Register the shared named styles once for the whole workbook
+    styles.register(wb)
+
+    # Column widths come from the source data, not from walking every cell;
+    # a transform sheet runs its transform once for both
+    widths = {}
+    results = {}
+    for sheet in spec.sheets:
+        with metrics.stage('measure widths', sheet.name):
+            widths[sheet.name] = measure_widths(sheet, output_columns(sheet, results), results)
+            results.pop(sheet.name, None)
+
+    # Apply formatting to each worksheet
+    tables = set()
+    for sheet_name in wb.sheetnames:
+        if sheet_name == METRICS_SHEET:
+            continue
+        ws = wb[sheet_name]
+        with metrics.stage('format_worksheet', sheet_name, cells=worksheet_cells(ws)):
+            format_worksheet(ws, widths.get(sheet_name, []))
+
+        # Add table formatting if the sheet has data
+        if ws.max_row > 1:
+            with metrics.stage('add table', sheet_name):
+                tab = Table(displayName=table_name(sheet_name, tables),
+                            ref=f"A1:{get_column_letter(ws.max_column)}{ws.max_row}")
+                tab.tableStyleInfo = TableStyleInfo(name="TableStyleMedium2", showFirstColumn=False,
+                                                    showLastColumn=False, showRowStripes=True,
+                                                    showColumnStripes=False)
+                try:
+                    ws.add_table(tab)
+                except ValueError:
+                    # Table might already exist
+                    pass
+
+    # Add a title to the Overview sheet
+    if OVERVIEW_SHEET in wb.sheetnames:
+        ws = wb[OVERVIEW_SHEET]
+        ws.insert_rows(1)
+        ws.merge_cells('A1:B1')
+        title_cell = ws['A1']
+        title_cell.value = OVERVIEW_TITLE
+        title_cell.font = Font(name='Arial', size=16, bold=True)
+        title_cell.alignment = Alignment(horizontal='center', vertical='center')
+
+    # Add filtering to relevant sheets
+    for sheet_name in FILTERED_SHEETS:
+        if sheet_name not in wb.sheetnames:
+            continue
+        ws = wb[sheet_name]
+        if ws.max_row > 1:
+            ws.auto_filter.ref = f"A1:{get_column_letter(ws.max_column)}{ws.max_row}"
+
+
+def finalize_workbook(wb, spec, metrics):
+    from openpyxl.utils import get_column_letter
+
+    from . import charts, styles
+    from .sheet_specs import SummarySpec, navigation_rows
+    from .workbook import SUMMARY_COLUMNS, SUMMARY_WIDTHS, summary_layout
+
+    # The Summary sheet has the same rows and styles as the streaming build's
+    summary_stage = metrics.begin('summary')
+    styles.register(wb)
+    ws = wb.create_sheet("Summary", 0)
+    for letter, width in SUMMARY_WIDTHS.items():
+        ws.column_dimensions[letter].width = width
+
+    last_column = get_column_letter(SUMMARY_COLUMNS)
+    layout = summary_layout(spec.summary or SummarySpec(), navigation_rows(spec))
+    for row, (values, style, merged) in enumerate(layout, 1):
+        # Pad every row so the bordered block stays rectangular
+        for col in range(1, SUMMARY_COLUMNS + 1):
+            cell = ws.cell(row=row, column=col)
+            if col <= len(values):
+                cell.value = values[col - 1]
+                cell.style = style
+            else:
+                cell.style = styles.SUMMARY_CELL
+        if merged:
+            ws.merge_cells(f'A{row}:{last_column}{row + merged - 1}')
+
+    metrics.end(summary_stage, cells=worksheet_cells(ws))
+
+    # Charts read small aggregate tables on a hidden sheet, never the data rows
+    with metrics.stage('charts') as stage:
+        tables = charts.chart_tables(spec)
+        charts.add_charts(wb, ws, tables)
+        stage['cells'] = sum(len(table) + 2 for _, table in tables) * 2
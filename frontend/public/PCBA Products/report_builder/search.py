@@ -0,0 +1,325 @@
+"""BM25 full-text index over every dataset row, with prefix and fuzzy matching.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m report_builder.search build
+    python -m report_builder.search query "gross polowy foreclos"
+    python -m report_builder.search serve --port 8765
+
+``build`` tokenises the text columns of every CSV under ``frontend/public``
+(URL, token and other opaque columns are skipped) into one document per row
+and writes a single binary index: a JSON header with the sorted vocabulary,
+the datasets and a display title per row, followed by little-endian arrays
+of posting offsets, document ids, term frequencies and document lengths.
+
+Queries score with BM25. A query word that is not in the vocabulary, and
+always the last word (search-as-you-type), also matches every term it
+prefixes via a binary search of the sorted vocabulary; a word with neither
+falls back to terms sharing most of its character trigrams, so typos such
+as "forclosure" still hit. Results name the dataset and row, which maps to
+``row // page_rows`` in the paged export. ``serve`` answers
+``GET /search?q=...&k=20`` with JSON for the app; ``k`` defaults to 20, is
+capped at 100, and anything but a positive integer is a 400.
+"""
+import argparse
+import bisect
+import json
+import math
+import os
+import re
+import struct
+import time
+from collections import Counter, defaultdict
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import numpy as np
+
+from .batch import PUBLIC_DIR, csv_files, dataset_dirs
+from .pages import DEFAULT_OUTPUT, source_chunks
+
+INDEX_FILE = os.path.join(DEFAULT_OUTPUT, 'search-index.bin')
+MAGIC = b'RBSI'
+VERSION = 1
+TOKEN = re.compile(r'\w+')
+K1 = 1.2
+B = 0.75
+MAX_EXPANSIONS = 50
+PREFIX_WEIGHT = 0.8
+FUZZY_WEIGHT = 0.5
+FUZZY_SIMILARITY = 0.5
+# Results per served query: the default and the most a client may ask for
+DEFAULT_K = 20
+MAX_K = 100
+# Columns preferred as a row's display title, in order
+TITLE_COLUMNS = ['Company Name', 'Company', 'Name', 'Title', 'Full Name', 'Attorney Name']
+ARRAYS = {'offsets': '<u4', 'docs': '<u4', 'tfs': '<u2', 'lengths': '<u4', 'doc_dataset': '<u2', 'doc_row': '<u4'}
+
+
+def tokenize(text):
+    return TOKEN.findall(text.lower())
+
+
+def trigrams(term):
+    padded = f' {term} '
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def text_columns(chunk):
+    """Columns worth indexing: skips URLs, login tokens and other single opaque strings."""
+    columns = []
+    for column in chunk.columns:
+        values = chunk[column].dropna().astype(str).str.strip()
+        values = values[values != '']
+        if values.empty:
+            continue
+        opaque = values.str.startswith('http') | (~values.str.contains(' ') & (values.str.len() > 30))
+        if opaque.mean() <= 0.5:
+            columns.append(column)
+    return columns
+
+
+def row_title(chunk):
+    for column in TITLE_COLUMNS:
+        if column in chunk:
+            return chunk[column]
+    return chunk[chunk.columns[0]]
+
+
+class IndexBuilder:
+    def __init__(self):
+        self.postings = defaultdict(list)
+        self.lengths = []
+        self.doc_dataset = []
+        self.doc_row = []
+        self.titles = []
+        self.datasets = []
+
+    def add_dataset(self, source, chunks):
+        dataset = len(self.datasets)
+        rows, columns = 0, []
+        for number, chunk in enumerate(chunks):
+            if not number:
+                # The first chunk picks the columns, so every row is indexed over the same ones
+                columns = text_columns(chunk)
+            text = chunk[columns].fillna('').astype(str).agg(' '.join, axis=1) if columns else None
+            titles = row_title(chunk).fillna('').astype(str)
+            for offset in range(len(chunk)):
+                doc = len(self.lengths)
+                counts = Counter(tokenize(text.iat[offset])) if text is not None else Counter()
+                for term, tf in counts.items():
+                    self.postings[term].append((doc, min(tf, 0xFFFF)))
+                self.lengths.append(sum(counts.values()))
+                self.doc_dataset.append(dataset)
+                self.doc_row.append(rows + offset)
+                self.titles.append(titles.iat[offset])
+            rows += len(chunk)
+        self.datasets.append({'source': os.path.relpath(source, PUBLIC_DIR), 'rows': rows,
+                              'columns': [str(column) for column in columns]})
+
+    def write(self, path):
+        terms = sorted(self.postings)
+        offsets = [0]
+        docs, tfs = [], []
+        for term in terms:
+            postings = self.postings[term]
+            docs.extend(doc for doc, _ in postings)
+            tfs.extend(tf for _, tf in postings)
+            offsets.append(len(docs))
+        arrays = {
+            'offsets': offsets, 'docs': docs, 'tfs': tfs, 'lengths': self.lengths,
+            'doc_dataset': self.doc_dataset, 'doc_row': self.doc_row,
+        }
+        header = {
+            'version': VERSION,
+            'documents': len(self.lengths),
+            'avg_length': float(np.mean(self.lengths)) if self.lengths else 0.0,
+            'datasets': self.datasets,
+            'terms': terms,
+            'titles': self.titles,
+            'arrays': {},
+        }
+        blobs = []
+        position = 0
+        for name, dtype in ARRAYS.items():
+            blob = np.asarray(arrays[name], dtype=dtype).tobytes()
+            header['arrays'][name] = {'offset': position, 'length': len(arrays[name]), 'dtype': dtype}
+            blobs.append(blob)
+            position += len(blob)
+        encoded = json.dumps(header, ensure_ascii=False, separators=(',', ':')).encode()
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp = path + '.tmp'
+        with open(tmp, 'wb') as f:
+            f.write(MAGIC + struct.pack('<II', VERSION, len(encoded)))
+            f.write(encoded)
+            for blob in blobs:
+                f.write(blob)
+        os.replace(tmp, path)
+
+
+def build(root=PUBLIC_DIR, path=INDEX_FILE):
+    builder = IndexBuilder()
+    for folder in dataset_dirs(root):
+        for source in csv_files(folder):
+            builder.add_dataset(source, source_chunks(source, 50_000))
+    builder.write(path)
+    return builder
+
+
+class SearchIndex:
+    def __init__(self, header, arrays):
+        self.header = header
+        self.terms = header['terms']
+        self.titles = header['titles']
+        self.datasets = header['datasets']
+        self.documents = header['documents']
+        self.avg_length = header['avg_length'] or 1.0
+        for name, values in arrays.items():
+            setattr(self, name, values)
+        self.grams = None
+
+    @classmethod
+    def load(cls, path=INDEX_FILE):
+        with open(path, 'rb') as f:
+            data = f.read()
+        if data[:4] != MAGIC:
+            raise ValueError(f'{path} is not a search index')
+        version, header_length = struct.unpack_from('<II', data, 4)
+        if version != VERSION:
+            raise ValueError(f'{path} has index version {version}, expected {VERSION}')
+        start = 12 + header_length
+        header = json.loads(data[12:start])
+        arrays = {name: np.frombuffer(data, dtype=spec['dtype'], count=spec['length'],
+                                      offset=start + spec['offset'])
+                  for name, spec in header['arrays'].items()}
+        return cls(header, arrays)
+
+    def term_id(self, term):
+        position = bisect.bisect_left(self.terms, term)
+        if position < len(self.terms) and self.terms[position] == term:
+            return position
+        return None
+
+    def prefixed(self, prefix):
+        start = bisect.bisect_left(self.terms, prefix)
+        end = bisect.bisect_left(self.terms, prefix + '\uffff')
+        return range(start, min(end, start + MAX_EXPANSIONS))
+
+    def similar(self, term):
+        if self.grams is None:
+            # Built on first use; most queries never need it
+            self.grams = defaultdict(list)
+            for term_id, known in enumerate(self.terms):
+                for gram in trigrams(known):
+                    self.grams[gram].append(term_id)
+        wanted = trigrams(term)
+        shared = Counter(term_id for gram in wanted for term_id in self.grams.get(gram, ()))
+        scored = []
+        for term_id, common in shared.items():
+            similarity = common / len(wanted | trigrams(self.terms[term_id]))
+            if similarity >= FUZZY_SIMILARITY:
+                scored.append((similarity, term_id))
+        return [term_id for _, term_id in sorted(scored, reverse=True)[:MAX_EXPANSIONS]]
+
+    def expansions(self, word, last):
+        """``(term_id, weight)`` pairs a query word matches."""
+        exact = self.term_id(word)
+        found = [(exact, 1.0)] if exact is not None else []
+        if last or exact is None:
+            found += [(term_id, PREFIX_WEIGHT) for term_id in self.prefixed(word) if term_id != exact]
+        if not found and len(word) >= 3:
+            found = [(term_id, FUZZY_WEIGHT) for term_id in self.similar(word)]
+        return found
+
+    def scores(self, query):
+        scores = np.zeros(self.documents)
+        words = tokenize(query)
+        for position, word in enumerate(words):
+            best = np.zeros(self.documents)
+            for term_id, weight in self.expansions(word, position == len(words) - 1):
+                start, end = self.offsets[term_id], self.offsets[term_id + 1]
+                docs, tfs = self.docs[start:end], self.tfs[start:end].astype(float)
+                idf = math.log(1 + (self.documents - len(docs) + 0.5) / (len(docs) + 0.5))
+                norm = K1 * (1 - B + B * self.lengths[docs] / self.avg_length)
+                # A word's best-matching expansion counts, not the sum of all of them
+                np.maximum.at(best, docs, weight * idf * tfs * (K1 + 1) / (tfs + norm))
+            scores += best
+        return scores
+
+    def search(self, query, k=20):
+        scores = self.scores(query)
+        hits = np.flatnonzero(scores)
+        top = hits[np.argsort(-scores[hits], kind='stable')[:k]]
+        return [{
+            'score': round(float(scores[doc]), 4),
+            'dataset': self.datasets[self.doc_dataset[doc]]['source'],
+            'row': int(self.doc_row[doc]),
+            'title': self.titles[doc],
+        } for doc in top]
+
+
+def result_count(params):
+    """The ``k`` query parameter capped at ``MAX_K``; raises ``ValueError`` unless it is a positive integer."""
+    k = int(params.get('k', [str(DEFAULT_K)])[0])
+    if k < 1:
+        raise ValueError(f'k must be positive, not {k}')
+    return min(k, MAX_K)
+
+
+def handler(index):
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path != '/search':
+                self.send_error(404)
+                return
+            params = parse_qs(url.query)
+            query = params.get('q', [''])[0]
+            try:
+                k = result_count(params)
+            except ValueError:
+                self.send_error(400, 'k must be a positive integer')
+                return
+            body = json.dumps({'query': query, 'results': index.search(query, k)}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Access-Control-Allow-Origin', '*')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    return Handler
+
+
+def serve(index, port):
+    ThreadingHTTPServer(('127.0.0.1', port), handler(index)).serve_forever()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--index', default=INDEX_FILE)
+    commands = parser.add_subparsers(dest='command', required=True)
+    build_parser = commands.add_parser('build', help='index every dataset under --root')
+    build_parser.add_argument('--root', default=PUBLIC_DIR)
+    query_parser = commands.add_parser('query', help='print the best matches for a query')
+    query_parser.add_argument('text')
+    query_parser.add_argument('-k', type=int, default=10)
+    serve_parser = commands.add_parser('serve', help='answer GET /search?q=... on localhost')
+    serve_parser.add_argument('--port', type=int, default=8765)
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        start = time.perf_counter()
+        builder = build(args.root, args.index)
+        print(json.dumps({'index': args.index, 'documents': len(builder.lengths), 'terms': len(builder.postings),
+                          'bytes': os.path.getsize(args.index),
+                          'seconds': round(time.perf_counter() - start, 3)}))
+    elif args.command == 'query':
+        for hit in SearchIndex.load(args.index).search(args.text, args.k):
+            print(json.dumps(hit, ensure_ascii=False))
+    else:
+        serve(SearchIndex.load(args.index), args.port)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,276 @@
+"""Declarative sheet specs: which source file feeds each sheet, and how.
+
+A spec is a JSON file in ``report_builder/specs``::
+
+    {
+      "workbook": "PCBA_Import_Data.xlsx",
+      "summary": {"title": "PCBA IMPORT DATA SUMMARY", "introduction": ["..."], "sources": "NOTE: ..."},
+      "sheets": [
+        {
+          "name": "Top Importers",
+          "source": "pcba/top_importers.csv",
+          "columns": {"Company Name": "Company", "Location": "State"},
+          "filters": [{"column": "Industry", "op": "contains", "value": ["Medical"]}]
+        }
+      ]
+    }
+
+``summary`` adds a Summary sheet with the workbook's own title,
+introduction lines and sources note above the generic navigation guide and
+filtering instructions; ``true`` gives just the guide and instructions.
+``source`` is relative to the spec file. ``columns`` maps output headers to
+source columns (all source columns when omitted) and ``filters`` are applied
+to source columns before renaming. ``transform`` names a derived-sheet
+function from ``transforms.py`` that receives the filtered chunks and the
+sheet's ``options``. Sources are read in chunks of
+``chunksize`` rows, so whole extracts are never held in memory.
+
+A sheet may instead list several ``sources``, each with a ``label`` and a
+``columns`` map from shared column names to that file's own headers::
+
+    "sources": [
+      {"path": "a.csv", "label": "Leaniant", "columns": {"Company": "Company Name"}},
+      {"path": "b.csv", "label": "Strict"}
+    ]
+
+Their chunks are renamed to the shared names, tagged with a ``Source``
+column holding the label and read one after another; filters then apply to
+the shared names.
+"""
+import json
+import os
+import re
+from collections import defaultdict
+from dataclasses import dataclass, field
+
+import pandas as pd
+
+from . import columnar_cache, store
+from .formatting import max_lengths, widths_from_lengths
+
+SPEC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'specs')
+DEFAULT_CHUNKSIZE = 50_000
+SOURCE_COLUMN = 'Source'
+
+
+@dataclass
+class SheetSpec:
+    name: str
+    source: str = None
+    sources: list = field(default_factory=list)
+    columns: dict = field(default_factory=dict)
+    filters: list = field(default_factory=list)
+    dtypes: dict = field(default_factory=dict)
+    title: str = None
+    widths: list = None
+    chunksize: int = DEFAULT_CHUNKSIZE
+    transform: str = None
+    options: dict = field(default_factory=dict)
+    description: str = ''
+    key_information: str = ''
+
+
+@dataclass
+class SummarySpec:
+    title: str = 'SUMMARY'
+    introduction: list = field(default_factory=list)
+    sources: str = ''
+
+
+@dataclass
+class WorkbookSpec:
+    workbook: str
+    sheets: list
+    summary: SummarySpec = None
+    charts: list = field(default_factory=list)
+
+
+def spec_path(name):
+    if os.path.exists(name):
+        return name
+    return os.path.join(SPEC_DIR, f'{name}.json')
+
+
+def resolve_path(base, path):
+    return os.path.normpath(os.path.join(base, path))
+
+
+def load_spec(name):
+    """Load a workbook spec by name (``pcba``) or path."""
+    path = spec_path(name)
+    with open(path, encoding='utf-8') as f:
+        raw = json.load(f)
+    base = os.path.dirname(os.path.abspath(path))
+    sheets = []
+    for sheet in raw['sheets']:
+        if 'sources' in sheet:
+            sheet['sources'] = [dict(source, path=resolve_path(base, source['path'])) for source in sheet['sources']]
+        else:
+            sheet['source'] = resolve_path(base, sheet['source'])
+        if 'reference' in sheet.get('options', {}):
+            sheet['options'] = dict(sheet['options'], reference=resolve_path(base, sheet['options']['reference']))
+        sheets.append(SheetSpec(**sheet))
+    charts = [dict(chart, **{key: resolve_path(base, chart[key]) for key in ('source', 'summary') if key in chart})
+              for chart in raw.get('charts', [])]
+    summary = raw.get('summary')
+    if summary:
+        summary = SummarySpec(**summary) if isinstance(summary, dict) else SummarySpec()
+    return WorkbookSpec(workbook=raw['workbook'], sheets=sheets, summary=summary or None, charts=charts)
+
+
+def source_columns(spec):
+    if spec.transform:
+        # Output columns belong to the transform; load only what it reads
+        inputs = transform_function(spec).inputs
+        if inputs is None:
+            return None
+        wanted = [spec.options[key] for key in inputs if spec.options.get(key)]
+    elif spec.columns:
+        wanted = list(spec.columns.values())
+    else:
+        return None
+    wanted += [flt['column'] for flt in spec.filters]
+    return list(dict.fromkeys(wanted))
+
+
+def filter_mask(chunk, flt):
+    values = chunk[flt['column']]
+    op, value = flt['op'], flt.get('value')
+    if op == 'eq':
+        return values == value
+    if op == 'ne':
+        return values != value
+    if op == 'in':
+        return values.isin(value)
+    if op == 'not_in':
+        return ~values.isin(value)
+    if op == 'contains':
+        terms = value if isinstance(value, list) else [value]
+        pattern = '|'.join(re.escape(term) for term in terms)
+        return values.str.contains(pattern, case=False, na=False)
+    if op == 'notna':
+        return values.notna() & (values.astype(str).str.strip() != '')
+    raise ValueError(f"Unknown filter op {op!r} on sheet column {flt['column']!r}")
+
+
+def transform_function(spec):
+    from .transforms import TRANSFORMS
+    try:
+        return TRANSFORMS[spec.transform]
+    except KeyError:
+        raise ValueError(f"Unknown transform {spec.transform!r} for sheet {spec.name!r}") from None
+
+
+def filtered(chunks, filters):
+    for chunk in chunks:
+        for flt in filters:
+            chunk = chunk[filter_mask(chunk, flt)]
+        yield chunk
+
+
+def source_chunks(spec, path, usecols=None):
+    # Codes such as HTS 8549.11 or NAICS 3345 must stay text unless overridden
+    dtype = defaultdict(lambda: str, spec.dtypes)
+    ext = os.path.splitext(path)[1].lower()
+    if ext == '.csv' and store.enabled():
+        # Loaded once into SQLite; later reads select only the projected columns
+        return (chunk.astype(spec.dtypes) if spec.dtypes else chunk for chunk in
+                store.read_batches(path, usecols, spec.chunksize))
+    if ext == '.csv' and columnar_cache.available():
+        # Parsed once into Parquet; later reads load only the projected columns
+        return (chunk.astype(spec.dtypes) if spec.dtypes else chunk for chunk in
+                columnar_cache.read_batches(path, usecols, spec.chunksize))
+    if ext == '.csv':
+        return pd.read_csv(path, usecols=usecols, dtype=dtype, chunksize=spec.chunksize)
+    if ext == '.jsonl':
+        return pd.read_json(path, lines=True, dtype=False, chunksize=spec.chunksize)
+    if ext == '.json':
+        return [pd.read_json(path, dtype=False)]
+    raise ValueError(f"Unsupported source type {ext!r} for sheet {spec.name!r}")
+
+
+def csv_columns(path):
+    if store.enabled():
+        return store.columns(path)
+    if columnar_cache.available():
+        return columnar_cache.columns(path)
+    return list(pd.read_csv(path, nrows=0).columns)
+
+
+def labelled_chunks(spec):
+    # Each source is renamed to the shared columns and tagged with its label
+    wanted = source_columns(spec)
+    for source in spec.sources:
+        mapping = source.get('columns', {})
+        usecols = None
+        if wanted is not None and source['path'].lower().endswith('.csv'):
+            header = csv_columns(source['path'])
+            usecols = [column for column in (mapping.get(name, name) for name in wanted) if column in header]
+        for chunk in source_chunks(spec, source['path'], usecols):
+            chunk = chunk.rename(columns={src: name for name, src in mapping.items()})
+            yield chunk.assign(**{SOURCE_COLUMN: source.get('label', os.path.basename(source['path']))})
+
+
+def read_chunks(spec):
+    """Yield filtered, renamed DataFrame chunks for one sheet."""
+    if spec.sources:
+        chunks = labelled_chunks(spec)
+    else:
+        chunks = source_chunks(spec, spec.source, source_columns(spec))
+
+    chunks = filtered(chunks, spec.filters)
+    if spec.transform:
+        chunks = transform_function(spec)(chunks, **spec.options)
+    for chunk in chunks:
+        if spec.columns:
+            chunk = chunk[list(spec.columns.values())]
+            chunk.columns = list(spec.columns)
+        yield chunk
+
+
+def sheet_chunks(spec, results=None):
+    """Chunks of one sheet; a transform runs once and its output is kept in ``results``.
+
+    ``results`` maps sheet name -> transform output and lives for one build,
+    so columns, widths, rows and charts all share a single run.
+    """
+    if not spec.transform or results is None:
+        return read_chunks(spec)
+    if spec.name not in results:
+        results[spec.name] = list(read_chunks(spec))
+    return results[spec.name]
+
+
+def output_columns(spec, results=None):
+    if spec.columns:
+        return list(spec.columns)
+    if spec.source and spec.source.lower().endswith('.csv') and not spec.transform:
+        return csv_columns(spec.source)
+    return list(next(iter(sheet_chunks(spec, results))).columns)
+
+
+def iter_rows(spec, results=None):
+    for chunk in sheet_chunks(spec, results):
+        chunk = chunk.astype(object).where(chunk.notna(), None)
+        yield from chunk.itertuples(index=False, name=None)
+
+
+def measure_widths(spec, columns, results=None):
+    # One extra chunked pass: widths must be known before any row is streamed
+    if spec.widths:
+        return spec.widths
+    longest = pd.Series(0, index=columns)
+    for chunk in sheet_chunks(spec, results):
+        longest = longest.combine(max_lengths(chunk), max)
+    return widths_from_lengths(longest)
+
+
+def sheet_from_spec(spec, results=None):
+    """Return the ``(name, columns, rows, widths, title)`` tuple for ``build_workbook``."""
+    results = {} if results is None else results
+    columns = output_columns(spec, results)
+    return spec.name, columns, iter_rows(spec, results), measure_widths(spec, columns, results), spec.title
+
+
+def navigation_rows(workbook_spec):
+    return [[sheet.name, sheet.description, sheet.key_information] for sheet in workbook_spec.sheets]
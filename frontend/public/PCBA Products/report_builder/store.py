@@ -0,0 +1,615 @@
+"""One SQLite database backing every dataset, raw and normalised.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m report_builder.store load
+    python -m report_builder.store query "SELECT name, state FROM companies WHERE industry LIKE '%Medical%'"
+
+Each source CSV is bulk-loaded once into its own ``source_<id>`` table,
+with batched ``executemany`` inside one transaction per file; the
+``sources`` table records its path, mtime, size, SHA-256 and column types.
+Columns are typed as in the Parquet cache (``columnar_cache.column_types``):
+integers, decimals and dollar amounts become INTEGER and REAL columns and
+``MM/DD/YYYY`` dates ISO text, only where writing the values back
+reproduces the source text, so HTS ``8534.00`` or zip ``02134`` stay text.
+A source is reloaded only when its content changed, and ``read_batches``
+returns just the requested columns, as the source text or, with
+``typed=True``, as ``Int64``, ``float64`` and ``datetime64`` columns, so
+sheet specs, pages, indexes and the docket analytics read from here
+instead of reparsing the files.
+
+``load`` also rebuilds the normalised tables whenever a source changed:
+
+* ``companies``: one row per normalised company name, from the lead lists,
+  importer lists, law firms and plaintiffs, with domain, state, city,
+  industry and NAICS taken from the first source that has them;
+* ``company_hts``: the HTS codes listed for each company;
+* ``contacts``: lead-list people, docket attorneys (at their law firm) and
+  decision makers (at the plaintiff), linked to ``companies``;
+* ``dockets``: one row per docket with typed dates, durations and loan
+  amounts, the county parsed from the court, and the law firm, plaintiff,
+  attorney and decision maker as ids.
+
+Indexes cover domain, state, industry, HTS code and heading, court,
+county and law firm, so questions such as every contact at firms with more
+than five foreclosure cases in Nassau County run in milliseconds::
+
+    SELECT firm.name, contact.full_name, contact.job_title
+    FROM contacts contact JOIN companies firm ON firm.id = contact.company_id
+    WHERE contact.company_id IN (
+        SELECT law_firm_id FROM dockets
+        WHERE county = 'Nassau' AND case_type LIKE '%Foreclosure%'
+        GROUP BY law_firm_id HAVING COUNT(*) > 5)
+
+The database lives next to the Parquet cache; ``REPORT_BUILDER_STORE``
+names another path, or ``off`` to read the files directly. Long-running
+processes can call ``keep_warm`` to serve repeated reads from memory.
+"""
+import argparse
+import hashlib
+import json
+import os
+import sqlite3
+import time
+from contextlib import contextmanager
+
+import pandas as pd
+
+from . import columnar_cache
+from .build_cache import file_digest
+from .entities import normalize_domains, normalize_linkedin, normalize_names, normalize_people, normalize_states
+
+STORE_PATH = os.environ.get('REPORT_BUILDER_STORE',
+                            os.path.join(os.path.dirname(columnar_cache.CACHE_ROOT), 'store.sqlite'))
+BATCH_ROWS = 50_000
+# Bumped when the source tables change layout; older databases are reloaded
+SCHEMA_VERSION = 2
+# SQLite column type per ``columnar_cache`` column type; anything else is TEXT
+SQL_TYPES = {'int64': 'INTEGER', 'float64': 'REAL', 'dollars': 'REAL', 'date': 'TEXT'}
+# Dates are stored as ISO text, so they sort and compare in SQL
+ISO_DATE = '%Y-%m-%d'
+# Whole tables by source path, once ``keep_warm`` is called
+WARM = None
+# Canonical company fields and the headers they come from, in order of preference
+COMPANY_FIELDS = {
+    'name': ['Company Name', 'Company', 'Name'],
+    'domain': ['Company Domain', 'Domain', 'Website', 'All Websites'],
+    'state': ['State', 'Location', 'Company Address', 'Address'],
+    'city': ['City'],
+    'industry': ['Industry', 'Primary Industry'],
+    'naics': ['NAICS'],
+}
+HTS_FIELDS = ['Main HTS Codes', 'HTS Codes Used']
+CONTACT_FIELDS = {
+    'first_name': 'First Name',
+    'last_name': 'Last Name',
+    'full_name': 'Full Name',
+    'job_title': 'Job Title',
+    'location': 'Location',
+    'linkedin': 'LinkedIn Profile',
+}
+DOCKET_COLUMN = 'Docket'
+COUNTY_PATTERN = r'([A-Za-z][A-Za-z .]*?) County'
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS sources (
+    id INTEGER PRIMARY KEY,
+    path TEXT UNIQUE NOT NULL,
+    mtime_ns INTEGER,
+    size INTEGER,
+    sha256 TEXT,
+    types TEXT,
+    rows INTEGER
+);
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+"""
+NORMALISED_SCHEMA = """
+DROP TABLE IF EXISTS company_hts;
+DROP TABLE IF EXISTS dockets;
+DROP TABLE IF EXISTS contacts;
+DROP TABLE IF EXISTS companies;
+CREATE TABLE companies (
+    id INTEGER PRIMARY KEY,
+    name TEXT NOT NULL,
+    name_key TEXT UNIQUE NOT NULL,
+    domain TEXT,
+    state TEXT,
+    city TEXT,
+    industry TEXT,
+    naics TEXT,
+    source_id INTEGER REFERENCES sources(id)
+);
+CREATE TABLE company_hts (
+    company_id INTEGER NOT NULL REFERENCES companies(id),
+    hts_code TEXT NOT NULL,
+    heading TEXT NOT NULL,
+    PRIMARY KEY (company_id, hts_code)
+);
+CREATE TABLE contacts (
+    id INTEGER PRIMARY KEY,
+    company_id INTEGER REFERENCES companies(id),
+    full_name TEXT NOT NULL,
+    first_name TEXT,
+    last_name TEXT,
+    job_title TEXT,
+    role TEXT NOT NULL,
+    location TEXT,
+    state TEXT,
+    linkedin TEXT,
+    source_id INTEGER REFERENCES sources(id)
+);
+CREATE TABLE dockets (
+    id INTEGER PRIMARY KEY,
+    docket TEXT UNIQUE NOT NULL,
+    court TEXT,
+    county TEXT,
+    case_type TEXT,
+    title TEXT,
+    status TEXT,
+    judge TEXT,
+    started TEXT,
+    finished TEXT,
+    duration_days REAL,
+    original_loan REAL,
+    outstanding_debt REAL,
+    debt_ratio REAL,
+    law_firm_id INTEGER REFERENCES companies(id),
+    party_id INTEGER REFERENCES companies(id),
+    attorney_id INTEGER REFERENCES contacts(id),
+    contact_id INTEGER REFERENCES contacts(id),
+    source_id INTEGER REFERENCES sources(id)
+);
+CREATE INDEX companies_domain ON companies(domain);
+CREATE INDEX companies_state ON companies(state);
+CREATE INDEX companies_industry ON companies(industry);
+CREATE INDEX company_hts_code ON company_hts(hts_code);
+CREATE INDEX company_hts_heading ON company_hts(heading);
+CREATE INDEX contacts_company ON contacts(company_id);
+CREATE INDEX contacts_state ON contacts(state);
+CREATE INDEX dockets_court ON dockets(court);
+CREATE INDEX dockets_county ON dockets(county, case_type);
+CREATE INDEX dockets_law_firm ON dockets(law_firm_id);
+"""
+
+
+def enabled():
+    return STORE_PATH.lower() != 'off'
+
+
+def connect(path=None):
+    path = path or STORE_PATH
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    # Autocommit; writes take an explicit BEGIN IMMEDIATE so parallel builds queue
+    conn = sqlite3.connect(path, timeout=60, isolation_level=None)
+    conn.execute('PRAGMA journal_mode=WAL')
+    conn.execute('PRAGMA synchronous=NORMAL')
+    conn.executescript(SCHEMA)
+    if conn.execute('PRAGMA user_version').fetchone()[0] != SCHEMA_VERSION:
+        reset(conn)
+    return conn
+
+
+def reset(conn):
+    """Drop every table of an older layout; the sources are reloaded on their next read."""
+    with transaction(conn):
+        # Another process may have reset it while this one waited for the lock
+        if conn.execute('PRAGMA user_version').fetchone()[0] == SCHEMA_VERSION:
+            return
+        for (table,) in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'").fetchall():
+            conn.execute(f'DROP TABLE {quote(table)}')
+        for statement in filter(str.strip, SCHEMA.split(';')):
+            conn.execute(statement)
+        conn.execute(f'PRAGMA user_version = {SCHEMA_VERSION}')
+
+
+@contextmanager
+def transaction(conn):
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        yield conn
+    except BaseException:
+        conn.execute('ROLLBACK')
+        raise
+    conn.execute('COMMIT')
+
+
+def quote(name):
+    return '"' + str(name).replace('"', '""') + '"'
+
+
+def table_name(source_id):
+    return f'source_{source_id}'
+
+
+def source_row(conn, path):
+    return conn.execute('SELECT id, mtime_ns, size, sha256, types FROM sources WHERE path = ?',
+                        (path,)).fetchone()
+
+
+def rows(chunk):
+    return chunk.astype(object).where(chunk.notna(), None).itertuples(index=False, name=None)
+
+
+def stored(chunk, types):
+    """Parse the typed columns of one CSV chunk into the values their SQLite columns hold."""
+    chunk.columns = list(types)
+    for column, kind in types.items():
+        if kind in columnar_cache.COLUMN_TYPES:
+            values = columnar_cache.COLUMN_TYPES[kind][0](chunk[column])
+            chunk[column] = values.dt.strftime(ISO_DATE) if kind == 'date' else values
+    return chunk
+
+
+def parsed(frame, types):
+    """SQLite values of typed columns as ``Int64``, ``float64`` and ``datetime64``."""
+    for column in frame.columns:
+        kind = types.get(column)
+        if kind == 'int64':
+            frame[column] = frame[column].astype('Int64')
+        elif kind == 'date':
+            frame[column] = pd.to_datetime(frame[column], format=ISO_DATE)
+        elif kind in SQL_TYPES:
+            frame[column] = frame[column].astype('float64')
+    return frame
+
+
+def as_text(frame, types):
+    """Typed columns written back as their exact source text, missing values as ``None``."""
+    frame = parsed(frame, types)
+    for column in frame.columns:
+        kind = types.get(column)
+        if kind in columnar_cache.COLUMN_TYPES:
+            values = frame[column]
+            text = columnar_cache.COLUMN_TYPES[kind][1](values).astype(object)
+            frame[column] = text.where(values.notna(), None)
+    return frame
+
+
+def ingest(conn, source):
+    """Return ``(table, types)`` for ``source``, loading it if its content changed.
+
+    ``types`` maps each column, in source order, to its ``columnar_cache``
+    type or ``'string'``.
+    """
+    path = os.path.abspath(source)
+    stat = os.stat(path)
+    row = source_row(conn, path)
+    if row and row[1] == stat.st_mtime_ns and row[2] == stat.st_size:
+        return table_name(row[0]), json.loads(row[4])
+    digest = file_digest(path)
+    with transaction(conn):
+        # Another process may have loaded it while this one waited for the lock
+        row = source_row(conn, path)
+        if row and row[3] == digest:
+            conn.execute('UPDATE sources SET mtime_ns = ?, size = ? WHERE id = ?',
+                         (stat.st_mtime_ns, stat.st_size, row[0]))
+            return table_name(row[0]), json.loads(row[4])
+        if row is None:
+            source_id = conn.execute('INSERT INTO sources (path) VALUES (?)', (path,)).lastrowid
+        else:
+            source_id = row[0]
+        table = table_name(source_id)
+        types = columnar_cache.column_types(path)
+        conn.execute(f'DROP TABLE IF EXISTS {table}')
+        definitions = ', '.join(f'{quote(column)} {SQL_TYPES.get(kind, "TEXT")}' for column, kind in types.items())
+        conn.execute(f'CREATE TABLE {table} ({definitions})')
+        insert = f'INSERT INTO {table} VALUES ({", ".join("?" * len(types))})'
+        total = 0
+        for chunk in pd.read_csv(path, dtype=str, chunksize=BATCH_ROWS):
+            conn.executemany(insert, rows(stored(chunk, types)))
+            total += len(chunk)
+        conn.execute('UPDATE sources SET mtime_ns = ?, size = ?, sha256 = ?, types = ?, rows = ? WHERE id = ?',
+                     (stat.st_mtime_ns, stat.st_size, digest, json.dumps(types), total, source_id))
+    return table, types
+
+
+def columns(source):
+    conn = connect()
+    try:
+        return list(ingest(conn, source)[1])
+    finally:
+        conn.close()
+
+
+def keep_warm():
+    """Keep every table ``read_batches`` reads in memory until its source file changes.
+
+    For long-running processes such as ``watch``; each source is then read
+    from SQLite once per change instead of once per consumer.
+    """
+    global WARM
+    if WARM is None:
+        WARM = {}
+
+
+def warm_table(source, typed=False):
+    path = os.path.abspath(source)
+    stat = os.stat(path)
+    key = (stat.st_mtime_ns, stat.st_size)
+    cached = WARM.get(path)
+    if cached is None or cached[0] != key:
+        cached = WARM[path] = key, {}
+    # Text and typed tables are kept apart, each read the first time it is asked for
+    tables = cached[1]
+    if typed not in tables:
+        tables[typed] = pd.concat(list(table_batches(path, typed=typed)), ignore_index=True)
+    return tables[typed]
+
+
+def forget(source):
+    if WARM is not None:
+        WARM.pop(os.path.abspath(source), None)
+
+
+def read_batches(source, columns=None, chunksize=BATCH_ROWS, typed=False):
+    """Yield DataFrames of ``chunksize`` rows holding only ``columns``.
+
+    Typed columns come back as source text unless ``typed`` is set; then
+    integers are ``Int64``, decimals and dollar amounts ``float64`` and
+    dates ``datetime64``.
+    """
+    if WARM is None:
+        yield from table_batches(source, columns, chunksize, typed)
+        return
+    table = warm_table(source, typed)
+    table = table[list(columns or table.columns)]
+    # pandas copies on write, so a consumer changing its chunk leaves the kept table alone
+    for start in range(0, len(table), chunksize):
+        yield table.iloc[start:start + chunksize].reset_index(drop=True)
+    if table.empty:
+        yield table
+
+
+def table_batches(source, columns=None, chunksize=BATCH_ROWS, typed=False):
+    conn = connect()
+    try:
+        table, types = ingest(conn, source)
+        columns = list(columns or types)
+        convert = parsed if typed else as_text
+        cursor = conn.execute(f'SELECT {", ".join(map(quote, columns))} FROM {table} ORDER BY rowid')
+        empty = True
+        while True:
+            batch = cursor.fetchmany(chunksize)
+            if not batch:
+                break
+            empty = False
+            # object keeps large integers exact until they are converted
+            yield convert(pd.DataFrame(batch, columns=columns, dtype=object), types)
+        if empty:
+            yield convert(pd.DataFrame(columns=columns, dtype=object), types)
+    finally:
+        conn.close()
+
+
+def read_source(conn, source_id, types):
+    table = table_name(source_id)
+    return as_text(pd.read_sql_query(f'SELECT * FROM {table} ORDER BY rowid', conn, dtype=object), types)
+
+
+def first_present(frame, headers, normalize=None):
+    """Per row, the first non-empty value among ``headers`` (after ``normalize``)."""
+    result = pd.Series(None, index=frame.index, dtype=object)
+    for header in headers:
+        if header not in frame:
+            continue
+        values = frame[header] if normalize is None else normalize(frame[header])
+        values = values.where(values.notna() & (values.astype(str).str.strip() != ''))
+        result = result.where(result.notna(), values)
+    return result
+
+
+def company_rows(frame, source_id):
+    names = first_present(frame, COMPANY_FIELDS['name'])
+    companies = pd.DataFrame({
+        'name': names.str.strip(),
+        'domain': first_present(frame, COMPANY_FIELDS['domain'], normalize_domains),
+        'state': first_present(frame, COMPANY_FIELDS['state'], normalize_states),
+        'city': first_present(frame, COMPANY_FIELDS['city']),
+        'industry': first_present(frame, COMPANY_FIELDS['industry']),
+        'naics': first_present(frame, COMPANY_FIELDS['naics']),
+        'hts': first_present(frame, HTS_FIELDS),
+        'source_id': source_id,
+    })
+    return companies[names.notna()]
+
+
+def contact_rows(frame, company_names, source_id, role, fields=CONTACT_FIELDS, linkedin='LinkedIn Profile'):
+    contacts = pd.DataFrame({name: frame[fields[name]] if fields.get(name) in frame else None
+                             for name in CONTACT_FIELDS}, index=frame.index)
+    full = contacts['full_name']
+    joined = (contacts['first_name'].fillna('') + ' ' + contacts['last_name'].fillna('')).str.strip()
+    contacts['full_name'] = full.where(full.notna() & (full.astype(str).str.strip() != ''), joined)
+    contacts['linkedin'] = normalize_linkedin(frame[linkedin]).replace('', None) if linkedin in frame else None
+    contacts['state'] = normalize_states(contacts['location']).replace('', None)
+    contacts['company'] = company_names
+    contacts['role'] = role
+    contacts['source_id'] = source_id
+    return contacts[contacts['full_name'].fillna('').str.strip() != '']
+
+
+def docket_frames(frame, source_id):
+    """Split one docket export into its docket, company and contact rows."""
+    from .dockets import COLUMNS, debt_ratios, duration_days, typed
+
+    cases = typed(frame)
+    cases['title'] = frame['Title']
+    cases['county'] = cases['court'].str.extract(COUNTY_PATTERN, expand=False)
+    cases['duration_days'] = duration_days(cases)
+    cases['debt_ratio'] = debt_ratios(cases)
+    cases['started'] = cases['started'].dt.strftime('%Y-%m-%d')
+    cases['finished'] = cases['finished'].dt.strftime('%Y-%m-%d')
+    cases['law_firm'] = frame[COLUMNS['law_firm']]
+    cases['party'] = frame['Party Name']
+    cases['source_id'] = source_id
+
+    firms = pd.DataFrame({'name': frame[COLUMNS['law_firm']], 'source_id': source_id})
+    parties = pd.DataFrame({'name': frame['Party Name'], 'source_id': source_id})
+    companies = pd.concat([firms, parties], ignore_index=True).dropna(subset=['name'])
+
+    attorneys = contact_rows(frame, frame[COLUMNS['law_firm']], source_id, 'attorney',
+                             {'full_name': 'Attorney Name'}, linkedin=None)
+    attorneys['job_title'] = 'Attorney'
+    makers = contact_rows(frame, frame['Party Name'], source_id, 'decision maker',
+                          {'first_name': 'First Name', 'last_name': 'Last Name', 'job_title': 'Job Title'},
+                          linkedin='Linkedin Url')
+    cases['attorney'] = attorneys['full_name'].reindex(frame.index)
+    cases['contact'] = makers['full_name'].reindex(frame.index)
+    return cases, companies, pd.concat([attorneys, makers], ignore_index=True)
+
+
+def key(values):
+    return normalize_names(values).replace('', None)
+
+
+def normalize(conn):
+    """Rebuild companies, company_hts, contacts and dockets from every loaded source."""
+    companies, contacts, cases = [], [], []
+    for source_id, source_types in conn.execute('SELECT id, types FROM sources ORDER BY id').fetchall():
+        header = json.loads(source_types)
+        frame = read_source(conn, source_id, header)
+        if DOCKET_COLUMN in header:
+            docket_cases, docket_companies, docket_contacts = docket_frames(frame, source_id)
+            cases.append(docket_cases)
+            companies.append(docket_companies)
+            contacts.append(docket_contacts)
+            continue
+        if any(column in header for column in COMPANY_FIELDS['name']):
+            companies.append(company_rows(frame, source_id))
+        if any(column in header for column in ('Full Name', 'Last Name')):
+            names = first_present(frame, COMPANY_FIELDS['name'])
+            contacts.append(contact_rows(frame, names, source_id, 'lead'))
+
+    companies = pd.concat(companies, ignore_index=True) if companies else pd.DataFrame(columns=['name'])
+    companies['name_key'] = key(companies['name'])
+    # The first source naming a company wins; later ones only fill its empty fields
+    merged = companies.dropna(subset=['name_key']).groupby('name_key', sort=False).first().reset_index()
+    merged['id'] = range(1, len(merged) + 1)
+    company_ids = dict(zip(merged['name_key'], merged['id']))
+
+    hts = []
+    if 'hts' in merged:
+        from .hts import parse_codes
+        for company_id, text in zip(merged['id'], merged['hts']):
+            hts.extend((company_id, str(code), code.heading) for code in dict.fromkeys(parse_codes(text)))
+
+    contacts = pd.concat(contacts, ignore_index=True) if contacts else pd.DataFrame(
+        columns=['company', 'full_name', 'role'])
+    contacts['company_id'] = key(contacts['company']).map(company_ids)
+    contacts['person_key'] = normalize_people(contacts['full_name'])
+    contacts = contacts.groupby(['company_id', 'person_key', 'role'], sort=False, dropna=False).first().reset_index()
+    contacts['id'] = range(1, len(contacts) + 1)
+    contact_ids = {(company_id, person, role): contact_id for company_id, person, role, contact_id in
+                   zip(contacts['company_id'], contacts['person_key'], contacts['role'], contacts['id'])}
+
+    cases = pd.concat(cases, ignore_index=True) if cases else pd.DataFrame(columns=['docket'])
+    if len(cases):
+        cases['law_firm_id'] = key(cases['law_firm']).map(company_ids)
+        cases['party_id'] = key(cases['party']).map(company_ids)
+        cases['attorney_id'] = [contact_ids.get((firm, person, 'attorney')) for firm, person in
+                                zip(cases['law_firm_id'], normalize_people(cases['attorney']))]
+        cases['contact_id'] = [contact_ids.get((party, person, 'decision maker')) for party, person in
+                               zip(cases['party_id'], normalize_people(cases['contact']))]
+        # A docket repeated in a later export replaces the earlier row
+        cases = cases.dropna(subset=['docket']).drop_duplicates('docket', keep='last')
+
+    with transaction(conn):
+        # executescript would commit first, so the schema runs statement by statement
+        for statement in filter(str.strip, NORMALISED_SCHEMA.split(';')):
+            conn.execute(statement)
+        insert(conn, 'companies', merged, ['id', 'name', 'name_key', 'domain', 'state', 'city', 'industry', 'naics',
+                                           'source_id'])
+        conn.executemany('INSERT OR IGNORE INTO company_hts VALUES (?, ?, ?)', hts)
+        insert(conn, 'contacts', contacts, ['id', 'company_id', 'full_name', 'first_name', 'last_name', 'job_title',
+                                            'role', 'location', 'state', 'linkedin', 'source_id'])
+        if len(cases):
+            cases.insert(0, 'id', range(1, len(cases) + 1))
+            insert(conn, 'dockets', cases, ['id', 'docket', 'court', 'county', 'case_type', 'title', 'status',
+                                            'judge', 'started', 'finished', 'duration_days', 'original_loan',
+                                            'outstanding_debt', 'debt_ratio', 'law_firm_id', 'party_id',
+                                            'attorney_id', 'contact_id', 'source_id'])
+        conn.execute('INSERT OR REPLACE INTO meta VALUES (?, ?)', ('generation', generation(conn)))
+    return {'companies': len(merged), 'company_hts': len(hts), 'contacts': len(contacts), 'dockets': len(cases)}
+
+
+def insert(conn, table, frame, columns):
+    conn.executemany(f'INSERT INTO {table} ({", ".join(columns)}) VALUES ({", ".join("?" * len(columns))})',
+                     rows(frame.reindex(columns=columns)))
+
+
+def generation(conn):
+    digest = hashlib.sha256()
+    for path, sha256 in conn.execute('SELECT path, sha256 FROM sources ORDER BY path'):
+        digest.update(f'{path}\0{sha256}\n'.encode())
+    return digest.hexdigest()
+
+
+def is_normalised(conn):
+    row = conn.execute("SELECT value FROM meta WHERE key = 'generation'").fetchone()
+    return row is not None and row[0] == generation(conn)
+
+
+def dataset_sources(root):
+    """Every dataset CSV under ``root`` and every CSV a named spec reads."""
+    from .batch import csv_files, dataset_dirs
+    from .sheet_specs import SPEC_DIR, load_spec
+
+    sources = [path for folder in dataset_dirs(root) for path in csv_files(folder)]
+    for name in sorted(os.listdir(SPEC_DIR)):
+        if name.endswith('.json'):
+            for sheet in load_spec(os.path.join(SPEC_DIR, name)).sheets:
+                paths = [source['path'] for source in sheet.sources] or [sheet.source]
+                sources.extend(path for path in paths if path.lower().endswith('.csv'))
+    return list(dict.fromkeys(os.path.abspath(path) for path in sources))
+
+
+def load(root, path=None):
+    """Load every source into the store and renormalise if any changed."""
+    conn = connect(path)
+    try:
+        results = []
+        for source in dataset_sources(root):
+            start = time.perf_counter()
+            ingest(conn, source)
+            results.append({'source': os.path.relpath(source, root),
+                            'seconds': round(time.perf_counter() - start, 3)})
+        counts = None if is_normalised(conn) else normalize(conn)
+        return results, counts
+    finally:
+        conn.close()
+
+
+def query(sql, params=(), path=None):
+    conn = connect(path)
+    try:
+        return pd.read_sql_query(sql, conn, params=params)
+    finally:
+        conn.close()
+
+
+def main():
+    from .batch import PUBLIC_DIR
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--database', default=STORE_PATH)
+    commands = parser.add_subparsers(dest='command', required=True)
+    load_parser = commands.add_parser('load', help='load every dataset and rebuild the normalised tables')
+    load_parser.add_argument('--root', default=PUBLIC_DIR, help='directory holding the dataset folders')
+    query_parser = commands.add_parser('query', help='run one SQL statement and print the rows')
+    query_parser.add_argument('sql')
+    args = parser.parse_args()
+
+    if args.command == 'load':
+        start = time.perf_counter()
+        results, counts = load(args.root, args.database)
+        for result in results:
+            print(json.dumps(result))
+        print(json.dumps({'normalised': counts, 'seconds': round(time.perf_counter() - start, 3)}))
+    else:
+        start = time.perf_counter()
+        frame = query(args.sql, path=args.database)
+        print(frame.to_string(index=False))
+        print(f'{len(frame)} rows in {(time.perf_counter() - start) * 1000:.1f} ms')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,51 @@
+"""Named cell styles shared by every sheet of the PCBA workbook."""
+from copy import copy
+
+from openpyxl.styles import Alignment, Border, Font, NamedStyle, PatternFill, Side
+from openpyxl.styles.differential import DifferentialStyle
+
+HEADER = 'PCBA Header'
+BODY = 'PCBA Body'
+TITLE = 'PCBA Title'
+SUMMARY_TITLE = 'Summary Title'
+SUMMARY_HEADING = 'Summary Heading'
+SUMMARY_TEXT = 'Summary Text'
+SUMMARY_BANDED = 'Summary Banded'
+SUMMARY_CELL = 'Summary Cell'
+
+thin = Side(border_style='thin', color='000000')
+border = Border(left=thin, right=thin, top=thin, bottom=thin)
+header_font = Font(name='Arial', size=12, bold=True, color='FFFFFF')
+header_fill = PatternFill(start_color='366092', end_color='366092', fill_type='solid')
+light_fill = PatternFill(start_color='EBF1DE', end_color='EBF1DE', fill_type='solid')
+title_font = Font(name='Arial', size=16, bold=True)
+
+
+def named_styles():
+    # NamedStyle objects bind to a single workbook, so build fresh ones per call
+    return [
+        NamedStyle(HEADER, font=header_font, fill=header_fill, border=border,
+                   alignment=Alignment(horizontal='center', vertical='center', wrap_text=True)),
+        # Body borders come from a conditional-format range, see formatting.py
+        NamedStyle(BODY, alignment=Alignment(vertical='center', wrap_text=True)),
+        NamedStyle(TITLE, font=title_font, alignment=Alignment(horizontal='center', vertical='center')),
+        NamedStyle(SUMMARY_TITLE, font=title_font, border=border,
+                   alignment=Alignment(horizontal='center', vertical='center')),
+        NamedStyle(SUMMARY_HEADING, font=Font(bold=True), border=border,
+                   alignment=Alignment(horizontal='center')),
+        NamedStyle(SUMMARY_TEXT, border=border, alignment=Alignment(wrap_text=True)),
+        NamedStyle(SUMMARY_BANDED, border=border, fill=light_fill, alignment=Alignment(wrap_text=True)),
+        NamedStyle(SUMMARY_CELL, border=border),
+    ]
+
+
+def register(wb):
+    for style in named_styles():
+        if style.name not in wb.named_styles:
+            wb.add_named_style(style)
+            # Reserve the cell style id now so every build numbers styles the
+            # same way and cached sheet XML stays valid. These are openpyxl
+            # internals, so build_cache.render_digest keys on its version
+            wb._cell_styles.add(copy(style.as_tuple()))
+    # Same for the body border used by conditional formatting
+    wb._differential_styles.add(DifferentialStyle(border=border))
@@ -0,0 +1,14 @@
+"""Fixed text of the Summary sheet.
+
+The title, introduction and sources note belong to each workbook and come
+from its spec's ``summary`` (see ``sheet_specs.SummarySpec``).
+"""
+
+NAVIGATION_HEADERS = ["Sheet Name", "Description", "Key Information"]
+
+FILTER_INSTRUCTIONS = [
+    ["1.", "Click on the filter button (funnel icon) in the column header", "Enables filtering for that column"],
+    ["2.", "Use the dropdown menu to select specific values", "Shows only rows matching your criteria"],
+    ["3.", "Multiple filters can be applied across different columns", "Narrows results based on combined criteria"],
+    ["4.", "Clear filters by selecting 'Clear Filter' in the dropdown", "Returns to showing all data"]
+]
@@ -0,0 +1,190 @@
+"""Derived sheets computed from streamed source chunks.
+
+A spec sheet with ``"transform": "<name>"`` passes its filtered source
+chunks through the function registered here, along with the sheet's
+``options``. Each function lists the options that name source columns in
+``inputs`` so only those columns are loaded.
+"""
+import warnings
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+
+from . import entities, validation
+from .hts import LEVELS, HtsIndex, parse_codes
+from .sheet_specs import SOURCE_COLUMN, SPEC_DIR, resolve_path
+from .volumes import VolumeIndex, parse_volumes, volume_amounts
+
+DEFAULT_REFERENCE = 'pcba/hts_codes.csv'
+
+# Target industries from the Overview sheet and the keywords that identify them
+TARGET_INDUSTRIES = {
+    'Medical': ['Medical'],
+    'Oil & Gas': ['Oil & Gas'],
+    'Metering': ['Metering'],
+    'Green Energy': ['Green Energy', 'Solar'],
+    'Aerospace': ['Aerospace', 'Avionics'],
+}
+
+
+def target_industry(values):
+    # First matching target wins; anything else is "Other"
+    values = values.fillna('')
+    conditions = [values.str.contains('|'.join(keywords), case=False, regex=True)
+                  for keywords in TARGET_INDUSTRIES.values()]
+    return pd.Series(np.select(conditions, list(TARGET_INDUSTRIES), default='Other'), index=values.index)
+
+
+def reference_index(reference=None):
+    reference = reference or resolve_path(SPEC_DIR, DEFAULT_REFERENCE)
+    return HtsIndex.from_reference(pd.read_csv(reference, dtype=str))
+
+
+def format_prefix(prefix):
+    return '.'.join(part for part in (prefix[:4], prefix[4:6], prefix[6:8], prefix[8:10]) if part)
+
+
+def hts_rollup(chunks, codes, level=4, value=None, reference=None):
+    """Importers (and import value) per HTS prefix of ``level`` digits.
+
+    ``value`` names a column of USD amounts or volume estimates such as
+    ``~$2–$10M``, which count at the midpoint of their range. An importer's
+    value is split evenly across the codes it lists (see
+    ``HtsIndex.add_record``), so the column totals the dataset's value.
+    """
+    index = reference_index(reference)
+    records = 0
+    for chunk in chunks:
+        values = volume_amounts(chunk[value]) if value else [None] * len(chunk)
+        for text, amount in zip(chunk[codes], values):
+            index.add_record(parse_codes(text), amount)
+            records += 1
+
+    label = LEVELS.get(level, f'{level}-digit')
+    rows = []
+    for prefix, node in index.rollup(level):
+        row = {
+            label: format_prefix(prefix),
+            'Chapter': prefix[:2],
+            'Description': node.description or '',
+            'PCBA Reference Codes': node.references,
+            'Importers': node.count,
+            'Share of Importers': round(node.count / records, 3) if records else 0,
+        }
+        if value:
+            row['Import Value (USD)'] = round(node.value)
+        rows.append(row)
+    columns = [label, 'Chapter', 'Description', 'PCBA Reference Codes', 'Importers', 'Share of Importers']
+    if value:
+        columns.append('Import Value (USD)')
+    table = pd.DataFrame(rows, columns=columns)
+    yield table.sort_values(['Importers', label], ascending=[False, True], ignore_index=True)
+
+
+hts_rollup.inputs = ('codes', 'value')
+
+
+def industry_hts_rollup(chunks, codes, industry, level=4, reference=None):
+    """Importers per target industry and HTS prefix."""
+    reference = reference_index(reference)
+    indexes = {}
+    for chunk in chunks:
+        for target, text in zip(target_industry(chunk[industry]), chunk[codes]):
+            indexes.setdefault(target, HtsIndex()).add_record(parse_codes(text))
+
+    label = LEVELS.get(level, f'{level}-digit')
+    rows = []
+    for target in list(TARGET_INDUSTRIES) + ['Other']:
+        if target not in indexes:
+            continue
+        found = sorted(indexes[target].rollup(level), key=lambda item: (-item[1].count, item[0]))
+        for prefix, node in found:
+            described = reference.node(prefix)
+            rows.append({
+                'Target Industry': target,
+                label: format_prefix(prefix),
+                'Description': described.description if described and described.description else '',
+                'Importers': node.count,
+            })
+    yield pd.DataFrame(rows, columns=['Target Industry', label, 'Description', 'Importers'])
+
+
+industry_hts_rollup.inputs = ('codes', 'industry')
+
+
+def entity_resolution(chunks, name, domain=None, state=None, person=None, linkedin=None, titles=None,
+                      threshold=entities.NAME_THRESHOLD):
+    """One row per company, or per contact when ``person`` or ``linkedin`` is set."""
+    df = pd.concat(list(chunks), ignore_index=True)
+
+    def column(key):
+        return df[key] if key else None
+
+    stats = Counter()
+    labels = entities.resolve_companies(df[name], column(domain), column(state), threshold, stats)
+    if stats['skipped_blocks']:
+        warnings.warn(f"entity resolution skipped {stats['skipped_blocks']} name blocks over "
+                      f"{entities.MAX_BLOCK} rows ({stats['skipped_rows']} rows); their near-duplicates stay apart")
+    if person or linkedin:
+        labels = entities.resolve_contacts(labels, column(person), column(linkedin))
+    yield entities.master_table(df, labels, source=SOURCE_COLUMN, titles=titles, name=name)
+
+
+# Every source column is carried into the master table
+entity_resolution.inputs = None
+
+
+def volume_range(chunks, volume, low=1e6, high=10e6, industry=None, industries=None):
+    """Importers whose estimated annual volume overlaps ``[low, high]`` USD.
+
+    With ``industry`` set, rows are limited to ``industries`` (target
+    industry names, all targets by default). The parsed bounds of the whole
+    source go into one ``VolumeIndex`` and the rows it finds overlapping are
+    returned in source order. Unparsed volumes never overlap.
+    """
+    parts = []
+    for chunk in chunks:
+        bounds = parse_volumes(chunk[volume])
+        chunk = chunk.assign(**{'Volume Low (USD)': bounds['low'], 'Volume High (USD)': bounds['high']})
+        if industry:
+            chunk = chunk.assign(**{'Target Industry': target_industry(chunk[industry])})
+            chunk = chunk[chunk['Target Industry'].isin(industries or list(TARGET_INDUSTRIES))]
+        parts.append(chunk)
+    if not parts:
+        return
+    frame = pd.concat(parts, ignore_index=True)
+    index = VolumeIndex(frame['Volume Low (USD)'], frame['Volume High (USD)'])
+    # The index lists rows by lower bound; sorting the positions restores source order
+    yield frame.iloc[np.sort(index.overlapping(low, high))]
+
+
+# Output keeps the source columns alongside the parsed bounds
+volume_range.inputs = None
+
+
+def data_quality(chunks):
+    """Rule pass/fail counts per source (see ``validation.py``), one block per ``Source`` label."""
+    validators = {}
+    for chunk in chunks:
+        if SOURCE_COLUMN in chunk:
+            for label, part in chunk.groupby(SOURCE_COLUMN, sort=False):
+                validator = validators.setdefault(label, validation.Validator(label))
+                validator.add_chunk(part.drop(columns=SOURCE_COLUMN))
+        else:
+            validators.setdefault('Dataset', validation.Validator('Dataset')).add_chunk(chunk)
+    rows = [row for validator in validators.values() for row in validator.results()]
+    yield pd.DataFrame(rows, columns=validation.COLUMNS)
+
+
+# Rules pick their columns by header, so every source column is read
+data_quality.inputs = None
+
+
+TRANSFORMS = {
+    'hts_rollup': hts_rollup,
+    'industry_hts_rollup': industry_hts_rollup,
+    'entity_resolution': entity_resolution,
+    'volume_range': volume_range,
+    'data_quality': data_quality,
+}
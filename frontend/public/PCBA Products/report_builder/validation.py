@@ -0,0 +1,223 @@
+"""Column-level data quality rules run as vectorised checks over any dataset.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m report_builder.validation
+    python -m report_builder.validation "../Cable Wire Shop/<file>.csv" --output output/data_quality.csv
+
+Rules attach to columns by header, so one rule set covers every lead list,
+importer list and docket export:
+
+* required: company name, full name and docket must not be empty;
+* domain, URL and LinkedIn URL format;
+* state: a two-letter code or full US state name;
+* NAICS shape: 2 to 6 digits per code, several codes split by ``/ , ;``;
+* HTS code shape: every ``;``-separated item names a 4-digit heading or longer;
+* volume range: the import estimate parses into USD bounds;
+* unique key: docket, else LinkedIn URL for contacts, else domain or company name.
+
+Each rule is one string operation over a whole column, never a loop over
+rows, and a dataset is read once in chunks. Results are per-rule checked,
+passed and failed counts with a failing example; the "all rules" row counts
+rows that failed nothing. Only non-empty values are checked, except by the
+required rule. The ``data_quality`` transform puts the same table into a
+workbook sheet.
+"""
+import argparse
+import json
+import os
+import re
+import time
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+from .entities import normalize_domains, normalize_linkedin, normalize_names, normalize_states
+from .hts import CODE_PATTERN
+from .volumes import parse_volumes
+
+DOMAIN_PATTERN = r'[a-z0-9-]+(?:\.[a-z0-9-]+)+'
+URL_PATTERN = r'https?://[^\s/$.?#][^\s]*'
+LINKEDIN_PATTERN = r'(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/(?:in|company|pub|school)/[^\s/]+/?'
+NAICS_PATTERN = r'\d{2,6}'
+ALL_RULES = 'all rules'
+UNIQUE_RULE = 'unique key'
+COLUMNS = ['Dataset', 'Column', 'Rule', 'Checked', 'Passed', 'Failed', 'Pass Rate', 'Example Failure']
+
+
+def text(values):
+    return values.fillna('').astype(str).str.strip()
+
+
+def all_parts(values, separator, check):
+    """Whether every ``separator``-delimited part of each value passes ``check``."""
+    parts = values.str.split(separator, regex=True).explode().str.strip()
+    parts = parts[parts != '']
+    return check(parts).groupby(level=0).all().reindex(values.index, fill_value=False)
+
+
+def valid_domains(values):
+    return normalize_domains(values).str.fullmatch(DOMAIN_PATTERN)
+
+
+def valid_urls(values):
+    return values.str.fullmatch(URL_PATTERN, case=False)
+
+
+def valid_linkedin(values):
+    return values.str.fullmatch(LINKEDIN_PATTERN, case=False)
+
+
+def valid_states(values):
+    return normalize_states(values) != ''
+
+
+def valid_naics(values):
+    return all_parts(values, r'[/,;]', lambda parts: parts.str.fullmatch(NAICS_PATTERN))
+
+
+def valid_hts(values):
+    return all_parts(values, r';', lambda parts: parts.str.extract(CODE_PATTERN)[0].notna())
+
+
+def valid_volumes(values):
+    return parse_volumes(values)['low'].notna()
+
+
+@dataclass(frozen=True)
+class Rule:
+    name: str
+    header: str
+    check: object
+    required: bool = False
+
+    def applies(self, column):
+        return re.search(self.header, str(column), re.IGNORECASE) is not None
+
+
+RULES = [
+    Rule('required', r'^(company name|company|name|full name|docket)$', lambda values: values != '', required=True),
+    Rule('domain format', r'^(company domain|domain|website|all websites)$', valid_domains),
+    Rule('URL format', r'^(?!.*linked\s*in).*(\burl\b|^link \d)', valid_urls),
+    Rule('LinkedIn URL format', r'^linked\s*in (profile|url)$', valid_linkedin),
+    Rule('state code', r'^state$', valid_states),
+    Rule('NAICS shape', r'^naics$', valid_naics),
+    Rule('HTS code shape', r'hts codes?\b', valid_hts),
+    Rule('volume range parses', r'^approx\. annual pcba import', valid_volumes),
+]
+# The first header found identifies a row for the duplicate check
+KEY_COLUMNS = [
+    (r'^docket$', lambda values: text(values).str.lower()),
+    (r'^linked\s*in (profile|url)$', normalize_linkedin),
+    (r'^(company domain|domain)$', normalize_domains),
+    (r'^(company name|company|name)$', normalize_names),
+]
+
+
+def key_column(columns):
+    for pattern, normalize in KEY_COLUMNS:
+        for column in columns:
+            if re.search(pattern, str(column), re.IGNORECASE):
+                return column, normalize
+    return None, None
+
+
+class Validator:
+    """Accumulates rule counts for one dataset over its chunks."""
+
+    def __init__(self, dataset):
+        self.dataset = dataset
+        self.counts = {}
+        self.examples = {}
+        self.failed_rows = []
+        self.keys = []
+        self.key = None
+
+    def add_chunk(self, chunk):
+        failed = np.zeros(len(chunk), dtype=bool)
+        for column in chunk.columns:
+            rules = [rule for rule in RULES if rule.applies(column)]
+            if not rules:
+                continue
+            values = text(chunk[column])
+            present = (values != '').to_numpy()
+            for rule in rules:
+                checked = np.ones(len(chunk), dtype=bool) if rule.required else present
+                passed = rule.check(values).fillna(False).to_numpy(dtype=bool) & checked
+                failures = checked & ~passed
+                counts = self.counts.setdefault((column, rule.name), [0, 0])
+                counts[0] += int(checked.sum())
+                counts[1] += int(passed.sum())
+                if failures.any() and (column, rule.name) not in self.examples:
+                    self.examples[column, rule.name] = values[failures].iloc[0]
+                failed |= failures
+        self.failed_rows.append(failed)
+        if self.key is None:
+            self.key = key_column(chunk.columns)
+        column, normalize = self.key
+        if column is not None:
+            self.keys.append(normalize(chunk[column]).reset_index(drop=True))
+
+    def results(self):
+        failed = np.concatenate(self.failed_rows) if self.failed_rows else np.zeros(0, dtype=bool)
+        rows = [self.row(column, rule, checked, passed) for (column, rule), (checked, passed) in self.counts.items()]
+        column = self.key[0] if self.key else None
+        if column is not None:
+            keys = pd.concat(self.keys, ignore_index=True)
+            present = (keys != '').to_numpy()
+            duplicated = keys.duplicated().to_numpy() & present
+            if duplicated.any():
+                self.examples[column, UNIQUE_RULE] = keys[duplicated].iloc[0]
+            rows.append(self.row(column, UNIQUE_RULE, int(present.sum()), int(present.sum() - duplicated.sum())))
+            failed |= duplicated
+        rows.append(self.row('', ALL_RULES, len(failed), int((~failed).sum())))
+        return rows
+
+    def row(self, column, rule, checked, passed):
+        return [self.dataset, column, rule, checked, passed, checked - passed,
+                round(passed / checked, 4) if checked else None, self.examples.get((column, rule))]
+
+
+def validate(chunks, dataset):
+    validator = Validator(dataset)
+    for chunk in chunks:
+        validator.add_chunk(chunk)
+    return pd.DataFrame(validator.results(), columns=COLUMNS)
+
+
+def validate_sources(sources, root):
+    from .pages import source_chunks
+
+    frames = []
+    for source in sources:
+        start = time.perf_counter()
+        frame = validate(source_chunks(source, 50_000), os.path.relpath(source, root))
+        frames.append(frame)
+        overall = frame.iloc[-1]
+        print(json.dumps({'dataset': overall['Dataset'], 'rows': int(overall['Checked']),
+                          'rows_passing': int(overall['Passed']), 'rules': len(frame) - 1,
+                          'seconds': round(time.perf_counter() - start, 3)}))
+    return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=COLUMNS)
+
+
+def main():
+    from .batch import PUBLIC_DIR, csv_files, dataset_dirs
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('sources', nargs='*', help='CSVs to validate (default: every dataset under --root)')
+    parser.add_argument('--root', default=PUBLIC_DIR, help='directory holding the dataset folders')
+    parser.add_argument('--output', help='write every rule result to this CSV')
+    args = parser.parse_args()
+
+    sources = args.sources or [path for folder in dataset_dirs(args.root) for path in csv_files(folder)]
+    results = validate_sources([os.path.abspath(path) for path in sources], args.root)
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        results.to_csv(args.output, index=False)
+    else:
+        print(results.to_string(index=False))
+
+
+if __name__ == '__main__':
+    main()
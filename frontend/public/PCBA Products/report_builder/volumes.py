@@ -0,0 +1,138 @@
+"""Import volume estimates parsed into numeric ranges, and a range index.
+
+The ICTC exports give annual PCBA imports as analyst estimates such as
+``~$2–$10M``, ``~$1M``, ``~$10M (upper range)`` or ``Low–mid single-digit
+millions``. ``parse_volumes`` turns a column of these into lower and upper
+bounds in USD; a single figure is a zero-width range and anything
+unrecognised is NaN. ``VolumeIndex`` keeps the bounds of a whole source
+sorted: the ``volume_range`` sheet transform builds one per source and
+takes its rows from ``overlapping``, and once built (see ``sheet_index``)
+every further overlap count such as "$1M–$10M" is two binary searches.
+
+Run from the ``PCBA Products`` directory to count the importers of every
+``volume_range`` sheet in a spec that overlap its target, or other ranges::
+
+    python -m report_builder.volumes
+    python -m report_builder.volumes pcba --range '$1M-$10M' --range '$10M-$50M'
+"""
+import argparse
+import json
+
+import numpy as np
+import pandas as pd
+
+UNITS = {'K': 1e3, 'M': 1e6, 'B': 1e9}
+# "~$2–$10M", "$1.5M-2M", "~$10M (upper range)"
+RANGE_PATTERN = (r'\$?\s*(?P<low>\d+(?:\.\d+)?)\s*(?P<low_unit>[KMB])?'
+                 r'(?:\s*(?:[–—-]|to)\s*\$?\s*(?P<high>\d+(?:\.\d+)?))?\s*(?P<unit>[KMB])')
+# "Low–mid single-digit millions"
+WORD_RANGES = {'low': (1, 3), 'mid': (4, 6), 'high': (7, 9)}
+WORD_PATTERN = r'(?P<first>low|mid|high)(?:\s*[–—-]\s*(?P<last>low|mid|high))?\s+single[- ]digit\s+millions'
+
+
+def parse_volumes(values):
+    """Return a DataFrame of ``low`` and ``high`` USD bounds for each value."""
+    values = values.fillna('').astype(str)
+    found = values.str.upper().str.extract(RANGE_PATTERN)
+    unit = found['unit'].map(UNITS)
+    low = found['low'].astype(float) * found['low_unit'].map(UNITS).fillna(unit)
+    high = found['high'].astype(float).fillna(found['low'].astype(float)) * unit
+
+    words = values.str.lower().str.extract(WORD_PATTERN)
+    first = words['first'].map(lambda word: WORD_RANGES[word][0] if isinstance(word, str) else np.nan)
+    last = words['last'].fillna(words['first']).map(
+        lambda word: WORD_RANGES[word][1] if isinstance(word, str) else np.nan)
+    low = low.fillna(first * 1e6)
+    high = high.fillna(last * 1e6)
+    return pd.DataFrame({'low': low, 'high': high}, index=values.index)
+
+
+def volume_amounts(values):
+    """One USD figure per value: plain numbers as given, estimates at the midpoint of their range."""
+    amounts = pd.to_numeric(values.astype(str).str.replace(r'[$,\s]', '', regex=True), errors='coerce')
+    bounds = parse_volumes(values)
+    return amounts.fillna((bounds['low'] + bounds['high']) / 2)
+
+
+def volume_label(low, high):
+    if np.isnan(low):
+        return ''
+    if low == high:
+        return f'${low / 1e6:g}M'
+    return f'${low / 1e6:g}M–${high / 1e6:g}M'
+
+
+class VolumeIndex:
+    """Static interval index over ``(low, high)`` volume ranges.
+
+    Rows are kept sorted by ``low`` with a second ordering by ``high``. An
+    interval misses ``[low, high]`` exactly when it starts above ``high`` or
+    ends below ``low``, and those two sets are disjoint, so ``count`` is two
+    binary searches. ``overlapping`` scans only the rows that start at or
+    below ``high``.
+    """
+
+    def __init__(self, lows, highs, rows=None):
+        lows, highs = np.asarray(lows, dtype=float), np.asarray(highs, dtype=float)
+        rows = np.arange(len(lows)) if rows is None else np.asarray(rows)
+        known = ~(np.isnan(lows) | np.isnan(highs))
+        lows, highs, rows = lows[known], highs[known], rows[known]
+        order = np.argsort(lows, kind='stable')
+        self.lows, self.highs, self.rows = lows[order], highs[order], rows[order]
+        self.sorted_highs = np.sort(highs)
+
+    @classmethod
+    def from_frame(cls, bounds):
+        return cls(bounds['low'], bounds['high'], bounds.index)
+
+    def __len__(self):
+        return len(self.lows)
+
+    def count(self, low, high):
+        starts_above = len(self.lows) - np.searchsorted(self.lows, high, side='right')
+        ends_below = np.searchsorted(self.sorted_highs, low, side='left')
+        return len(self.lows) - starts_above - ends_below
+
+    def overlapping(self, low, high):
+        """Row labels whose range overlaps ``[low, high]``, in ascending ``low`` order."""
+        end = np.searchsorted(self.lows, high, side='right')
+        return self.rows[:end][self.highs[:end] >= low]
+
+
+def sheet_index(sheet):
+    """A ``VolumeIndex`` over the source rows of a ``volume_range`` sheet, read one column at a time."""
+    from .sheet_specs import source_chunks
+
+    column = sheet.options['volume']
+    bounds = [parse_volumes(chunk[column]) for chunk in source_chunks(sheet, sheet.source, [column])]
+    bounds = pd.concat(bounds, ignore_index=True) if bounds else pd.DataFrame(columns=['low', 'high'])
+    return VolumeIndex.from_frame(bounds), len(bounds)
+
+
+def main():
+    from .sheet_specs import load_spec
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('spec', nargs='?', default='pcba', help='spec name or path')
+    parser.add_argument('--range', action='append', dest='ranges', metavar='VOLUME',
+                        help="a range such as '$1M-$10M' (default: each sheet's low and high)")
+    args = parser.parse_args()
+
+    queries = parse_volumes(pd.Series(args.ranges)) if args.ranges else None
+    if queries is not None and queries['low'].isna().any():
+        parser.error(f"cannot parse --range {args.ranges[int(queries['low'].isna().argmax())]!r}")
+    for sheet in load_spec(args.spec).sheets:
+        if sheet.transform != 'volume_range' or not sheet.source:
+            continue
+        index, rows = sheet_index(sheet)
+        if queries is None:
+            ranges = [(sheet.options.get('low', 1e6), sheet.options.get('high', 10e6))]
+        else:
+            ranges = zip(queries['low'], queries['high'])
+        for low, high in ranges:
+            print(json.dumps({'sheet': sheet.name, 'range': volume_label(low, high), 'rows': rows,
+                              'parsed': len(index), 'overlapping': int(index.count(low, high))}))
+
+
+if __name__ == '__main__':
+    main()
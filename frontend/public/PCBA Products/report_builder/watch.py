@@ -0,0 +1,390 @@
+"""Watch the dataset folders and rebuild only the outputs a changed file feeds.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m report_builder.watch
+    python -m report_builder.watch --poll 2 --debounce 2 --workers 2 --initial
+
+Every output is a target with the set of files it reads:
+
+* the workbook of each named spec: its sheet and chart sources, HTS
+  references and the spec file itself;
+* one workbook per dataset folder, as ``batch --mode folder`` builds it;
+* the paged JSON export of each dataset CSV;
+* the docket ``analytics_summary.json``, from the ``Search-Dockets-*.csv``
+  exports.
+
+On Linux the folders holding those files are watched with inotify, called
+through ``ctypes``; elsewhere, or with ``--poll``, they are rescanned every
+few seconds and compared by mtime and size. Events are debounced: a burst
+of writes, such as copying several CSVs, becomes one rebuild once nothing
+has changed for ``--debounce`` seconds. Only targets that read a changed file
+are rebuilt, on a thread pool. A target that changes again while it runs is
+queued to run once more, never twice at the same time. A new or deleted
+file rediscovers the targets first, so a CSV dropped into a dataset folder
+gets its own JSON export and joins its folder's workbook.
+
+The process stays up between drops, so pandas and openpyxl load once and
+the store keeps every table it has read in memory until its file changes
+(``store.keep_warm``). Workbooks are built by ``build_spec``, so unchanged
+sheets come from the sheet cache, and exports whose CSV content is unchanged
+are skipped. A changed docket export refolds the summary from scratch; new
+exports are folded in incrementally. The rewritten summary feeds the
+foreclosure dockets workbook's duration chart, so that workbook is rebuilt
+on the next cycle.
+"""
+import argparse
+import ctypes
+import ctypes.util
+import fnmatch
+import json
+import os
+import select
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+
+from . import dockets, store
+from .batch import PUBLIC_DIR, csv_files, dataset_dirs, discover_jobs, named_specs
+from .cli import OUTPUT_DIR
+from .pages import DEFAULT_OUTPUT, export_dataset, slug
+from .sheet_specs import SPEC_DIR
+from .workbook import build_spec
+
+DEBOUNCE = 1.0
+# A folder that never goes quiet is still rebuilt after this long
+MAX_DELAY = 10.0
+POLL_INTERVAL = 2.0
+DATA_EXTENSIONS = ('.csv', '.json', '.jsonl')
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+EVENT = struct.Struct('iIII')
+WATCH_MASK = IN_CLOSE_WRITE | IN_MOVED_FROM | IN_MOVED_TO | IN_CREATE | IN_DELETE
+
+
+def relevant(path):
+    name = os.path.basename(path)
+    # Editors and copies write temporary names first; the final rename is the event that counts
+    return not name.startswith(('.', '~')) and name.lower().endswith(DATA_EXTENSIONS)
+
+
+@dataclass(frozen=True)
+class Target:
+    label: str
+    inputs: frozenset
+    build: object
+
+    def run(self, refold):
+        return self.build(refold)
+
+
+def spec_inputs(spec, spec_file=None):
+    paths = {spec_file} if spec_file else set()
+    for sheet in spec.sheets:
+        paths.update(source['path'] for source in sheet.sources)
+        if sheet.source:
+            paths.add(sheet.source)
+        if sheet.options.get('reference'):
+            paths.add(sheet.options['reference'])
+    for chart in spec.charts:
+        paths.update(chart[key] for key in ('source', 'summary') if chart.get(key))
+    return frozenset(os.path.abspath(path) for path in paths)
+
+
+def workbook_target(label, spec, output_dir, spec_file=None):
+    def build(refold):
+        return {'workbook': build_spec(spec, output_dir)}
+    return Target(f'workbook:{label}', spec_inputs(spec, spec_file), build)
+
+
+def pages_target(root, folder, source, pages_dir):
+    def build(refold):
+        manifest = export_dataset(source, os.path.join(pages_dir, slug(folder), slug(source)))
+        return {'pages': len(manifest['pages']) if manifest else None,
+                'status': 'written' if manifest else 'unchanged'}
+    return Target(f'pages:{os.path.relpath(source, root)}', frozenset([os.path.abspath(source)]), build)
+
+
+def dockets_target(law_dir):
+    exports = frozenset(os.path.abspath(path) for path in csv_files(law_dir)
+                        if fnmatch.fnmatch(os.path.basename(path), dockets.EXPORT_PATTERN))
+
+    def build(refold):
+        # Aggregates only grow, so a changed or deleted export means starting over
+        folded, summary = dockets.update(law_dir, sorted(exports), rebuild=refold)
+        return {'folded': len(folded), 'total_cases': summary['total_cases']}
+    return Target('summary:dockets', exports, build)
+
+
+def discover(root=PUBLIC_DIR, output_dir=OUTPUT_DIR, pages_dir=DEFAULT_OUTPUT, pages=True):
+    """Every target and the folders to watch for it."""
+    specs = set(named_specs())
+    targets = []
+    for label, spec, job_output in discover_jobs(root, output_dir, 'folder'):
+        spec_file = os.path.join(SPEC_DIR, f'{label}.json') if label in specs else None
+        targets.append(workbook_target(label, spec, job_output, spec_file))
+    for folder in dataset_dirs(root):
+        if pages:
+            targets.extend(pages_target(root, folder, source, pages_dir) for source in csv_files(folder))
+    law_dir = os.path.join(root, os.path.basename(dockets.LAW_DIR))
+    if os.path.isdir(law_dir):
+        targets.append(dockets_target(law_dir))
+
+    folders = {os.path.dirname(path) for target in targets for path in target.inputs}
+    # Every dataset folder, even one without CSVs yet, and the root for new folders
+    folders.update(entry.path for entry in os.scandir(root) if entry.is_dir())
+    folders.add(root)
+    return targets, sorted(folders)
+
+
+class InotifyWatcher:
+    """Changed files in the watched folders, from the Linux inotify API."""
+
+    def __init__(self):
+        self.libc = ctypes.CDLL(ctypes.util.find_library('c') or 'libc.so.6', use_errno=True)
+        self.fd = self.libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        self.folders = {}
+
+    def watch(self, folders):
+        for folder in folders:
+            if folder in self.folders.values():
+                continue
+            wd = self.libc.inotify_add_watch(self.fd, os.fsencode(folder), WATCH_MASK)
+            if wd < 0:
+                raise OSError(ctypes.get_errno(), f'cannot watch {folder}')
+            self.folders[wd] = folder
+
+    def changes(self, timeout):
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return set()
+        data = os.read(self.fd, 64 * 1024)
+        changed = set()
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = EVENT.unpack_from(data, offset)
+            name = data[offset + EVENT.size:offset + EVENT.size + length].rstrip(b'\0')
+            offset += EVENT.size + length
+            if mask & IN_Q_OVERFLOW:
+                # Events were dropped: treat every file being watched as changed
+                changed.update(os.path.join(folder, entry) for folder in self.folders.values()
+                               for entry in os.listdir(folder))
+                continue
+            if mask & IN_IGNORED:
+                # The folder itself went away; watch it again if it comes back
+                self.folders.pop(wd, None)
+                continue
+            folder = self.folders.get(wd)
+            if folder is None or not name:
+                continue
+            path = os.path.join(folder, os.fsdecode(name))
+            # Files count once written; folders only when they appear or go
+            if mask & IN_ISDIR or not mask & IN_CREATE:
+                changed.add(path)
+        return changed
+
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingWatcher:
+    """Changed files in the watched folders, found by comparing mtime and size."""
+
+    def __init__(self, interval=POLL_INTERVAL):
+        self.interval = interval
+        self.folders = []
+        self.snapshot = {}
+
+    def scan(self, folder):
+        found = {}
+        for entry in os.scandir(folder):
+            # A folder's mtime moves with every file in it; only its presence matters
+            found[entry.path] = None if entry.is_dir() else (entry.stat().st_mtime_ns, entry.stat().st_size)
+        return found
+
+    def watch(self, folders):
+        for folder in folders:
+            if folder not in self.folders:
+                self.folders.append(folder)
+                self.snapshot.update(self.scan(folder))
+
+    def changes(self, timeout):
+        time.sleep(min(timeout, self.interval))
+        current = {}
+        for folder in self.folders:
+            if os.path.isdir(folder):
+                current.update(self.scan(folder))
+        changed = {path for path in current.keys() | self.snapshot.keys()
+                   if current.get(path, 0) != self.snapshot.get(path, 0)}
+        self.snapshot = current
+        return changed
+
+    def close(self):
+        pass
+
+
+class Scheduler:
+    """Runs targets on a thread pool, at most one build per target at a time."""
+
+    def __init__(self, workers):
+        self.pool = ThreadPoolExecutor(max_workers=workers)
+        self.lock = threading.Lock()
+        # label -> the (target, refold) to run again once the current build ends, or None
+        self.running = {}
+
+    def submit(self, target, refold=False):
+        with self.lock:
+            if target.label in self.running:
+                # The running build may have read the file before it changed
+                queued = self.running[target.label]
+                self.running[target.label] = (target, refold or bool(queued and queued[1]))
+                return
+            self.running[target.label] = None
+        self.pool.submit(self.run, target, refold)
+
+    def run(self, target, refold):
+        while True:
+            start = time.perf_counter()
+            try:
+                # Targets may report their own outcome, such as an unchanged export
+                result = dict({'status': 'ok'}, **target.run(refold))
+            except Exception as error:
+                # One bad file must not stop the daemon; the next change retries
+                result = {'status': 'error', 'error': f'{type(error).__name__}: {error}'}
+            print(json.dumps(dict(result, target=target.label, seconds=round(time.perf_counter() - start, 3))),
+                  flush=True)
+            with self.lock:
+                queued = self.running[target.label]
+                if queued is None:
+                    del self.running[target.label]
+                    return
+                self.running[target.label] = None
+            target, refold = queued
+
+    def shutdown(self):
+        self.pool.shutdown(wait=True)
+
+
+class Daemon:
+    def __init__(self, watcher, scheduler, root=PUBLIC_DIR, output_dir=OUTPUT_DIR, pages_dir=DEFAULT_OUTPUT):
+        self.watcher = watcher
+        self.scheduler = scheduler
+        self.root = root
+        self.output_dir = output_dir
+        self.pages_dir = pages_dir
+        self.targets = []
+        self.inputs = set()
+        self.rediscover()
+
+    def rediscover(self):
+        self.targets, folders = discover(self.root, self.output_dir, self.pages_dir, pages=bool(self.pages_dir))
+        self.inputs = set().union(*(target.inputs for target in self.targets))
+        self.watcher.watch(folders)
+
+    def warm(self):
+        """Read every CSV input once so the first rebuild finds it in memory."""
+        if not store.enabled():
+            return
+        store.keep_warm()
+        for path in sorted(self.inputs):
+            if path.lower().endswith('.csv') and os.path.exists(path):
+                store.warm_table(path)
+
+    def dispatch(self, changed):
+        """Submit every target reading a changed file; returns their labels."""
+        changed = {os.path.abspath(path) for path in changed}
+        known = self.inputs
+        previous = {target.label: target.inputs for target in self.targets}
+        if any(path not in known or not os.path.exists(path) or path.startswith(SPEC_DIR) for path in changed):
+            # New or removed files and edited specs change the targets themselves
+            self.rediscover()
+        for path in changed:
+            if not os.path.exists(path):
+                store.forget(path)
+        labels = []
+        for target in self.targets:
+            hits = changed & (target.inputs | previous.get(target.label, frozenset()))
+            if hits:
+                self.scheduler.submit(target, refold=bool(hits & previous.get(target.label, frozenset())))
+                labels.append(target.label)
+        return labels
+
+    def build_all(self):
+        for target in self.targets:
+            self.scheduler.submit(target)
+
+    def loop(self, debounce=DEBOUNCE, max_delay=MAX_DELAY):
+        pending = set()
+        first = last = None
+        while True:
+            timeout = debounce if not pending else max(0.0, min(last + debounce, first + max_delay) - time.monotonic())
+            changed = {path for path in self.watcher.changes(timeout) if relevant(path) or os.path.isdir(path)}
+            now = time.monotonic()
+            if changed:
+                pending |= changed
+                first = first or now
+                last = now
+            if pending and (now - last >= debounce or now - first >= max_delay):
+                labels = self.dispatch(pending)
+                print(json.dumps({'changed': sorted(os.path.relpath(path, self.root) for path in pending),
+                                  'rebuilding': labels}), flush=True)
+                pending = set()
+                first = last = None
+
+
+def make_watcher(poll=None):
+    if poll is None:
+        try:
+            return InotifyWatcher()
+        except (OSError, AttributeError):
+            # No inotify (macOS, Windows, or exhausted watches): fall back to polling
+            pass
+    return PollingWatcher(poll or POLL_INTERVAL)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--root', default=PUBLIC_DIR, help='directory holding the dataset folders')
+    parser.add_argument('--output-dir', default=OUTPUT_DIR, help='where workbooks are written')
+    parser.add_argument('--poll', type=float, metavar='SECONDS', help='rescan on this interval instead of inotify')
+    parser.add_argument('--debounce', type=float, default=DEBOUNCE, help='quiet seconds before rebuilding')
+    parser.add_argument('--workers', type=int, default=os.cpu_count())
+    parser.add_argument('--pages-dir', default=DEFAULT_OUTPUT, help='where the paged JSON exports are written')
+    parser.add_argument('--no-pages', action='store_true', help='leave the paged JSON exports alone')
+    parser.add_argument('--initial', action='store_true', help='build every target once at startup')
+    args = parser.parse_args()
+
+    watcher = make_watcher(args.poll)
+    scheduler = Scheduler(args.workers)
+    start = time.perf_counter()
+    daemon = Daemon(watcher, scheduler, args.root, args.output_dir, None if args.no_pages else args.pages_dir)
+    daemon.warm()
+    print(json.dumps({'watching': len(watcher.folders), 'targets': len(daemon.targets),
+                      'watcher': type(watcher).__name__, 'warm_seconds': round(time.perf_counter() - start, 3)}),
+          flush=True)
+    if args.initial:
+        daemon.build_all()
+    try:
+        daemon.loop(args.debounce)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
+        scheduler.shutdown()
+
+
+if __name__ == '__main__':
+    main()
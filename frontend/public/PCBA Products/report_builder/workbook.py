@@ -0,0 +1,239 @@
+"""Single-pass streaming build of the PCBA workbook.
+
+Every sheet, including its styles, table, filter and the Summary sheet, is
+written through an openpyxl write-only workbook. Rows are serialised as soon
+as they are appended and the file is zipped once, so memory stays flat no
+matter how many rows a sheet has.
+"""
+import os
+import re
+import tempfile
+import warnings
+import zipfile
+
+from openpyxl import Workbook
+from openpyxl.cell import WriteOnlyCell
+from openpyxl.utils import get_column_letter
+from openpyxl.worksheet.table import Table, TableStyleInfo
+
+from . import charts, styles, summary
+from .build_cache import CACHE_DIR, SheetCache, render_digest, sheet_fingerprint, splice
+from .formatting import body_border_rule
+from .metrics import BuildMetrics
+from .sheet_specs import SummarySpec, load_spec, navigation_rows, sheet_from_spec
+
+SUMMARY_COLUMNS = 4
+SUMMARY_WIDTHS = {'A': 20, 'B': 30, 'C': 40}
+
+
+def styled_row(ws, values, style):
+    row = []
+    for value in values:
+        cell = WriteOnlyCell(ws, value)
+        cell.style = style
+        row.append(cell)
+    return row
+
+
+def table_name(name, taken):
+    """A table name for sheet ``name`` unlike any in ``taken``, which it joins.
+
+    Table names may only hold letters, digits and underscores and must be
+    unique in the workbook regardless of case, so "Top-Importers" after
+    "Top Importers" becomes ``Table_Top_Importers_2``.
+    """
+    base = 'Table_' + re.sub(r'\W', '_', name)
+    candidate, n = base, 2
+    while candidate.lower() in taken:
+        candidate, n = f'{base}_{n}', n + 1
+    taken.add(candidate.lower())
+    return candidate
+
+
+def table_names(names):
+    """Table name per sheet name, in workbook order, as ``build_workbook`` assigns them."""
+    taken = set()
+    return {name: table_name(name, taken) for name in names}
+
+
+def add_table(ws, name, columns, ref):
+    tab = Table(displayName=name, ref=ref)
+    # Write-only sheets cannot be read back, so name the columns up front
+    tab._initialise_columns()
+    for column, header in zip(tab.tableColumns, columns):
+        column.name = str(header)
+    tab.tableStyleInfo = TableStyleInfo(name="TableStyleMedium2", showFirstColumn=False,
+                                        showLastColumn=False, showRowStripes=True,
+                                        showColumnStripes=False)
+    with warnings.catch_warnings():
+        # openpyxl warns on every write-only table; the columns are set above
+        warnings.simplefilter('ignore', UserWarning)
+        ws.add_table(tab)
+
+
+def write_data_sheet(wb, name, columns, rows, widths, title=None, table=None):
+    ws = wb.create_sheet(name)
+    # Column dimensions are written before the first row, so set them now
+    for idx, width in enumerate(widths, 1):
+        ws.column_dimensions[get_column_letter(idx)].width = width
+
+    last_column = get_column_letter(len(columns))
+    header_row = 1
+    if title:
+        ws.append(styled_row(ws, [title], styles.TITLE))
+        ws.merged_cells.add(f'A1:{last_column}1')
+        header_row = 2
+    ws.append(styled_row(ws, columns, styles.HEADER))
+
+    # Every data cell gets the body alignment, as the three-step build gave it
+    count = 0
+    for count, values in enumerate(rows, 1):
+        ws.append(styled_row(ws, values, styles.BODY))
+
+    # The table carries the header filter buttons and row banding
+    if count:
+        body = f'A{header_row + 1}:{last_column}{header_row + count}'
+        ws.conditional_formatting.add(body, body_border_rule())
+        add_table(ws, table or table_name(name, set()), columns, f'A{header_row}:{last_column}{header_row + count}')
+    return count
+
+
+def summary_layout(summary_spec, navigation):
+    # Yields (values, style, merged row count) for each Summary row in order
+    yield [summary_spec.title], styles.SUMMARY_TITLE, 1
+    yield [], None, 0
+    if summary_spec.introduction:
+        for line in summary_spec.introduction:
+            yield [line], styles.SUMMARY_TEXT, 1
+        yield [], None, 0
+    yield ["SHEET NAVIGATION GUIDE"], styles.SUMMARY_HEADING, 1
+    yield summary.NAVIGATION_HEADERS, styles.SUMMARY_HEADING, 0
+    for idx, info in enumerate(navigation):
+        yield info, styles.SUMMARY_BANDED if idx % 2 == 0 else styles.SUMMARY_TEXT, 0
+    yield [], None, 0
+    yield [], None, 0
+    yield ["FILTERING INSTRUCTIONS"], styles.SUMMARY_HEADING, 1
+    for idx, info in enumerate(summary.FILTER_INSTRUCTIONS):
+        yield info, styles.SUMMARY_BANDED if idx % 2 == 0 else styles.SUMMARY_TEXT, 0
+    yield [], None, 0
+    if summary_spec.sources:
+        yield [summary_spec.sources], styles.SUMMARY_TEXT, 3
+        yield [], None, 0
+        yield [], None, 0
+
+
+def write_summary_sheet(wb, summary_spec, navigation):
+    ws = wb.create_sheet('Summary')
+    for letter, width in SUMMARY_WIDTHS.items():
+        ws.column_dimensions[letter].width = width
+
+    last_column = get_column_letter(SUMMARY_COLUMNS)
+    for row, (values, style, merged) in enumerate(summary_layout(summary_spec, navigation), 1):
+        cells = styled_row(ws, values, style) if values else []
+        # Pad every row so the bordered block stays rectangular
+        cells += styled_row(ws, [None] * (SUMMARY_COLUMNS - len(cells)), styles.SUMMARY_CELL)
+        ws.append(cells)
+        if merged:
+            ws.merged_cells.add(f'A{row}:{last_column}{row + merged - 1}')
+    return ws
+
+
+def build_workbook(excel_file, sheets, navigation=None, metrics=None, chart_tables=None, summary_spec=None):
+    """Write the whole workbook in one streaming pass.
+
+    ``sheets`` is an iterable of ``(name, columns, rows, widths, title)``;
+    ``rows`` may be any lazy iterable of row tuples and ``columns=None``
+    writes an empty placeholder sheet. A Summary sheet with the text of
+    ``summary_spec`` and listing ``navigation`` rows is written first when
+    given, with a chart per ``(chart, table)`` in ``chart_tables`` beside
+    it. Stages are recorded on ``metrics``.
+    """
+    metrics = metrics or BuildMetrics('build')
+    wb = Workbook(write_only=True)
+    styles.register(wb)
+    summary_sheet = None
+    # Placeholders take their names too, so a sheet's table name does not
+    # depend on which earlier sheets came from the cache
+    tables = set()
+    if navigation:
+        with metrics.stage('summary', cells=len(navigation) * 4):
+            summary_sheet = write_summary_sheet(wb, summary_spec or SummarySpec(), navigation)
+    cells = 0
+    for name, columns, rows, widths, title in sheets:
+        table = table_name(name, tables)
+        if columns is None:
+            # Placeholder for a sheet whose XML is spliced in from the cache
+            wb.create_sheet(name)
+            continue
+        # Rows stream from the source as they are written, so reading and writing are one stage
+        with metrics.stage('write sheet', name) as stage:
+            stage['cells'] = write_data_sheet(wb, name, columns, rows, widths, title=title, table=table) * len(columns)
+            cells += stage['cells']
+    if summary_sheet and chart_tables:
+        with metrics.stage('charts', cells=sum(len(table) + 2 for _, table in chart_tables) * 2):
+            charts.add_charts(wb, summary_sheet, chart_tables)
+    metrics.write_sheet(wb)
+    with metrics.stage('save', cells=cells):
+        wb.save(excel_file)
+
+
+def measured_sheet(sheet, metrics, results=None):
+    # Resolving a sheet runs its width-measuring pass; its rows stay lazy
+    with metrics.stage('measure widths', sheet.name):
+        return sheet_from_spec(sheet, results)
+
+
+def build_spec(spec='pcba', output_dir='output', use_cache=True, metrics=None):
+    """Build a workbook into ``output_dir`` from a spec name, path or ``WorkbookSpec``.
+
+    With ``use_cache`` only sheets whose fingerprint changed are rendered;
+    the rest are reused from ``output_dir/.build_cache/<workbook>``.
+    """
+    metrics = metrics or BuildMetrics('build')
+    if isinstance(spec, str):
+        spec = load_spec(spec)
+    os.makedirs(output_dir, exist_ok=True)
+    excel_file = os.path.join(output_dir, spec.workbook)
+    navigation = navigation_rows(spec) if spec.summary else None
+    # Transform output per sheet, shared by the charts and the sheet itself
+    results = {}
+    chart_tables = None
+    if spec.summary and spec.charts:
+        with metrics.stage('chart tables'):
+            chart_tables = charts.chart_tables(spec, results)
+
+    if not use_cache:
+        # Sheets are resolved lazily so each source is streamed while it is written
+        sheets = (measured_sheet(sheet, metrics, results) for sheet in spec.sheets)
+        build_workbook(excel_file, sheets, navigation, metrics, chart_tables, spec.summary)
+        return excel_file
+
+    cache = SheetCache(os.path.join(output_dir, CACHE_DIR, os.path.splitext(spec.workbook)[0]))
+    with metrics.stage('fingerprint'):
+        renderer = render_digest()
+        tables = table_names(sheet.name for sheet in spec.sheets)
+        fingerprints = {sheet.name: sheet_fingerprint(sheet, renderer, tables[sheet.name]) for sheet in spec.sheets}
+    cached = {}
+    for sheet_name, fingerprint in fingerprints.items():
+        parts = cache.get(fingerprint)
+        if parts is not None:
+            cached[sheet_name] = parts
+
+    sheets = (
+        (sheet.name, None, (), [], None) if sheet.name in cached else measured_sheet(sheet, metrics, results)
+        for sheet in spec.sheets
+    )
+    fd, fresh_file = tempfile.mkstemp(dir=output_dir, suffix='.xlsx')
+    os.close(fd)
+    try:
+        build_workbook(fresh_file, sheets, navigation, metrics, chart_tables, spec.summary)
+        with metrics.stage('splice cached sheets'):
+            rendered = splice(fresh_file, excel_file, cached)
+        with metrics.stage('cache rendered sheets'), zipfile.ZipFile(fresh_file) as src:
+            for sheet_name, part in rendered.items():
+                if sheet_name in fingerprints:
+                    cache.put(fingerprints[sheet_name], src, part)
+    finally:
+        os.remove(fresh_file)
+    cache.prune(fingerprints.values())
+    return excel_file
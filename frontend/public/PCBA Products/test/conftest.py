@@ -0,0 +1,24 @@
+"""Every test gets its own store and caches, so the suite never reads or
+writes the ones under ``~/.cache/report_builder``.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import pytest
+
+from report_builder import columnar_cache, dockets, enrichment, store
+
+
+@pytest.fixture(autouse=True)
+def isolated_caches(tmp_path, monkeypatch):
+    cache = tmp_path / 'report_builder'
+    cache.mkdir()
+    monkeypatch.setattr(store, 'STORE_PATH', str(cache / 'store.sqlite'))
+    monkeypatch.setattr(columnar_cache, 'CACHE_ROOT', str(cache / 'columnar'))
+    monkeypatch.setattr(dockets, 'STATE_FILE', str(cache / 'dockets' / 'analytics_state.json'))
+    monkeypatch.setattr(enrichment, 'CACHE_DIR', str(cache / 'enrichment'))
+    # Worker processes that import the package afresh read these instead
+    monkeypatch.setenv('REPORT_BUILDER_STORE', str(cache / 'store.sqlite'))
+    monkeypatch.setenv('REPORT_BUILDER_CACHE', str(cache / 'columnar'))
+    return cache
@@ -0,0 +1,87 @@
+"""Batch jobs for every dataset folder and named spec.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import contextlib
+import io
+import os
+import tempfile
+import unittest
+
+from report_builder import batch
+from report_builder.sheet_specs import SheetSpec, WorkbookSpec
+
+
+def write_csv(path, text='Company,State\nAcme,MO\n'):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write(text)
+
+
+class SheetNameTest(unittest.TestCase):
+    def test_names_use_the_last_segment_and_stay_unique(self):
+        taken = set()
+        names = [batch.sheet_name(path, taken) for path in [
+            'Leads - Owners - Florida.csv', 'Other export - florida.csv', 'Leads - Owners - Florida.csv']]
+        self.assertEqual(names, ['Florida', 'florida (2)', 'Florida (3)'])
+
+    def test_long_names_are_cut_to_31_characters_with_room_for_a_suffix(self):
+        taken = set()
+        path = 'Export - ' + 'Cable and wire harness owners [USA]: 8-50 employees.csv'
+        first, second = batch.sheet_name(path, taken), batch.sheet_name(path, taken)
+        self.assertEqual(first, 'Cable and wire harness owners U')
+        self.assertEqual(second, 'Cable and wire harness owne (2)')
+        self.assertTrue(all(len(name) <= batch.MAX_SHEET_NAME for name in (first, second)))
+
+
+class DiscoverJobsTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.root = tmp.name
+        os.makedirs(os.path.join(self.root, 'Leads'))
+        os.makedirs(os.path.join(self.root, 'Empty'))
+        write_csv(os.path.join(self.root, 'Leads', 'a - Owners.csv'))
+        write_csv(os.path.join(self.root, 'Leads', 'b - Shops.csv'))
+        self.output = os.path.join(self.root, 'out')
+
+    def test_folder_mode_builds_one_workbook_per_folder(self):
+        jobs = batch.discover_jobs(self.root, self.output, 'folder', specs=[])
+        self.assertEqual(len(jobs), 1)
+        label, spec, output_dir = jobs[0]
+        self.assertEqual((label, spec.workbook), ('Leads', 'Leads.xlsx'))
+        self.assertEqual(output_dir, os.path.join(self.output, 'Leads'))
+        self.assertEqual([sheet.name for sheet in spec.sheets], ['Owners', 'Shops'])
+
+    def test_file_mode_builds_one_workbook_per_csv(self):
+        jobs = batch.discover_jobs(self.root, self.output, 'file', specs=[])
+        self.assertEqual([label for label, _, _ in jobs], ['a - Owners.xlsx', 'b - Shops.xlsx'])
+
+    def test_named_specs_come_first(self):
+        jobs = batch.discover_jobs(self.root, self.output, 'folder', specs=['pcba'])
+        self.assertEqual([label for label, _, _ in jobs], ['pcba', 'Leads'])
+        self.assertEqual(jobs[0][1].workbook, 'PCBA_Import_Data.xlsx')
+        self.assertEqual(jobs[0][2], self.output)
+        every = [label for label, _, _ in batch.discover_jobs(self.root, self.output)]
+        self.assertEqual(every[:-1], batch.named_specs())
+
+
+class RunBatchTest(unittest.TestCase):
+    def test_a_failed_job_does_not_stop_the_others(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            source = os.path.join(tmp, 'leads.csv')
+            write_csv(source)
+            good = WorkbookSpec(workbook='Good.xlsx', sheets=[SheetSpec(name='Leads', source=source)])
+            bad = WorkbookSpec(workbook='Bad.xlsx', sheets=[SheetSpec(name='Leads', source=source + '.missing')])
+            jobs = [('bad', bad, tmp), ('good', good, tmp)]
+            with contextlib.redirect_stdout(io.StringIO()):
+                results = {result['job']: result for result in batch.run_batch(jobs, workers=2)}
+            self.assertEqual(results['bad']['status'], 'error')
+            self.assertIn('missing', results['bad']['error'])
+            self.assertEqual(results['good']['status'], 'ok')
+            self.assertTrue(os.path.exists(os.path.join(tmp, 'Good.xlsx')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,55 @@
+"""The synthetic-scale benchmark: scaled specs and result comparison.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import contextlib
+import io
+import tempfile
+import unittest
+
+import pandas as pd
+
+from benchmarks.scale import compare, synthetic_spec
+from report_builder.sheet_specs import load_spec
+
+
+def run(pipeline, rows, seconds, peak_rss_mb=100.0, status='ok'):
+    return {'pipeline': pipeline, 'rows': rows, 'status': status, 'seconds': seconds, 'peak_rss_mb': peak_rss_mb}
+
+
+class SyntheticSpecTest(unittest.TestCase):
+    def test_every_source_is_scaled_and_the_spec_kept(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            scaled = load_spec(synthetic_spec(25, tmp))
+            original = load_spec('pcba')
+            self.assertEqual([sheet.name for sheet in scaled.sheets], [sheet.name for sheet in original.sheets])
+            self.assertEqual(scaled.summary, original.summary)
+            for sheet in scaled.sheets:
+                for path in [source['path'] for source in sheet.sources] or [sheet.source]:
+                    frame = pd.read_csv(path, dtype=str)
+                    self.assertEqual(len(frame), 25, path)
+                    # Cycled rows stay distinct
+                    self.assertTrue(frame.iloc[:, 0].is_unique, path)
+
+
+class CompareTest(unittest.TestCase):
+    def regressions(self, baseline, current, threshold=0.2):
+        with contextlib.redirect_stdout(io.StringIO()):
+            return compare({'runs': baseline}, {'runs': current}, threshold)
+
+    def test_slowdowns_beyond_the_threshold_are_reported(self):
+        baseline = [run('streaming', 1000, 1.0), run('legacy', 1000, 2.0)]
+        current = [run('streaming', 1000, 1.1), run('legacy', 1000, 3.0, peak_rss_mb=200.0)]
+        self.assertEqual(self.regressions(baseline, current),
+                         [('legacy', 1000, 'seconds'), ('legacy', 1000, 'peak_rss_mb')])
+
+    def test_new_failures_are_regressions_and_unmatched_runs_ignored(self):
+        baseline = [run('legacy', 1000, 2.0)]
+        current = [run('legacy', 1000, 0.0, status='timeout'), run('legacy', 10000, 9.0)]
+        self.assertEqual(self.regressions(baseline, current), [('legacy', 1000, 'status')])
+
+
+if __name__ == '__main__':
+    unittest.main()
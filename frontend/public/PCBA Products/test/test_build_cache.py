@@ -0,0 +1,79 @@
+"""Incremental rebuilds: cached sheet XML spliced into a fresh workbook.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import json
+import os
+import stat
+import tempfile
+import unittest
+from unittest import mock
+
+import openpyxl
+from openpyxl import load_workbook
+
+from report_builder import build_cache, workbook
+from report_builder.workbook import build_spec
+
+
+def write_csv(path, rows):
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('\n'.join(rows) + '\n')
+
+
+class SheetCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.addCleanup(self.tmp.cleanup)
+        write_csv(os.path.join(self.root, 'a.csv'), ['Company,Code', 'Acme,8534.00', 'Globex,02134'])
+        write_csv(os.path.join(self.root, 'b.csv'), ['Name,Count', 'North,1', 'South,2'])
+        self.spec = os.path.join(self.root, 'spec.json')
+        with open(self.spec, 'w', encoding='utf-8') as f:
+            json.dump({'workbook': 'Test.xlsx', 'sheets': [
+                {'name': 'First', 'source': 'a.csv'},
+                {'name': 'Second', 'source': 'b.csv'},
+            ]}, f)
+        self.output = os.path.join(self.root, 'output')
+        self.cache = os.path.join(self.output, build_cache.CACHE_DIR, 'Test')
+
+    def values(self, excel_file):
+        wb = load_workbook(excel_file)
+        return {ws.title: [list(row) for row in ws.iter_rows(values_only=True)] for ws in wb.worksheets}
+
+    def test_unchanged_sheets_are_spliced_from_the_cache(self):
+        first = self.values(build_spec(self.spec, self.output))
+        self.assertEqual(len(os.listdir(self.cache)), 2)
+        self.assertEqual(first['First'], [['Company', 'Code'], ['Acme', '8534.00'], ['Globex', '02134']])
+
+        write_csv(os.path.join(self.root, 'b.csv'), ['Name,Count', 'North,1', 'South,2', 'West,3'])
+        with mock.patch.object(workbook, 'measured_sheet', wraps=workbook.measured_sheet) as measured:
+            second = self.values(build_spec(self.spec, self.output))
+        # Only the changed sheet is read again; the stale entry is pruned
+        self.assertEqual([call.args[0].name for call in measured.call_args_list], ['Second'])
+        self.assertEqual(len(os.listdir(self.cache)), 2)
+        self.assertEqual(second['First'], first['First'])
+        self.assertEqual(second['Second'][-1], ['West', '3'])
+        self.assertEqual(list(load_workbook(os.path.join(self.output, 'Test.xlsx'))['First'].tables),
+                         ['Table_First'])
+
+    def test_outputs_get_the_umask_default_mode(self):
+        umask = os.umask(0o022)
+        try:
+            excel_file = build_spec(self.spec, self.output)
+        finally:
+            os.umask(umask)
+        self.assertEqual(stat.S_IMODE(os.stat(excel_file).st_mode), 0o644)
+        for name in os.listdir(self.cache):
+            self.assertEqual(stat.S_IMODE(os.stat(os.path.join(self.cache, name)).st_mode), 0o644)
+
+    def test_fingerprint_depends_on_the_openpyxl_version(self):
+        renderer = build_cache.render_digest()
+        with mock.patch.object(openpyxl, '__version__', '0.0.0'):
+            self.assertNotEqual(build_cache.render_digest(), renderer)
+
+
+if __name__ == '__main__':
+    unittest.main()
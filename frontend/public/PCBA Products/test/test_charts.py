@@ -0,0 +1,55 @@
+"""Chart tables aggregated from sheets, sources and summary files.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from report_builder.charts import chart_table, chunk_totals
+from report_builder.sheet_specs import load_spec
+from report_builder.watch import spec_inputs
+
+
+class ChartTableTest(unittest.TestCase):
+    def test_mentions_count_every_named_label_and_the_rest(self):
+        chunk = pd.DataFrame({'Origins': ['China, Vietnam (various CMs)', 'Mexico', 'Asia (various)', 'Global', '']})
+        totals = chunk_totals(chunk, {'category': 'Origins', 'mentions': ['China', 'Vietnam', 'Mexico', 'India'],
+                                      'other': 'Other'})
+        self.assertEqual(totals.to_dict(), {'China': 1, 'Vietnam': 1, 'Mexico': 1, 'India': 0, 'Other': 2})
+
+    def test_values_are_summed_and_the_top_kept(self):
+        chunk = pd.DataFrame({'Heading': ['8534', '8544', '8534', '8537'], 'Importers': ['2', '5', '4', '1']})
+        totals = chunk_totals(chunk, {'category': 'Heading', 'value': 'Importers'})
+        self.assertEqual(totals.to_dict(), {'8534': 6, '8537': 1, '8544': 5})
+
+    def test_summary_buckets_are_labelled(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'analytics_summary.json')
+            with open(path, 'w', encoding='utf-8') as f:
+                json.dump({'duration_distribution': {'under_90_days': 1, '90_180_days': 3}}, f)
+            table = chart_table({'summary': path, 'key': 'duration_distribution'}, {})
+        self.assertEqual(table.values.tolist(), [['Under 90 days', 1], ['90-180 days', 3]])
+
+
+class SpecChartsTest(unittest.TestCase):
+    def test_pcba_charts_read_only_pcba_data(self):
+        inputs = spec_inputs(load_spec('pcba'))
+        self.assertFalse([path for path in inputs if 'Law Database' in path])
+
+    def test_docket_charts_live_in_the_docket_workbook(self):
+        spec = load_spec('foreclosure_dockets')
+        titles = [chart['title'] for chart in spec.charts]
+        self.assertIn('Foreclosure Case Duration', titles)
+        self.assertIn(os.path.abspath(spec.charts[0]['summary']), spec_inputs(spec))
+        sheets = {sheet.name for sheet in spec.sheets}
+        self.assertTrue(all(chart['sheet'] in sheets for chart in spec.charts if chart.get('sheet')))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+"""The create -> format -> finalize command line.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import contextlib
+import importlib
+import io
+import json
+import os
+import sys
+import tempfile
+import unittest
+from unittest import mock
+
+from openpyxl import load_workbook
+
+from report_builder import cli
+
+SPEC = {
+    'workbook': 'Leads.xlsx',
+    'summary': {'title': 'LEADS SUMMARY', 'introduction': ['Lead list.'], 'sources': 'NOTE: test data.'},
+    'sheets': [{'name': 'Leads', 'source': 'leads.csv', 'description': 'Every lead'}],
+    'charts': [{'title': 'Leads per State', 'sheet': 'Leads', 'category': 'State'}],
+}
+
+
+class CliTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        with open(os.path.join(tmp.name, 'leads.csv'), 'w', encoding='utf-8') as f:
+            f.write('Company,State\nAcme,MO\nGlobex,TX\nInitech,MO\n')
+        self.spec = os.path.join(tmp.name, 'leads.json')
+        with open(self.spec, 'w', encoding='utf-8') as f:
+            json.dump(SPEC, f)
+        self.output_dir = os.path.join(tmp.name, 'output')
+
+    def run_cli(self, *argv):
+        out = io.StringIO()
+        with contextlib.redirect_stdout(out):
+            cli.main([*argv, self.spec, '--output-dir', self.output_dir])
+        return out.getvalue()
+
+    def test_steps_build_the_finished_workbook(self):
+        self.assertIn('created successfully', self.run_cli('build'))
+        self.run_cli('format')
+        self.assertIn('finalized successfully', self.run_cli('finalize'))
+        wb = load_workbook(os.path.join(self.output_dir, 'Leads.xlsx'))
+        self.assertEqual(wb.sheetnames[:2], ['Summary', 'Leads'])
+        self.assertEqual(wb['Summary']['A1'].value, 'LEADS SUMMARY')
+        self.assertEqual(wb['Leads'].max_row, 4)
+
+    def test_all_builds_in_one_pass(self):
+        self.run_cli('all')
+        wb = load_workbook(os.path.join(self.output_dir, 'Leads.xlsx'))
+        self.assertIn('Leads', wb.sheetnames)
+        self.assertEqual([cell.value for cell in wb['Leads'][2]], ['Acme', 'MO'])
+
+    def test_usage_errors_exit_before_loading_a_spec(self):
+        with contextlib.redirect_stderr(io.StringIO()), self.assertRaises(SystemExit), \
+                mock.patch.object(cli, 'run') as run:
+            cli.main(['unknown'])
+        run.assert_not_called()
+
+
+class ScriptsTest(unittest.TestCase):
+    def test_importing_a_script_runs_nothing(self):
+        scripts = ['create_pcba_spreadsheet', 'format_pcba_spreadsheet', 'finalize_pcba_spreadsheet',
+                   'build_pcba_workbook']
+        with mock.patch.object(cli, 'main') as main:
+            for name in scripts:
+                sys.modules.pop(name, None)
+                importlib.import_module(name)
+                sys.modules.pop(name, None)
+        main.assert_not_called()
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,67 @@
+"""Parquet cache of source CSVs with typed columns.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from report_builder import columnar_cache
+
+SOURCE = '''Company,HTS Code,Zip,Employees,Revenue,Loan,Started
+Acme,8534.00,02134,12,1.5,"$397,316.15",12/28/2022
+Globex,8517.62,10001,250,22.75,"$1,000.00",01/05/2023
+Initech,8537.10,94105,,3.0,,
+'''
+
+
+@unittest.skipUnless(columnar_cache.available(), 'needs pyarrow')
+class ColumnarCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(self.tmp.cleanup)
+        self.cache = os.path.join(self.tmp.name, 'cache')
+        self.source = os.path.join(self.tmp.name, 'source.csv')
+        with open(self.source, 'w', encoding='utf-8') as f:
+            f.write(SOURCE)
+
+    def test_columns_that_would_not_round_trip_stay_text(self):
+        types = columnar_cache.column_types(self.source)
+        # "8534.00" would come back as "8534.0" and "02134" as "2134"
+        self.assertEqual(types['HTS Code'], 'string')
+        self.assertEqual(types['Zip'], 'string')
+        self.assertEqual(types['Employees'], 'int64')
+        self.assertEqual(types['Loan'], 'dollars')
+        self.assertEqual(types['Started'], 'date')
+
+    def test_text_reads_match_the_csv(self):
+        expected = pd.read_csv(self.source, dtype=str)
+        chunks = list(columnar_cache.read_batches(self.source, chunksize=2, cache_root=self.cache))
+        self.assertEqual(len(chunks), 2)
+        actual = pd.concat(chunks, ignore_index=True)
+        self.assertEqual(actual.fillna('').values.tolist(), expected.fillna('').values.tolist())
+
+    def test_typed_reads_return_parsed_values(self):
+        frame = next(columnar_cache.read_batches(self.source, ['HTS Code', 'Zip', 'Employees', 'Loan', 'Started'],
+                                                 cache_root=self.cache, typed=True))
+        self.assertEqual(frame['HTS Code'].tolist(), ['8534.00', '8517.62', '8537.10'])
+        self.assertEqual(frame['Zip'].tolist(), ['02134', '10001', '94105'])
+        self.assertEqual(str(frame['Employees'].dtype), 'Int64')
+        self.assertEqual(frame['Loan'].iloc[0], 397316.15)
+        self.assertEqual(frame['Started'].iloc[0], pd.Timestamp('2022-12-28'))
+
+    def test_changed_sources_are_reingested(self):
+        columnar_cache.ingest(self.source, self.cache)
+        with open(self.source, 'a', encoding='utf-8') as f:
+            f.write('Umbrella,9405.40,30301,7,2.0,$5.00,02/02/2024\n')
+        rows = sum(len(chunk) for chunk in columnar_cache.read_batches(self.source, ['Company'],
+                                                                       cache_root=self.cache))
+        self.assertEqual(rows, 4)
+
+
+if __name__ == '__main__':
+    unittest.main()
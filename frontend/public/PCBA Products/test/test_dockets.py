@@ -0,0 +1,151 @@
+"""Docket analytics folded export by export into saved aggregates.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import glob
+import json
+import os
+import tempfile
+import unittest
+
+import pandas as pd
+
+from report_builder import dockets
+
+
+def export_frame(rows):
+    """Rows of (docket, court, law firm, started, case duration) as an export."""
+    frame = pd.DataFrame('', index=range(len(rows)), columns=list(dockets.COLUMNS.values()))
+    for i, (docket, court, firm, started, duration) in enumerate(rows):
+        frame.loc[i, ['Docket', 'Court', 'Law Firm', 'Date - Case first started', 'Case Duration (Days)']] = \
+            [docket, court, firm, started, duration]
+    frame['Original loan amount'] = '$100,000'
+    frame['Outstanding debt at filing (principal)'] = '$50,000'
+    return frame
+
+
+class FoldTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.law_dir = tmp.name
+        self.state_file = os.path.join(tmp.name, 'state', 'analytics_state.json')
+
+    def export(self, name, rows):
+        path = os.path.join(self.law_dir, f'Search-Dockets-{name}.csv')
+        export_frame(rows).to_csv(path, index=False)
+        return path
+
+    def update(self, **kwargs):
+        return dockets.update(self.law_dir, state_file=self.state_file, **kwargs)
+
+    def test_exports_and_dockets_are_folded_once(self):
+        self.export('1', [('1:23-cv-1', 'NYSD', 'Gross Polowy LLC', '01/02/2023', '100'),
+                          ('1:23-cv-2', 'NYSD', 'GROSS POLOWY, LLC', '01/02/2023', '300')])
+        folded, summary = self.update()
+        self.assertEqual(len(folded), 1)
+        self.assertEqual(self.update()[0], [])
+
+        # The second export repeats one docket from the first
+        self.export('2', [('1:23-cv-2', 'NYSD', 'Gross Polowy LLC', '01/02/2023', '300'),
+                          ('2:24-cv-9', 'NJD', 'Other Firm', '03/04/2024', '200')])
+        folded, summary = self.update()
+        self.assertEqual(len(folded), 1)
+        self.assertEqual(summary['total_cases'], 3)
+        self.assertEqual(summary['avg_duration_days'], 200.0)
+        self.assertEqual(summary['top_law_firms'][0], {'name': 'Gross Polowy LLC', 'count': 2})
+        with open(os.path.join(self.law_dir, dockets.SUMMARY_FILE), encoding='utf-8') as f:
+            self.assertEqual(json.load(f), summary)
+
+    def test_keys_are_appended_beside_the_state(self):
+        self.export('1', [('a', 'NYSD', '', '', '10'), ('b', 'NYSD', '', '', '20')])
+        self.update()
+        self.export('2', [('c', 'NJD', '', '', '30')])
+        self.update()
+        with open(self.state_file, encoding='utf-8') as f:
+            state = json.load(f)
+        self.assertNotIn('dockets', state)
+        with open(dockets.key_path(self.state_file), encoding='utf-8') as f:
+            self.assertEqual(f.read().splitlines(), ['NYSD|a', 'NYSD|b', 'NJD|c'])
+        self.assertEqual(state['keys_bytes'], os.path.getsize(dockets.key_path(self.state_file)))
+
+    def test_keys_from_an_unsaved_run_are_dropped(self):
+        self.export('1', [('a', 'NYSD', '', '', '10')])
+        self.update()
+        # A run that died after appending its keys but before saving the state
+        dockets.append_keys(dockets.key_path(self.state_file), ['NJD|c'])
+        self.export('2', [('c', 'NJD', '', '', '30')])
+        self.assertEqual(self.update()[1]['total_cases'], 2)
+
+    def test_rebuild_starts_the_keys_over(self):
+        self.export('1', [('a', 'NYSD', '', '', '10')])
+        self.update()
+        self.assertEqual(self.update(rebuild=True)[1]['total_cases'], 1)
+
+
+class TypedTest(unittest.TestCase):
+    def test_durations_come_from_the_dates(self):
+        frame = export_frame([('a', 'NYSD', '', '01/02/2023', '100'), ('b', 'NYSD', '', '01/02/2023', ''),
+                              ('c', 'NYSD', '', '', '45'), ('d', 'NYSD', '', '', '')])
+        frame['Last Updated - When Court Case Finished'] = ['Sat., Nov. 4, 2023 at 8:33PM ET'] * 2 + [''] * 2
+        days = dockets.duration_days(dockets.typed(frame))
+        # The exported duration only fills in where a date is missing
+        self.assertEqual(days[:3].tolist(), [306.0, 306.0, 45.0])
+        self.assertTrue(pd.isna(days[3]))
+
+    def test_ratios_and_amounts_accept_parsed_columns(self):
+        text = pd.Series(['1.2082 → 120.82%', '1.00 (100%)', ''])
+        self.assertEqual(dockets.parse_ratio(text)[:2].tolist(), [1.2082, 1.0])
+        parsed = pd.Series([1.5, None])
+        self.assertEqual(dockets.parse_ratio(parsed).dtype, 'float64')
+        self.assertEqual(dockets.parse_money(pd.Series([100, 200])).tolist(), [100.0, 200.0])
+
+    def test_every_law_docket_with_dates_is_counted(self):
+        exports = sorted(glob.glob(os.path.join(dockets.LAW_DIR, dockets.EXPORT_PATTERN)))
+        if not exports:
+            self.skipTest('no docket export')
+        aggregates = dockets.DocketAggregates()
+        dated = 0
+        for path in exports:
+            for frame in dockets.read_dockets(path):
+                aggregates.add_chunk(frame)
+                dated += int((frame['started'].notna() & frame['finished'].notna()).sum())
+        summary = aggregates.summary()
+        self.assertGreater(dated, 0)
+        self.assertGreaterEqual(aggregates.duration.count, dated)
+        self.assertEqual(sum(summary['duration_distribution'].values()), aggregates.duration.count)
+        # Every docket in the export has its dates or an exported duration
+        self.assertEqual(aggregates.duration.count, summary['total_cases'])
+
+
+class AggregatesTest(unittest.TestCase):
+    def test_merge_matches_a_single_fold(self):
+        first = dockets.typed(export_frame([('a', 'NYSD', 'Firm A', '', '10'), ('b', 'NJD', 'Firm B', '', '400')]))
+        second = dockets.typed(export_frame([('c', 'NYSD', 'Firm A', '', '100')]))
+        whole = dockets.DocketAggregates()
+        whole.add_chunk(pd.concat([first, second], ignore_index=True))
+        parts = dockets.DocketAggregates()
+        parts.add_chunk(first)
+        other = dockets.DocketAggregates()
+        other.add_chunk(second)
+        parts.merge(other)
+        self.assertEqual(parts.summary([0, 100, float('inf')]), whole.summary([0, 100, float('inf')]))
+        restored = dockets.DocketAggregates.from_dict(json.loads(json.dumps(parts.to_dict())))
+        self.assertEqual(restored.summary(), whole.summary())
+
+    def test_top_k_tracks_overcounts_once_full(self):
+        sketch = dockets.TopK(capacity=2)
+        sketch.update({'a': 5, 'b': 1})
+        sketch.update({'c': 2})
+        self.assertEqual(sketch.top(2), [{'name': 'a', 'count': 5}, {'name': 'c', 'count': 3}])
+        self.assertEqual(sketch.errors['c'], 1)
+
+    def test_histogram_rebins_over_open_edges(self):
+        bins = dockets.histogram([5, 90, 400, -1], [0, 90, float('inf')], [1, 2, 3, 4])
+        self.assertEqual([row['count'] for row in bins], [1, 5])
+
+
+if __name__ == '__main__':
+    unittest.main()
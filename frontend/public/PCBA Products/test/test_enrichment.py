@@ -0,0 +1,177 @@
+"""Enrichment providers and fetcher against a local stub server.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import asyncio
+import json
+import tempfile
+import threading
+import time
+import unittest
+from collections import Counter
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pandas as pd
+
+from report_builder.enrichment import Fetcher, JsonApiProvider, Request, ResponseCache, enrich
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Canned answers keyed by path; every hit is counted on the server."""
+
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        server = self.server
+        with server.lock:
+            server.hits[self.path] += 1
+            hits = server.hits[self.path]
+        path = self.path.split('?')[0]
+        if path == '/flaky' and hits <= 2:
+            self.reply(503, b'busy')
+        elif path == '/throttled' and hits == 1:
+            self.reply(429, b'slow down', {'Retry-After': '1'})
+        elif path == '/redirect':
+            self.reply(301, b'', {'Location': '/companies/acme'})
+        elif path == '/loop':
+            self.reply(302, b'', {'Location': '/loop'})
+        elif path == '/downgrade':
+            self.reply(302, b'', {'Location': 'ftp://127.0.0.1/file'})
+        elif path in ('/flaky', '/throttled'):
+            self.reply(200, json.dumps({'data': {'industry': 'Recovered'}}).encode())
+        elif path == '/slow':
+            time.sleep(0.3)
+            self.reply(200, json.dumps({'data': {'industry': 'Slow'}}).encode())
+        elif path.startswith('/companies/'):
+            name = path.rsplit('/', 1)[-1]
+            self.reply(200, json.dumps({'data': {'industry': f'Industry of {name}', 'employees': len(name)}}).encode())
+        else:
+            self.reply(404, b'not found')
+
+    def reply(self, status, body, headers=None):
+        self.send_response(status)
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+class StubServerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.server = ThreadingHTTPServer(('127.0.0.1', 0), StubHandler)
+        cls.server.lock = threading.Lock()
+        cls.server.daemon_threads = True
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+        cls.base = f'http://127.0.0.1:{cls.server.server_address[1]}'
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+
+    def setUp(self):
+        self.server.hits = Counter()
+        self.cache_dir = tempfile.TemporaryDirectory()
+        self.cache = ResponseCache(self.cache_dir.name)
+
+    def tearDown(self):
+        self.cache_dir.cleanup()
+
+    def provider(self, path):
+        return JsonApiProvider({'name': 'stub', 'url': f'{self.base}{path}',
+                                'fields': {'Industry': 'data.industry', 'Employees': 'data.employees'}})
+
+    def fetch(self, path, **options):
+        fetcher = Fetcher(self.cache, backoff=0.01, **options)
+        try:
+            return asyncio.run(fetcher.fetch(Request(f'{self.base}{path}'))), dict(fetcher.stats)
+        finally:
+            fetcher.close()
+
+    def test_rows_get_provider_columns(self):
+        frame = pd.DataFrame({'Company': ['acme', 'globex', '']})
+        enriched, stats = enrich(frame, [self.provider('/companies/{Company}')], self.cache)
+        self.assertEqual(enriched['Industry'].tolist()[:2], ['Industry of acme', 'Industry of globex'])
+        self.assertEqual(enriched['Employees'].tolist()[:2], [4, 6])
+        # A row without the placeholder column makes no request
+        self.assertTrue(pd.isna(enriched['Industry'].iat[2]))
+        self.assertEqual(stats['requests'], 2)
+
+    def test_server_errors_are_retried(self):
+        response, stats = self.fetch('/flaky')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(self.server.hits['/flaky'], 3)
+        self.assertEqual(stats['retries'], 2)
+
+    def test_retries_give_up_with_the_last_response(self):
+        response, stats = self.fetch('/flaky', retries=1)
+        self.assertEqual(response.status, 503)
+        self.assertEqual(stats['failures'], 1)
+        # Failures are not cached, so the next run asks again
+        self.assertIsNone(self.cache.get(Request(f'{self.base}/flaky')))
+
+    def test_retry_after_is_honoured(self):
+        start = time.perf_counter()
+        response, stats = self.fetch('/throttled')
+        self.assertEqual(response.status, 200)
+        self.assertEqual(self.server.hits['/throttled'], 2)
+        self.assertGreaterEqual(time.perf_counter() - start, 1.0)
+
+    def test_identical_requests_in_flight_are_coalesced(self):
+        frame = pd.DataFrame({'Company': ['slow'] * 20})
+        provider = JsonApiProvider({'name': 'stub', 'url': f'{self.base}/{{Company}}',
+                                    'fields': {'Industry': 'data.industry'}})
+        enriched, stats = enrich(frame, [provider], None)
+        self.assertEqual(enriched['Industry'].unique().tolist(), ['Slow'])
+        self.assertEqual(self.server.hits['/slow'], 1)
+        self.assertEqual(stats['coalesced'], 19)
+
+    def test_second_run_is_served_from_cache(self):
+        frame = pd.DataFrame({'Company': ['acme', 'globex']})
+        provider = self.provider('/companies/{Company}')
+        first, _ = enrich(frame, [provider], self.cache)
+        second, stats = enrich(frame, [provider], self.cache)
+        pd.testing.assert_frame_equal(first, second)
+        self.assertEqual(stats['cache_hits'], 2)
+        self.assertEqual(stats.get('requests', 0), 0)
+        self.assertEqual(sum(self.server.hits.values()), 2)
+
+    def test_expired_entries_are_refetched_and_evicted(self):
+        self.fetch('/companies/acme')
+        self.cache.ttl = -1
+        self.assertIsNone(self.cache.get(Request(f'{self.base}/companies/acme')))
+        self.assertEqual(self.cache.evict(), {'requests': 1, 'bodies': 1})
+
+    def test_redirects_are_followed_and_cached(self):
+        frame = pd.DataFrame({'Company': ['x']})
+        enriched, stats = enrich(frame, [self.provider('/redirect')], self.cache)
+        self.assertEqual(enriched['Industry'].tolist(), ['Industry of acme'])
+        self.assertEqual(stats['redirects'], 1)
+        # The next run answers from the cache without repeating the redirect
+        again, stats = enrich(frame, [self.provider('/redirect')], self.cache)
+        self.assertEqual(again['Industry'].tolist(), ['Industry of acme'])
+        self.assertEqual(stats['cache_hits'], 1)
+        self.assertEqual(self.server.hits['/redirect'], 1)
+
+    def test_redirect_loops_are_bounded(self):
+        response, stats = self.fetch('/loop')
+        self.assertEqual(response.status, 302)
+        self.assertEqual(self.server.hits['/loop'], 6)
+        self.assertEqual(stats['redirects'], 5)
+
+    def test_redirects_off_http_are_not_followed(self):
+        response, stats = self.fetch('/downgrade')
+        self.assertEqual(response.status, 302)
+        self.assertNotIn('redirects', stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,79 @@
+"""Entity resolution across lead lists.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import unittest
+from collections import Counter
+
+import pandas as pd
+
+from report_builder import entities
+
+
+class NormaliseTest(unittest.TestCase):
+    def test_names_domains_and_states(self):
+        names = pd.Series(['Acme, Inc.', 'Smith & Sons LLC'])
+        self.assertEqual(entities.normalize_names(names).tolist(), ['acme', 'smith and sons'])
+        domains = pd.Series(['https://www.acme.com/about', 'acme.com; x.com'])
+        self.assertEqual(entities.normalize_domains(domains).tolist(), ['acme.com', 'acme.com'])
+        states = pd.Series(['MO', 'Englewood, Colorado, United States', ''])
+        self.assertEqual(entities.normalize_states(states).tolist(), ['MO', 'CO', ''])
+
+
+class ResolveCompaniesTest(unittest.TestCase):
+    def test_near_identical_names_in_one_state_merge(self):
+        labels = entities.resolve_companies(pd.Series(['Acme Cable Inc', 'ACME Cable, Inc.', 'Acme Cable']),
+                                            states=pd.Series(['TX', 'Texas', 'OH']))
+        self.assertEqual(labels[0], labels[1])
+        self.assertNotEqual(labels[0], labels[2])
+
+    def test_large_exact_domain_clusters_always_merge(self):
+        size = entities.MAX_BLOCK * 2
+        names = pd.Series([f'Division {i}' for i in range(size)])
+        domains = pd.Series(['bigco.com'] * size)
+        stats = Counter()
+        labels = entities.resolve_companies(names, domains, stats=stats)
+        self.assertEqual(len(set(labels)), 1)
+        self.assertEqual(stats['skipped_blocks'], 0)
+
+    def test_generic_domains_do_not_merge(self):
+        labels = entities.resolve_companies(pd.Series(['Acme Cable', 'Zenith Wire']),
+                                            pd.Series(['gmail.com', 'gmail.com']))
+        self.assertNotEqual(labels[0], labels[1])
+
+    def test_oversized_fuzzy_blocks_are_counted(self):
+        # Every name shares its rarest trigrams, so they land in one block
+        size = entities.MAX_BLOCK + 1
+        names = pd.Series(['Acme Cable'] * size)
+        stats = Counter()
+        labels = entities.resolve_companies(names, stats=stats)
+        self.assertGreater(stats['skipped_blocks'], 0)
+        self.assertEqual(stats['skipped_rows'], stats['skipped_blocks'] * size)
+        self.assertEqual(len(set(labels)), size)
+
+
+class ResolveContactsTest(unittest.TestCase):
+    def test_contacts_merge_on_linkedin_or_name_at_one_company(self):
+        companies = [0, 0, 1, 1]
+        people = pd.Series(['Jane Doe', 'jane doe', 'Jane Doe', 'John Roe'])
+        linkedin = pd.Series([None, None, None, 'https://www.linkedin.com/in/jroe/'])
+        labels = entities.resolve_contacts(companies, people, linkedin)
+        self.assertEqual(labels[0], labels[1])
+        self.assertEqual(len(set(labels)), 3)
+
+    def test_master_table_keeps_provenance(self):
+        df = pd.DataFrame({'Company': ['Acme', 'ACME'],
+                           'Titles': ['Global Supply Chain Dir.', 'Global Supply Chain Director'],
+                           'Source': ['Leaniant', 'Strict']})
+        master = entities.master_table(df, [0, 0], titles='Titles', name='Company')
+        row = master.iloc[0]
+        self.assertEqual(row['Titles'], 'Global Supply Chain Director')
+        self.assertEqual(row['Name Variants'], 'Acme; ACME')
+        self.assertEqual(row['Sources'], 'Leaniant; Strict')
+        self.assertEqual(row['Source Rows'], 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""HTS code parsing, the prefix trie and the heading rollups.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import unittest
+
+import pandas as pd
+
+from report_builder.hts import HtsIndex, parse_codes
+from report_builder.transforms import hts_rollup
+
+
+class ParseCodesTest(unittest.TestCase):
+    def test_forms_found_in_the_exports(self):
+        codes = parse_codes('8534.00.00.20; 8537.XX.XXXX, 8548.9 and 8544/8548')
+        self.assertEqual([code.digits for code in codes], ['8534000020', '8537', '854890', '8544', '8548'])
+        self.assertTrue(codes[1].wildcard)
+        self.assertEqual(str(codes[0]), '8534.00.00.20')
+
+    def test_repeats_and_empty_cells(self):
+        self.assertEqual(len(parse_codes('8534.00; 8534.00')), 1)
+        self.assertEqual(parse_codes(None), [])
+        self.assertEqual(parse_codes(float('nan')), [])
+
+
+class RollupTest(unittest.TestCase):
+    def test_importers_count_once_per_prefix(self):
+        index = HtsIndex()
+        index.add_record(parse_codes('8534.00; 8534.10; 8537.10'))
+        headings = {prefix: node.count for prefix, node in index.rollup(4)}
+        self.assertEqual(headings, {'8534': 1, '8537': 1})
+        self.assertEqual(dict((prefix, node.count) for prefix, node in index.rollup(2)), {'85': 1})
+
+    def test_multi_heading_importers_split_their_value(self):
+        index = HtsIndex()
+        index.add_record(parse_codes('8534.00; 8537.10; 8542.31; 8544.42; 9405.40'), 5_000_000)
+        index.add_record(parse_codes('8534.00'), 2_000_000)
+        values = {prefix: node.value for prefix, node in index.rollup(4)}
+        self.assertEqual(values['8534'], 3_000_000)
+        self.assertEqual(values['9405'], 1_000_000)
+        # Every level adds up to the dataset total
+        for level in (2, 4, 6):
+            self.assertAlmostEqual(sum(node.value for _, node in index.rollup(level)), 7_000_000)
+
+    def test_rollup_sheet_totals_match_the_source(self):
+        chunks = [pd.DataFrame({
+            'Main HTS Codes': ['8534.00; 8537.10', '8537.10', '8534.00; 8537.10; 9405.40', None],
+            'Approx. Annual PCBA Import': ['~$2–$10M', '$1,000,000', '~$3M', '~$1M'],
+        })]
+        table = next(hts_rollup(chunks, 'Main HTS Codes', value='Approx. Annual PCBA Import', level=4))
+        self.assertEqual(table['Heading'].tolist(), ['8537', '8534', '9405'])
+        self.assertEqual(table['Importers'].tolist(), [3, 2, 1])
+        self.assertEqual(table['Share of Importers'].tolist(), [0.75, 0.5, 0.25])
+        # The importer without codes has no heading to count under
+        self.assertEqual(table['Import Value (USD)'].sum(), 6_000_000 + 1_000_000 + 3_000_000)
+
+
+if __name__ == '__main__':
+    unittest.main()
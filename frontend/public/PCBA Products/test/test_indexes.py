@@ -0,0 +1,60 @@
+"""Sort permutations and inverted indexes written with paged exports.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import os
+import tempfile
+import unittest
+
+import numpy as np
+import pandas as pd
+
+from report_builder import pages
+
+FRAME = pd.DataFrame({
+    'Company': ['Acme', 'ACME', 'Acme', 'Globex', 'ACME', 'Acme', 'Globex', 'Acme'],
+    'Employees': ['1,200', '35', '', '7', '80', '9', '35', '100'],
+    'Location': ['Denver, Colorado, United States', 'Austin, Texas', 'Ohio', 'Englewood, Colorado', 'Texas',
+                 'Colorado', 'Cleveland, Ohio, United States', 'Dallas, Texas'],
+})
+
+
+class IndexFilesTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        source = os.path.join(tmp.name, 'companies.csv')
+        FRAME.to_csv(source, index=False)
+        self.directory = os.path.join(tmp.name, 'pages')
+        manifest = pages.export_dataset(source, self.directory)
+        self.indexes = {entry['column']: entry for entry in manifest['indexes']}
+
+    def ids(self, name, dtype='uint16'):
+        return np.fromfile(os.path.join(self.directory, name), dtype=np.dtype(dtype).newbyteorder('<')).tolist()
+
+    def postings(self, entry):
+        ids = self.ids(entry['file'])
+        starts = np.cumsum([0] + entry['counts'])
+        return {value: ids[start:end] for value, start, end in zip(entry['values'], starts, starts[1:])}
+
+    def test_case_variants_get_their_own_postings(self):
+        entry = self.indexes['Company']['filter']
+        self.assertEqual(entry['values'], ['ACME', 'Acme', 'Globex'])
+        postings = self.postings(entry)
+        for value, ids in postings.items():
+            self.assertEqual(ids, FRAME.index[FRAME['Company'] == value].tolist(), value)
+
+    def test_sort_orders(self):
+        self.assertEqual(self.indexes['Employees']['dtype'], 'uint16')
+        self.assertEqual(self.ids(self.indexes['Employees']['sort']), [3, 5, 1, 6, 4, 7, 0, 2])
+        self.assertEqual(self.ids(self.indexes['Company']['sort'])[-2:], [3, 6])
+
+    def test_locations_are_indexed_by_state(self):
+        postings = self.postings(self.indexes['Location']['state'])
+        self.assertEqual(postings, {'CO': [0, 3, 5], 'OH': [2, 6], 'TX': [1, 4, 7]})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Per-stage build metrics and their outputs.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import json
+import os
+import pstats
+import tempfile
+import unittest
+from unittest import mock
+
+from openpyxl import Workbook
+
+from report_builder.metrics import METRICS_SHEET, SHEET_COLUMNS, BuildMetrics
+
+
+class BuildMetricsTest(unittest.TestCase):
+    def test_stages_record_time_and_cells(self):
+        metrics = BuildMetrics('build')
+        with metrics.stage('write sheet', 'Data') as stage:
+            stage['cells'] = 12
+        record = metrics.begin('summary')
+        metrics.end(record, cells=4)
+        stages = metrics.report()['stages']
+        self.assertEqual([(s['stage'], s['sheet'], s['cells']) for s in stages],
+                         [('write sheet', 'Data', 12), ('summary', None, 4)])
+        self.assertTrue(all(s['seconds'] >= 0 for s in stages))
+
+    def test_failed_stages_are_still_recorded(self):
+        metrics = BuildMetrics('build')
+        with self.assertRaises(RuntimeError), metrics.stage('save'):
+            raise RuntimeError('disk full')
+        self.assertEqual(metrics.stages[0]['stage'], 'save')
+
+    def test_environment_switches_on_the_report_sheet_and_profile(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            report = os.path.join(tmp, 'metrics.jsonl')
+            profile = os.path.join(tmp, 'build.pstats')
+            env = {'REPORT_BUILDER_METRICS': report, 'REPORT_BUILDER_METRICS_SHEET': '1'}
+            with mock.patch.dict(os.environ, env):
+                metrics = BuildMetrics.from_env('create', profile)
+            with metrics.stage('to_excel', 'Data', cells=3):
+                pass
+            wb = Workbook()
+            metrics.write_sheet(wb)
+            metrics.finish()
+
+            rows = list(wb[METRICS_SHEET].iter_rows(values_only=True))
+            self.assertEqual(list(rows[0]), SHEET_COLUMNS)
+            self.assertEqual(rows[1][:3], ('create', 'to_excel', 'Data'))
+            with open(report, encoding='utf-8') as f:
+                lines = [json.loads(line) for line in f]
+            self.assertEqual([line['pipeline'] for line in lines], ['create'])
+            self.assertIsInstance(pstats.Stats(profile), pstats.Stats)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,78 @@
+"""Paged, precompressed JSON exports and their manifests.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import gzip
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from report_builder import pages
+
+
+class FixedPagesTest(unittest.TestCase):
+    def test_chunks_of_any_length_become_fixed_pages(self):
+        frame = pd.DataFrame({'n': range(10)})
+        chunks = [frame.iloc[:3], frame.iloc[3:4], frame.iloc[4:10]]
+        sizes = [len(page) for page in pages.fixed_pages(iter(chunks), 4)]
+        self.assertEqual(sizes, [4, 4, 2])
+        rows = pd.concat(pages.fixed_pages(iter(chunks), 4))['n'].tolist()
+        self.assertEqual(rows, list(range(10)))
+
+
+class ExportDatasetTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.tmp = tmp.name
+        self.source = os.path.join(tmp.name, 'companies.csv')
+        pd.DataFrame({'Company': ['Acme', 'Globex', 'Initech', ''],
+                      'Employees': ['1,200', '35', '7', '']}).to_csv(self.source, index=False)
+        self.directory = os.path.join(tmp.name, 'pages')
+
+    def test_pages_and_manifest(self):
+        manifest = pages.export_dataset(self.source, self.directory, page_rows=3)
+        self.assertEqual(manifest['total_rows'], 4)
+        self.assertEqual([(page['first_row'], page['rows']) for page in manifest['pages']], [(0, 3), (3, 1)])
+        company, employees = manifest['columns']
+        self.assertEqual((company['name'], company['type'], company['count']), ('Company', 'string', 3))
+        self.assertEqual((employees['type'], employees['min'], employees['max']), ('number', 7.0, 1200.0))
+
+        with open(os.path.join(self.directory, 'page-00001.json'), 'rb') as f:
+            data = f.read()
+        with open(os.path.join(self.directory, 'page-00001.json.gz'), 'rb') as f:
+            self.assertEqual(gzip.decompress(f.read()), data)
+        page = json.loads(data)
+        self.assertEqual(page['rows'][0], ['Acme', '1,200'])
+
+    def test_unchanged_sources_are_skipped_and_stale_pages_removed(self):
+        pages.export_dataset(self.source, self.directory, page_rows=1)
+        self.assertIsNone(pages.export_dataset(self.source, self.directory, page_rows=1))
+        manifest = pages.export_dataset(self.source, self.directory, page_rows=3)
+        self.assertEqual(len(manifest['pages']), 2)
+        self.assertFalse(os.path.exists(os.path.join(self.directory, 'page-00003.json')))
+
+    def test_exports_are_swapped_in_without_leftovers(self):
+        pages.export_dataset(self.source, self.directory, page_rows=1)
+        pages.export_dataset(self.source, self.directory, page_rows=3, force=True)
+        self.assertEqual(sorted(os.listdir(self.tmp)), ['companies.csv', 'pages'])
+
+    def test_a_failed_export_keeps_the_previous_one(self):
+        before = pages.export_dataset(self.source, self.directory, page_rows=1)
+        with mock.patch.object(pages, 'write_page', side_effect=OSError('disk full')):
+            with self.assertRaises(OSError):
+                pages.export_dataset(self.source, self.directory, page_rows=3, force=True)
+        with open(os.path.join(self.directory, pages.MANIFEST)) as f:
+            self.assertEqual(json.load(f)['pages'], before['pages'])
+        self.assertTrue(os.path.exists(os.path.join(self.directory, 'page-00004.json')))
+        self.assertEqual(sorted(os.listdir(self.tmp)), ['companies.csv', 'pages'])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,91 @@
+"""The BM25 search index and the ``k`` parameter of its HTTP endpoint.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import json
+import os
+import tempfile
+import threading
+import unittest
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pandas as pd
+
+from report_builder import search
+
+COMPANIES = pd.DataFrame({
+    'Company': ['Gross Polowy LLC', 'Acme Cable', 'Foreclosure Partners'],
+    'Notes': ['foreclosure counsel in Buffalo', 'wire harness contacts', 'foreclosure foreclosure defence'],
+    'Website': ['https://grosspolowy.com', 'https://acme.example', 'https://fp.example'],
+})
+
+
+def build_index(chunks):
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, 'search-index.bin')
+        builder = search.IndexBuilder()
+        builder.add_dataset(os.path.join(search.PUBLIC_DIR, 'Leads', 'companies.csv'), chunks)
+        builder.write(path)
+        return search.SearchIndex.load(path)
+
+
+class SearchIndexTest(unittest.TestCase):
+    def setUp(self):
+        self.index = build_index([COMPANIES.iloc[:2], COMPANIES.iloc[2:]])
+
+    def test_bm25_ranks_and_names_rows(self):
+        hits = self.index.search('foreclosure')
+        self.assertEqual([hit['row'] for hit in hits], [2, 0])
+        self.assertEqual(hits[0]['title'], 'Foreclosure Partners')
+        self.assertEqual(hits[0]['dataset'], os.path.join('Leads', 'companies.csv'))
+
+    def test_prefix_and_fuzzy_matches(self):
+        self.assertEqual([hit['row'] for hit in self.index.search('harn')], [1])
+        self.assertEqual([hit['row'] for hit in self.index.search('forclosure buffalo')][0], 0)
+
+    def test_columns_are_chosen_once_per_dataset(self):
+        # The second chunk's names alone would look opaque; they are still indexed
+        later = pd.DataFrame({'Company': ['Zenithcorporationholdingsincorporated'], 'Notes': ['x'],
+                              'Website': ['https://z.example']})
+        index = build_index([COMPANIES, later])
+        self.assertEqual(index.datasets[0]['columns'], ['Company', 'Notes'])
+        self.assertEqual([hit['row'] for hit in index.search('zenithcorporationholdingsincorporated')], [3])
+
+
+class ResultCountTest(unittest.TestCase):
+    def test_default_cap_and_bad_values(self):
+        self.assertEqual(search.result_count({}), search.DEFAULT_K)
+        self.assertEqual(search.result_count({'k': ['5']}), 5)
+        self.assertEqual(search.result_count({'k': ['100000']}), search.MAX_K)
+        for bad in ['0', '-3', 'ten', '']:
+            with self.assertRaises(ValueError):
+                search.result_count({'k': [bad]})
+
+
+class ServeTest(unittest.TestCase):
+    def setUp(self):
+        server = ThreadingHTTPServer(('127.0.0.1', 0), search.handler(build_index([COMPANIES])))
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        self.addCleanup(server.server_close)
+        self.addCleanup(server.shutdown)
+        self.url = f'http://127.0.0.1:{server.server_address[1]}'
+
+    def get(self, path):
+        with urllib.request.urlopen(self.url + path) as response:
+            return json.load(response)
+
+    def test_queries_and_bad_k(self):
+        self.assertEqual(len(self.get('/search?q=foreclosure&k=1')['results']), 1)
+        for path in ['/search?q=foreclosure&k=abc', '/search?q=foreclosure&k=0', '/elsewhere']:
+            with self.assertRaises(urllib.error.HTTPError) as caught:
+                self.get(path)
+            caught.exception.close()
+            self.assertEqual(caught.exception.code, 404 if path == '/elsewhere' else 400)
+
+
+if __name__ == '__main__':
+    unittest.main()
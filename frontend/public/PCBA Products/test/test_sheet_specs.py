@@ -0,0 +1,68 @@
+"""Declarative sheet specs: sources, filters and transforms.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import json
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+from openpyxl import load_workbook
+
+from report_builder import transforms
+from report_builder.sheet_specs import load_spec, read_chunks
+from report_builder.workbook import build_spec
+
+
+class SheetSpecTest(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.root = self.tmp.name
+        self.addCleanup(self.tmp.cleanup)
+        with open(os.path.join(self.root, 'importers.csv'), 'w', encoding='utf-8') as f:
+            f.write('Company,Industry,Main HTS Codes\n'
+                    'Acme,Medical devices,8534.00; 8537.10\n'
+                    'Globex,Oil & Gas,8537.10\n'
+                    'Initech,Lighting,9405.40\n')
+        self.spec = os.path.join(self.root, 'spec.json')
+        with open(self.spec, 'w', encoding='utf-8') as f:
+            json.dump({
+                'workbook': 'Test.xlsx',
+                'summary': True,
+                'sheets': [
+                    {'name': 'Medical', 'source': 'importers.csv',
+                     'columns': {'Name': 'Company'},
+                     'filters': [{'column': 'Industry', 'op': 'contains', 'value': ['medical', 'gas']}]},
+                    {'name': 'Headings', 'source': 'importers.csv', 'transform': 'hts_rollup',
+                     'options': {'codes': 'Main HTS Codes', 'level': 4}},
+                ],
+                'charts': [{'title': 'Importers per Heading', 'sheet': 'Headings', 'category': 'Heading',
+                            'value': 'Importers'}],
+            }, f)
+
+    def test_filters_apply_before_renaming(self):
+        sheet = load_spec(self.spec).sheets[0]
+        rows = [row for chunk in read_chunks(sheet) for row in chunk.itertuples(index=False, name=None)]
+        self.assertEqual(rows, [('Acme',), ('Globex',)])
+
+    def test_transform_runs_once_per_build(self):
+        calls = []
+
+        def counted(chunks, **options):
+            calls.append(options)
+            yield from transforms.hts_rollup(chunks, **options)
+
+        counted.inputs = transforms.hts_rollup.inputs
+        with mock.patch.dict(transforms.TRANSFORMS, hts_rollup=counted):
+            excel_file = build_spec(self.spec, os.path.join(self.root, 'output'), use_cache=False)
+        # Columns, widths, rows and the chart all come from one run
+        self.assertEqual(len(calls), 1)
+        rows = list(load_workbook(excel_file)['Headings'].iter_rows(values_only=True))
+        self.assertEqual([row[:2] for row in rows[1:]], [('8537', '85'), ('8534', '85'), ('9405', '94')])
+
+
+if __name__ == '__main__':
+    unittest.main()
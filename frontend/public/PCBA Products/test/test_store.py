@@ -0,0 +1,74 @@
+"""The SQLite store: typed source tables read back as text or typed columns.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import os
+import sqlite3
+import tempfile
+import unittest
+from unittest import mock
+
+import pandas as pd
+
+from report_builder import store
+
+CSV = '''Company,HTS Code,Zip,Employees,Revenue,Founded,Rating
+Acme,8534.00,02134,1200,"$397,316.15",01/02/2023,4.5
+Globex,8544.42,10001,,"$1,000.00",,3.25
+Initech,8536.90,60601,7,,12/31/1999,
+'''
+
+
+class StoreTest(unittest.TestCase):
+    def setUp(self):
+        tmp = tempfile.TemporaryDirectory()
+        self.addCleanup(tmp.cleanup)
+        self.source = os.path.join(tmp.name, 'companies.csv')
+        with open(self.source, 'w', encoding='utf-8') as f:
+            f.write(CSV)
+
+    def read(self, **kwargs):
+        return pd.concat(list(store.read_batches(self.source, chunksize=2, **kwargs)), ignore_index=True)
+
+    def test_columns_are_stored_typed(self):
+        store.columns(self.source)
+        table = store.table_name(1)
+        kinds = store.query(f'SELECT typeof("Employees"), typeof("Revenue"), typeof("HTS Code"), '
+                            f'typeof("Zip"), "Founded" FROM {table} ORDER BY rowid LIMIT 1')
+        self.assertEqual(kinds.iloc[0].tolist(), ['integer', 'real', 'text', 'text', '2023-01-02'])
+
+    def test_text_reads_reproduce_the_source(self):
+        expected = pd.read_csv(self.source, dtype=str)
+        text = self.read()
+        self.assertEqual(text.where(text.notna(), None).values.tolist(),
+                         expected.astype(object).where(expected.notna(), None).values.tolist())
+        self.assertEqual(text.loc[0, 'HTS Code'], '8534.00')
+        self.assertEqual(text.loc[0, 'Zip'], '02134')
+
+    def test_typed_reads(self):
+        typed = self.read(typed=True)
+        self.assertEqual(str(typed['Employees'].dtype), 'Int64')
+        self.assertEqual(typed['Revenue'].tolist()[:2], [397316.15, 1000.0])
+        self.assertEqual(typed.loc[2, 'Founded'], pd.Timestamp('1999-12-31'))
+        self.assertEqual(typed['Rating'].dtype, 'float64')
+        self.assertEqual(typed['HTS Code'].tolist(), ['8534.00', '8544.42', '8536.90'])
+
+    def test_warm_reads_match_cold_ones(self):
+        cold, cold_typed = self.read(), self.read(typed=True)
+        with mock.patch.object(store, 'WARM', {}):
+            pd.testing.assert_frame_equal(self.read(), cold)
+            pd.testing.assert_frame_equal(self.read(typed=True), cold_typed)
+
+    def test_older_databases_are_reset(self):
+        conn = sqlite3.connect(store.STORE_PATH)
+        conn.executescript('CREATE TABLE sources (id INTEGER PRIMARY KEY, path TEXT, columns TEXT);'
+                           'CREATE TABLE source_1 (a TEXT);')
+        conn.close()
+        self.assertEqual(store.columns(self.source)[0], 'Company')
+        self.assertEqual(store.query('PRAGMA user_version').iloc[0, 0], store.SCHEMA_VERSION)
+
+
+if __name__ == '__main__':
+    unittest.main()
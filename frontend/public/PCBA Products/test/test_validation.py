@@ -0,0 +1,50 @@
+"""Vectorised data quality rules and their per-dataset results.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import unittest
+
+import pandas as pd
+
+from report_builder.validation import ALL_RULES, UNIQUE_RULE, validate
+
+LEADS = pd.DataFrame({
+    'Company Name': ['Acme', 'ACME Inc.', '', 'Globex'],
+    'Company Domain': ['acme.com', 'https://www.acme.com/', 'not a domain', ''],
+    'State': ['MO', 'Texas', 'Narnia', ''],
+    'NAICS': ['334418', '3344 / 33', '33a', ''],
+    'HTS Codes': ['8534.00; 8544.42', '85', '', ''],
+    'Approx. Annual PCBA Import Volume': ['~$2–$10M', 'Unknown', '', '$500K-2M'],
+    'LinkedIn Profile': ['https://www.linkedin.com/in/jdoe/', 'linkedin.com/in/jdoe', 'https://example.com', ''],
+})
+
+
+class ValidateTest(unittest.TestCase):
+    def setUp(self):
+        # Two chunks, so counts and the duplicate check carry across them
+        results = validate(iter([LEADS.iloc[:2], LEADS.iloc[2:]]), 'leads.csv')
+        self.results = {(row['Column'], row['Rule']): row for _, row in results.iterrows()}
+
+    def counts(self, column, rule):
+        row = self.results[column, rule]
+        return row['Checked'], row['Passed'], row['Example Failure']
+
+    def test_rules_check_only_present_values_except_required(self):
+        self.assertEqual(self.counts('Company Name', 'required'), (4, 3, ''))
+        self.assertEqual(self.counts('Company Domain', 'domain format'), (3, 2, 'not a domain'))
+        self.assertEqual(self.counts('State', 'state code'), (3, 2, 'Narnia'))
+        self.assertEqual(self.counts('NAICS', 'NAICS shape'), (3, 2, '33a'))
+        self.assertEqual(self.counts('HTS Codes', 'HTS code shape'), (2, 1, '85'))
+        self.assertEqual(self.counts('Approx. Annual PCBA Import Volume', 'volume range parses'), (3, 2, 'Unknown'))
+
+    def test_duplicate_keys_and_overall_rows(self):
+        # LinkedIn comes before the domain as the contact key
+        self.assertEqual(self.counts('LinkedIn Profile', UNIQUE_RULE)[:2], (3, 2))
+        # Row 1 is a duplicate and row 2 fails several rules
+        self.assertEqual(self.counts('', ALL_RULES)[:2], (4, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,60 @@
+"""Import volume estimates parsed into ranges, and overlap queries over them.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import unittest
+from unittest import mock
+
+import numpy as np
+import pandas as pd
+
+from report_builder.transforms import volume_range
+from report_builder.volumes import VolumeIndex, parse_volumes, volume_amounts
+
+ESTIMATES = pd.Series(['~$2–$10M', '~$1M', '~$10M (upper range)', 'Low–mid single-digit millions', '$500K-2M',
+                       '~$15–$30M', 'Unknown', None])
+
+
+class ParseVolumesTest(unittest.TestCase):
+    def test_estimates_become_bounds(self):
+        bounds = parse_volumes(ESTIMATES)
+        expected = [(2e6, 10e6), (1e6, 1e6), (10e6, 10e6), (1e6, 6e6), (500e3, 2e6), (15e6, 30e6)]
+        self.assertEqual(list(zip(bounds['low'][:6], bounds['high'][:6])), expected)
+        self.assertTrue(bounds.iloc[6:].isna().all().all())
+
+    def test_amounts_use_the_midpoint(self):
+        amounts = volume_amounts(pd.Series(['$1,000,000', '~$2–$10M', 'n/a']))
+        self.assertEqual(amounts[:2].tolist(), [1e6, 6e6])
+        self.assertTrue(np.isnan(amounts[2]))
+
+
+class OverlapTest(unittest.TestCase):
+    def test_index_matches_a_direct_mask(self):
+        bounds = parse_volumes(ESTIMATES)
+        index = VolumeIndex.from_frame(bounds)
+        self.assertEqual(len(index), 6)
+        for low, high in [(1e6, 10e6), (10e6, 10e6), (0, 1e5), (11e6, 14e6), (0, np.inf)]:
+            mask = (bounds['high'] >= low) & (bounds['low'] <= high)
+            self.assertEqual(sorted(index.overlapping(low, high)), list(bounds.index[mask]))
+            self.assertEqual(index.count(low, high), int(mask.sum()))
+
+    def test_volume_range_keeps_source_order_across_chunks(self):
+        frame = pd.DataFrame({'Company': list('ABCDEFGH'), 'Volume': ESTIMATES})
+        chunks = [frame.iloc[:3], frame.iloc[3:]]
+        kept = pd.concat(volume_range(iter(chunks), 'Volume', low=1e6, high=10e6))
+        self.assertEqual(kept['Company'].tolist(), ['A', 'B', 'C', 'D', 'E'])
+        self.assertEqual(kept['Volume Low (USD)'].tolist(), [2e6, 1e6, 10e6, 1e6, 500e3])
+
+    def test_volume_range_selects_through_one_index(self):
+        frame = pd.DataFrame({'Company': list('ABCDEFGH'), 'Volume': ESTIMATES})
+        with mock.patch.object(VolumeIndex, 'overlapping', autospec=True,
+                               side_effect=VolumeIndex.overlapping) as overlapping:
+            kept = pd.concat(volume_range(iter([frame.iloc[:3], frame.iloc[3:]]), 'Volume', low=12e6, high=20e6))
+        overlapping.assert_called_once()
+        self.assertEqual(kept['Company'].tolist(), ['F'])
+
+
+if __name__ == '__main__':
+    unittest.main()
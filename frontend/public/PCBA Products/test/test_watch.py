@@ -0,0 +1,81 @@
+"""The watch daemon: targets per input, change detection and the build queue.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import contextlib
+import io
+import os
+import tempfile
+import threading
+import unittest
+
+from report_builder import watch
+
+
+class DiscoverTest(unittest.TestCase):
+    def test_targets_read_their_own_inputs(self):
+        with tempfile.TemporaryDirectory() as root:
+            os.makedirs(os.path.join(root, 'Leads'))
+            os.makedirs(os.path.join(root, 'Law Database'))
+            leads = os.path.join(root, 'Leads', 'leads.csv')
+            export = os.path.join(root, 'Law Database', 'Search-Dockets-1.csv')
+            for path in (leads, export):
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write('Company\nAcme\n')
+            targets, folders = watch.discover(root, os.path.join(root, 'out'), os.path.join(root, 'pages'))
+            inputs = {target.label: target.inputs for target in targets}
+            self.assertEqual(inputs['workbook:Leads'], frozenset([leads]))
+            self.assertEqual(inputs['pages:' + os.path.join('Leads', 'leads.csv')], frozenset([leads]))
+            self.assertEqual(inputs['summary:dockets'], frozenset([export]))
+            self.assertIn(os.path.join(root, 'Leads'), folders)
+            self.assertIn(root, folders)
+
+
+class PollingWatcherTest(unittest.TestCase):
+    def test_new_changed_and_removed_files(self):
+        with tempfile.TemporaryDirectory() as folder:
+            kept, removed = os.path.join(folder, 'a.csv'), os.path.join(folder, 'b.csv')
+            for path in (kept, removed):
+                with open(path, 'w', encoding='utf-8') as f:
+                    f.write('x\n')
+            watcher = watch.PollingWatcher(interval=0)
+            watcher.watch([folder])
+            self.assertEqual(watcher.changes(0), set())
+            with open(kept, 'a', encoding='utf-8') as f:
+                f.write('y\n')
+            os.remove(removed)
+            added = os.path.join(folder, 'c.csv')
+            with open(added, 'w', encoding='utf-8') as f:
+                f.write('z\n')
+            self.assertEqual(watcher.changes(0), {kept, removed, added})
+
+
+class SchedulerTest(unittest.TestCase):
+    def test_changes_during_a_build_queue_one_more_run(self):
+        started, release = threading.Event(), threading.Event()
+        runs = []
+
+        def build(refold):
+            runs.append(refold)
+            started.set()
+            release.wait(5)
+            return {}
+
+        target = watch.Target('workbook:test', frozenset(), build)
+        scheduler = watch.Scheduler(workers=2)
+        with contextlib.redirect_stdout(io.StringIO()):
+            scheduler.submit(target)
+            self.assertTrue(started.wait(5))
+            # Two more changes while it runs: one rerun, refolding if either asked to
+            scheduler.submit(target, refold=True)
+            scheduler.submit(target)
+            release.set()
+            scheduler.shutdown()
+        self.assertEqual(runs, [False, True])
+        self.assertEqual(scheduler.running, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+"""The streaming workbook build and the column formatting it shares with ``pipeline``.
+
+Run from the ``PCBA Products`` directory::
+
+    python -m pytest test
+"""
+import os
+import tempfile
+import unittest
+
+from openpyxl import Workbook, load_workbook
+
+from report_builder import styles
+from report_builder.formatting import MAX_COLUMN_WIDTH, format_worksheet
+from report_builder.sheet_specs import SummarySpec, load_spec
+from report_builder.workbook import build_workbook
+
+ROWS = [('Acme', 'A much longer note ' * 5), ('Globex', 'short')]
+
+
+class BodyFormattingTest(unittest.TestCase):
+    def assert_body_alignment(self, ws, header_row=1):
+        for row in ws.iter_rows(min_row=header_row + 1):
+            for cell in row:
+                self.assertEqual(cell.style, styles.BODY, cell.coordinate)
+                self.assertEqual(cell.alignment.vertical, 'center')
+                self.assertTrue(cell.alignment.wrap_text)
+
+    def test_streamed_sheets_align_every_column(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            excel_file = os.path.join(tmp, 'test.xlsx')
+            build_workbook(excel_file, [('Data', ['Company', 'Notes'], iter(ROWS), [10, MAX_COLUMN_WIDTH], None)])
+            self.assert_body_alignment(load_workbook(excel_file)['Data'])
+
+    def test_loaded_sheets_align_every_column(self):
+        wb = Workbook()
+        ws = wb.active
+        ws.append(['Company', 'Notes'])
+        for row in ROWS:
+            ws.append(row)
+        styles.register(wb)
+        format_worksheet(ws, [10, MAX_COLUMN_WIDTH])
+        self.assert_body_alignment(ws)
+
+
+class SummarySheetTest(unittest.TestCase):
+    def summary_text(self, navigation, summary_spec=None):
+        with tempfile.TemporaryDirectory() as tmp:
+            excel_file = os.path.join(tmp, 'test.xlsx')
+            build_workbook(excel_file, [('Data', ['Company'], iter([('Acme',)]), [10], None)], navigation,
+                           summary_spec=summary_spec)
+            ws = load_workbook(excel_file)['Summary']
+            return [value for row in ws.iter_rows(values_only=True) for value in row if value]
+
+    def test_text_comes_from_the_spec(self):
+        text = self.summary_text([['Data', 'Companies', 'Names']],
+                                 SummarySpec('CABLE SUMMARY', ['Owners of cable shops.'], 'NOTE: lead lists.'))
+        self.assertEqual(text[:3], ['CABLE SUMMARY', 'Owners of cable shops.', 'SHEET NAVIGATION GUIDE'])
+        self.assertIn('Companies', text)
+        self.assertEqual(text[-1], 'NOTE: lead lists.')
+        self.assertFalse(any('PCBA' in value for value in text))
+
+    def test_specs_name_their_own_summary(self):
+        self.assertEqual(load_spec('pcba').summary.title, 'PCBA IMPORT DATA SUMMARY')
+        cable = load_spec('cable_wire_contacts').summary
+        self.assertFalse(any('PCBA' in text for text in [cable.title, cable.sources] + cable.introduction))
+
+
+if __name__ == '__main__':
+    unittest.main()